@@ -0,0 +1,201 @@
+import numpy as np
+from app.database import fetch_temperature_columns
+
+# Largest log-scale exponential smoothing lets a run of readings span before it
+# rescales, keeping exp() of it (and of twice it) well inside float64 range
+_SMOOTHING_LOG_SPAN = 300.0
+
+MS_PER_HOUR = 60 * 60 * 1000
+
+def load_history(start_time=None, end_time=None):
+    """Load the readings within a time range as NumPy arrays, oldest first.
+
+    The columns come straight from the storage backend's columnar reader, so
+    no per-reading dicts or tuples are built along the way.
+
+    Args:
+        start_time: datetime object for start of range (default: 14 days ago)
+        end_time: datetime object for end of range (default: now)
+
+    Returns:
+        tuple: (int64 epoch-millisecond timestamps, float64 temperatures)
+    """
+    timestamps, temperatures = fetch_temperature_columns(start_time, end_time)
+    return np.frombuffer(timestamps, dtype=np.int64)[::-1], np.frombuffer(temperatures, dtype=np.float64)[::-1]
+
+def format_timestamps(timestamps):
+    """Format epoch-millisecond timestamps as the API's ISO-8601 UTC strings."""
+    iso = np.datetime_as_string(np.asarray(timestamps, dtype='datetime64[ms]'), unit='ms')
+    return np.char.add(iso, '+00:00')
+
+def moving_average(timestamps, values, window_ms):
+    """Trailing moving average over a time window.
+
+    Each result averages the readings in (t - window_ms, t], so gaps in the
+    data shrink the window's reading count instead of reaching further back.
+
+    Args:
+        timestamps: Chronological int64 epoch-millisecond timestamps
+        values: float64 readings, same length as timestamps
+        window_ms: Width of the averaging window in milliseconds
+
+    Returns:
+        numpy.ndarray: One average per reading
+    """
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    first = np.searchsorted(timestamps, timestamps - window_ms, side='right')
+    last = np.arange(1, len(values) + 1)
+    return (sums[last] - sums[first]) / (last - first)
+
+def exponential_smoothing(timestamps, values, half_life_ms):
+    """Time-aware exponentially weighted moving average.
+
+    A reading's weight halves every half_life_ms, so irregular intervals and
+    gaps decay the history by the time that actually passed. The recurrence
+    s[i] = d[i] * s[i-1] + (1 - d[i]) * x[i] is unrolled into a cumulative sum
+    of readings scaled by their accumulated decay. That scale grows
+    exponentially, so the series is summed in runs that are rescaled before
+    it can overflow; there are only as many runs as the total decay requires
+    (a couple for two weeks of one-minute readings and a 30-minute half-life).
+
+    Args:
+        timestamps: Chronological int64 epoch-millisecond timestamps
+        values: float64 readings, same length as timestamps
+        half_life_ms: Time for a reading's weight to halve, in milliseconds
+
+    Returns:
+        numpy.ndarray: The smoothed series, starting at the first reading
+    """
+    values = np.asarray(values, dtype=np.float64)
+    smoothed = np.empty_like(values)
+    if not len(values):
+        return smoothed
+    # -log(d) per reading; a gap decaying past exp(-_SMOOTHING_LOG_SPAN) already forgets everything
+    steps = np.minimum(np.diff(timestamps) * (np.log(2) / half_life_ms), _SMOOTHING_LOG_SPAN)
+    steps = np.concatenate(([0.0], steps))
+    gains = -np.expm1(-steps)
+    decay = np.cumsum(steps)
+
+    runs = np.flatnonzero(np.diff(decay // _SMOOTHING_LOG_SPAN)) + 1
+    # The first reading (gain 0) is carried in as the starting value
+    previous = values[0]
+    for start, stop in zip(np.concatenate(([0], runs)), np.concatenate((runs, [len(values)]))):
+        base = decay[start - 1] if start else 0.0
+        scale = np.exp(decay[start:stop] - base)
+        smoothed[start:stop] = (previous + np.cumsum(scale * gains[start:stop] * values[start:stop])) / scale
+        previous = smoothed[stop - 1]
+    return smoothed
+
+def rate_of_change(timestamps, values, window_ms):
+    """Rate of change in degrees per hour over a trailing time window.
+
+    Each result is the slope between a reading and the oldest reading within
+    the preceding window_ms. It is NaN where no earlier reading is that recent.
+
+    Args:
+        timestamps: Chronological int64 epoch-millisecond timestamps
+        values: float64 readings, same length as timestamps
+        window_ms: Look-back window in milliseconds
+
+    Returns:
+        numpy.ndarray: °C/hour per reading
+    """
+    first = np.searchsorted(timestamps, timestamps - window_ms, side='left')
+    elapsed = (timestamps - timestamps[first]).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = (values - values[first]) * MS_PER_HOUR / elapsed
+    rates[elapsed == 0] = np.nan
+    return rates
+
+def find_gaps(timestamps, max_gap_ms):
+    """Find stretches longer than max_gap_ms without any reading.
+
+    Args:
+        timestamps: Chronological int64 epoch-millisecond timestamps
+        max_gap_ms: Longest interval between readings that is not a gap
+
+    Returns:
+        tuple: (gap start timestamps, gap end timestamps), i.e. the readings on
+        either side of each gap
+    """
+    gaps = np.flatnonzero(np.diff(timestamps) > max_gap_ms)
+    return timestamps[gaps], timestamps[gaps + 1]
+
+def time_above_threshold(timestamps, values, threshold, max_gap_ms):
+    """Total time spent above a temperature threshold.
+
+    Each reading is taken to hold until the next one, except across gaps
+    longer than max_gap_ms, which count as unobserved.
+
+    Args:
+        timestamps: Chronological int64 epoch-millisecond timestamps
+        values: float64 readings, same length as timestamps
+        threshold: Temperature to compare against
+        max_gap_ms: Longest interval between readings that is not a gap
+
+    Returns:
+        dict: above_ms and observed_ms totals, and the number of episodes
+        (separate stretches above the threshold)
+    """
+    if not len(timestamps):
+        return {"above_ms": 0, "observed_ms": 0, "episodes": 0}
+    intervals = np.diff(timestamps)
+    observed = intervals <= max_gap_ms
+    above = np.asarray(values) > threshold
+    counted = above[:-1] & observed
+    # An episode starts at any reading above the threshold that does not continue one
+    continues = np.concatenate(([False], above[:-1] & observed))
+    return {
+        "above_ms": int(intervals[counted].sum()),
+        "observed_ms": int(intervals[observed].sum()),
+        "episodes": int(np.count_nonzero(above & ~continues))
+    }
+
+def lttb(timestamps, values, max_points):
+    """Pick at most max_points readings that keep a series' visual shape (Largest-Triangle-Three-Buckets).
+
+    The first and last readings are always kept. The readings between are
+    split into max_points - 2 buckets of equal count, and from each bucket
+    the reading forming the largest triangle with the one kept from the
+    previous bucket and the mean of the next bucket is kept. Unlike
+    averaging, this keeps peaks and troughs. The loop runs once per bucket,
+    not per reading, so the cost is bounded by max_points numpy operations.
+
+    Args:
+        timestamps: Chronological int64 epoch-millisecond timestamps
+        values: float64 readings, same length as timestamps
+        max_points: Maximum number of readings to keep (at least 3)
+
+    Returns:
+        numpy.ndarray: Ascending indices of the kept readings
+
+    Raises:
+        ValueError: If max_points is less than 3
+    """
+    if max_points < 3:
+        raise ValueError("max_points must be at least 3")
+    count = len(values)
+    if count <= max_points:
+        return np.arange(count)
+
+    # Offsets from the first reading keep the areas' float64 products exact enough
+    x = (np.asarray(timestamps) - timestamps[0]).astype(np.float64)
+    y = np.asarray(values, dtype=np.float64)
+    edges = np.linspace(1, count - 1, max_points - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    # Mean point of each bucket, followed by the last reading as the final "next bucket"
+    mean_x = np.append(np.add.reduceat(x[:-1], edges[:-1]) / sizes, x[-1])
+    mean_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / sizes, y[-1])
+
+    kept = np.empty(max_points, dtype=np.int64)
+    kept[0], kept[-1] = 0, count - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        low, high = edges[bucket], edges[bucket + 1]
+        px, py = x[previous], y[previous]
+        nx, ny = mean_x[bucket + 1], mean_y[bucket + 1]
+        # Twice the triangle area; the factor does not change which point is largest
+        areas = np.abs((px - nx) * (y[low:high] - py) - (px - x[low:high]) * (ny - py))
+        previous = low + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    return kept
@@ -0,0 +1,190 @@
+import struct
+
+# Archive block layout, in the style of Facebook's Gorilla time series compression:
+#   header      magic b'TBGA', version (uint8), 3 pad bytes, count (uint32),
+#               first timestamp (int64 epoch milliseconds), little-endian
+#   bitstream   for every reading after the first, its timestamp then its value;
+#               the first reading's value is stored as a raw 64-bit float
+# Timestamps are delta-of-delta encoded:
+#   '0'                       same interval as the previous reading
+#   '10'   + 7 bits           delta-of-delta in [-63, 64]
+#   '110'  + 9 bits           delta-of-delta in [-255, 256]
+#   '1110' + 12 bits          delta-of-delta in [-2047, 2048]
+#   '1111' + 64 bits          anything else (two's complement)
+# Values are XORed with the previous value:
+#   '0'                       identical value
+#   '10'   + bits             meaningful bits fit the previous leading/trailing-zero window
+#   '11'   + 5 bits leading zeros + 6 bits (length - 1) + bits
+# Readings are stored oldest first, and the stream is zero-padded to a whole byte.
+MAGIC = b'TBGA'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBxxxIq')
+_FLOAT = struct.Struct('<d')
+_UINT64 = struct.Struct('<Q')
+_MASK64 = 2**64 - 1
+
+# (prefix, prefix bits, value bits, offset) for the bounded delta-of-delta ranges
+_DOD_RANGES = (
+    (0b10, 2, 7, 63),
+    (0b110, 3, 9, 255),
+    (0b1110, 4, 12, 2047),
+)
+
+class _BitWriter:
+    def __init__(self):
+        self._buffer = bytearray()
+        self._pending = 0
+        self._pending_bits = 0
+
+    def write(self, value, bits):
+        """Append the low `bits` bits of value, most significant first."""
+        self._pending = (self._pending << bits) | (value & ((1 << bits) - 1))
+        self._pending_bits += bits
+        while self._pending_bits >= 8:
+            self._pending_bits -= 8
+            self._buffer.append((self._pending >> self._pending_bits) & 0xFF)
+        self._pending &= (1 << self._pending_bits) - 1
+
+    def getvalue(self):
+        if self._pending_bits:
+            return bytes(self._buffer) + bytes([(self._pending << (8 - self._pending_bits)) & 0xFF])
+        return bytes(self._buffer)
+
+class _BitReader:
+    def __init__(self, data):
+        self._data = data
+        self._offset = 0
+        self._pending = 0
+        self._pending_bits = 0
+
+    def read(self, bits):
+        """Return the next `bits` bits as an unsigned integer."""
+        while self._pending_bits < bits:
+            if self._offset >= len(self._data):
+                raise ValueError("Archive block is truncated")
+            self._pending = (self._pending << 8) | self._data[self._offset]
+            self._offset += 1
+            self._pending_bits += 8
+        self._pending_bits -= bits
+        value = self._pending >> self._pending_bits
+        self._pending &= (1 << self._pending_bits) - 1
+        return value
+
+def _float_bits(value):
+    return _UINT64.unpack(_FLOAT.pack(value))[0]
+
+def _bits_float(bits):
+    return _FLOAT.unpack(_UINT64.pack(bits))[0]
+
+def encode_block(timestamps_ms, values):
+    """Compress parallel timestamp and value columns into one archive block.
+
+    Args:
+        timestamps_ms: Epoch-millisecond timestamps in non-decreasing order
+        values: Sequence of floats, same length as timestamps_ms
+
+    Returns:
+        bytes: The encoded block
+
+    Raises:
+        ValueError: If the columns have different lengths or timestamps are out of order
+    """
+    if len(timestamps_ms) != len(values):
+        raise ValueError("Timestamp and value columns must have the same length")
+    if not timestamps_ms:
+        return _HEADER.pack(MAGIC, VERSION, 0, 0)
+
+    writer = _BitWriter()
+    previous_ts = timestamps_ms[0]
+    previous_delta = 0
+    previous_bits = _float_bits(values[0])
+    leading, trailing = 65, 65
+    writer.write(previous_bits, 64)
+
+    for timestamp_ms, value in zip(timestamps_ms[1:], values[1:]):
+        delta = timestamp_ms - previous_ts
+        if delta < 0:
+            raise ValueError("Timestamps must be in chronological order")
+        dod = delta - previous_delta
+        if dod == 0:
+            writer.write(0, 1)
+        else:
+            for prefix, prefix_bits, value_bits, offset in _DOD_RANGES:
+                if -offset <= dod <= offset + 1:
+                    writer.write(prefix, prefix_bits)
+                    writer.write(dod + offset, value_bits)
+                    break
+            else:
+                writer.write(0b1111, 4)
+                writer.write(dod & _MASK64, 64)
+        previous_ts, previous_delta = timestamp_ms, delta
+
+        bits = _float_bits(value)
+        xor = bits ^ previous_bits
+        previous_bits = bits
+        if xor == 0:
+            writer.write(0, 1)
+            continue
+        xor_leading = min(64 - xor.bit_length(), 31)
+        xor_trailing = (xor & -xor).bit_length() - 1
+        if xor_leading >= leading and xor_trailing >= trailing:
+            writer.write(0b10, 2)
+            writer.write(xor >> trailing, 64 - leading - trailing)
+        else:
+            leading, trailing = xor_leading, xor_trailing
+            meaningful = 64 - leading - trailing
+            writer.write(0b11, 2)
+            writer.write(leading, 5)
+            writer.write(meaningful - 1, 6)
+            writer.write(xor >> trailing, meaningful)
+
+    return _HEADER.pack(MAGIC, VERSION, len(timestamps_ms), timestamps_ms[0]) + writer.getvalue()
+
+def decode_block(block):
+    """Decompress a block produced by encode_block().
+
+    Returns:
+        tuple: (list of epoch-millisecond timestamps, list of values), oldest first
+
+    Raises:
+        ValueError: If the block is not a valid archive block
+    """
+    if len(block) < _HEADER.size:
+        raise ValueError("Payload too short for an archive block")
+    magic, version, count, first_ts = _HEADER.unpack_from(block)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not an archive block (bad magic or version)")
+    if count == 0:
+        return [], []
+
+    reader = _BitReader(memoryview(block)[_HEADER.size:])
+    previous_bits = reader.read(64)
+    timestamps, values = [first_ts], [_bits_float(previous_bits)]
+    previous_delta = 0
+    leading, trailing = 0, 0
+
+    for _ in range(count - 1):
+        if reader.read(1) == 0:
+            dod = 0
+        else:
+            # Each longer prefix adds one more 1 bit before its terminating 0
+            for _, _, value_bits, offset in _DOD_RANGES:
+                if reader.read(1) == 0:
+                    dod = reader.read(value_bits) - offset
+                    break
+            else:
+                dod = reader.read(64)
+                dod = dod - 2**64 if dod >= 2**63 else dod
+        previous_delta += dod
+        timestamps.append(timestamps[-1] + previous_delta)
+
+        if reader.read(1) == 1:
+            if reader.read(1) == 1:
+                leading = reader.read(5)
+                meaningful = reader.read(6) + 1
+                trailing = 64 - leading - meaningful
+            previous_bits ^= reader.read(64 - leading - trailing) << trailing
+        values.append(_bits_float(previous_bits))
+
+    return timestamps, values
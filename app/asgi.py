@@ -0,0 +1,280 @@
+import asyncio
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+from app.views import _broadcaster, _parse_event_id, _reading_event, _stream_start, STREAM_RETRY_MS
+from config import ASGI_THREADS, STREAM_HEARTBEAT_SECONDS, STREAM_MAX_SECONDS
+
+STREAM_PATH = '/temperature/stream'
+
+_STREAM_HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    # Stop reverse proxies such as nginx from buffering the stream
+    (b'x-accel-buffering', b'no'),
+]
+
+def _wsgi_environ(scope, body):
+    """Build a PEP 3333 environ for an ASGI HTTP scope and its request body."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        # WSGI carries the raw path bytes as latin-1 strings
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+            continue
+        key = f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+class AsgiApp:
+    """ASGI front end for the Flask app: the same URLs and payloads, served from an event loop.
+
+    /temperature/stream is served natively. Each open stream is a coroutine
+    waiting for the ReadingBroadcaster to publish, so thousands of idle
+    dashboards cost sockets rather than threads. Every other request runs
+    the unchanged WSGI app in a pool of ASGI_THREADS threads, which bounds
+    how many database queries run at once however many clients are
+    connected; requests beyond that wait on the event loop. Streamed
+    responses are relayed chunk by chunk, with each send awaited before the
+    next chunk is generated.
+    """
+
+    def __init__(self, wsgi_app, threads=ASGI_THREADS):
+        """
+        Args:
+            wsgi_app: The WSGI application serving every route but the stream
+            threads: Size of the pool running WSGI requests and stream queries
+        """
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='asgi-wsgi')
+        # Stream coroutines wait on the current event; the bridge swaps in a new one and sets the old
+        self._published = None
+        # Resolved once the bridge has subscribed to the broadcaster
+        self._subscribed = None
+        self._streams = 0
+        self._bridge = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            if scope['path'] == STREAM_PATH and scope['method'] == 'GET':
+                after_ms = self._last_event_id(scope)
+                if after_ms is not False:
+                    await self._stream(after_ms, receive, send)
+                    return
+            await self._wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        """Answer the server's startup and shutdown events."""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    def _last_event_id(scope):
+        """Return the stream's resume point: epoch ms, None for a new client, or False if invalid.
+
+        Invalid values go to the WSGI route, which answers them with its usual 400.
+        """
+        value = dict(scope['headers']).get(b'last-event-id', b'').decode('latin-1')
+        if not value:
+            query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+            value = query.get('last_event_id', [''])[0]
+        try:
+            return _parse_event_id(value)
+        except ValueError:
+            return False
+
+    async def _read_body(self, receive):
+        """Collect the request body; returns None if the client disconnected first."""
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    async def _wsgi(self, scope, receive, send):
+        """Run one request through the WSGI app in the thread pool."""
+        body = await self._read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        disconnected = threading.Event()
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            await loop.run_in_executor(
+                self.executor, self._run_wsgi, _wsgi_environ(scope, body), loop, send, disconnected
+            )
+        finally:
+            watcher.cancel()
+
+    def _run_wsgi(self, environ, loop, send, disconnected):
+        """Call the WSGI app on a pool thread and relay its response to the event loop."""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['start'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+            }
+
+        def relay(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def send_start():
+            if not response.get('sent'):
+                relay(response['start'])
+                response['sent'] = True
+
+        body = self.wsgi_app(environ, start_response)
+        try:
+            # Each chunk is held back until the next one arrives, so a buffered
+            # response goes out as a single final message
+            pending = b''
+            for chunk in body:
+                if disconnected.is_set():
+                    return
+                if chunk:
+                    if pending:
+                        send_start()
+                        relay({'type': 'http.response.body', 'body': pending, 'more_body': True})
+                    pending = chunk
+            send_start()
+            relay({'type': 'http.response.body', 'body': pending})
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+
+    def _subscribe(self):
+        """Count a new stream, starting the bridge from the broadcaster on the first."""
+        self._streams += 1
+        if self._bridge is None or self._bridge.done():
+            self._published = asyncio.Event()
+            self._subscribed = asyncio.get_running_loop().create_future()
+            self._bridge = asyncio.create_task(self._run_bridge())
+
+    async def _run_bridge(self):
+        """Wake the stream coroutines whenever the broadcaster publishes, while any are open.
+
+        One pool thread blocks in ReadingBroadcaster.wait() on behalf of every
+        stream; the broadcaster's own watcher thread does the polling.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self.executor, _broadcaster.subscribe)
+        except Exception as e:
+            self._subscribed.set_exception(e)
+            raise
+        self._subscribed.set_result(None)
+        try:
+            newest_ms = _broadcaster.newest_ms
+            while self._streams > 0:
+                readings = await loop.run_in_executor(self.executor, _broadcaster.wait, newest_ms, 1.0)
+                if readings:
+                    newest_ms = readings[-1]['timestamp_ms']
+                    published, self._published = self._published, asyncio.Event()
+                    published.set()
+        finally:
+            _broadcaster.unsubscribe()
+
+    async def _next_readings(self, after_ms, timeout):
+        """Wait up to timeout seconds for readings newer than after_ms; [] if none arrived."""
+        if _broadcaster.newest_ms <= after_ms:
+            try:
+                await asyncio.wait_for(self._published.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        readings = _broadcaster.readings_after(after_ms)
+        if readings is None:
+            # Further behind than the broadcaster's history: read storage on the pool
+            readings = await asyncio.get_running_loop().run_in_executor(self.executor, _broadcaster.wait, after_ms, 0)
+        return readings
+
+    async def _stream(self, after_ms, receive, send):
+        """Serve /temperature/stream as the WSGI route does, until the client leaves or STREAM_MAX_SECONDS pass."""
+        loop = asyncio.get_running_loop()
+        self._subscribe()
+        events = asyncio.create_task(self._send_events(after_ms, loop, send))
+        disconnect = asyncio.create_task(receive())
+        try:
+            while not events.done():
+                await asyncio.wait((events, disconnect), return_when=asyncio.FIRST_COMPLETED)
+                if disconnect.done():
+                    if disconnect.result()['type'] == 'http.disconnect':
+                        events.cancel()
+                        break
+                    disconnect = asyncio.create_task(receive())
+            if events.done() and not events.cancelled():
+                events.result()
+        finally:
+            disconnect.cancel()
+            self._streams -= 1
+
+    async def _send_events(self, after_ms, loop, send):
+        """Send the retry hint, the replay and then each new reading or a keep-alive."""
+        await send({'type': 'http.response.start', 'status': 200, 'headers': _STREAM_HEADERS})
+        body = f"retry: {STREAM_RETRY_MS}\n\n"
+        # Replay only once the broadcaster's starting point is set, so nothing falls in between
+        await asyncio.shield(self._subscribed)
+        after_ms, replay = await loop.run_in_executor(self.executor, _stream_start, after_ms)
+        for reading in replay:
+            body += _reading_event(reading)
+            after_ms = reading['timestamp_ms']
+        await send({'type': 'http.response.body', 'body': body.encode(), 'more_body': True})
+
+        deadline = time.monotonic() + STREAM_MAX_SECONDS
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            readings = await self._next_readings(after_ms, min(STREAM_HEARTBEAT_SECONDS, remaining))
+            if readings:
+                body = ''.join(_reading_event(reading) for reading in readings)
+                after_ms = readings[-1]['timestamp_ms']
+            else:
+                body = ": keep-alive\n\n"
+            await send({'type': 'http.response.body', 'body': body.encode(), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
@@ -0,0 +1,92 @@
+import bisect
+import threading
+import time
+
+# Newest timestamp a cached window extends to; covers readings stamped in the future
+_MAX_MS = 2**63 - 1
+
+# A window is filled from this much further back than window_ms, so a request for
+# exactly the last window_ms (computed a moment before the fill) is still covered
+_SLACK_MS = 60 * 1000
+
+class ReadCache:
+    """Read-through cache for the newest reading and the most recent window of readings.
+
+    Every lookup asks the backend for its data_version() token first; cached
+    results are reused only while the token is unchanged, so they are never
+    older than the last committed write, and between polls repeated reads
+    (every open dashboard tab) cost a token check instead of a query.
+    Range lookups starting before the cached window, and backends that cannot
+    report a version, fall through to storage.
+    """
+
+    def __init__(self, window_ms):
+        """
+        Args:
+            window_ms: How far back from now the cached window of readings reaches
+                (0 disables the cache)
+        """
+        self.window_ms = window_ms
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.clear()
+
+    def clear(self):
+        """Drop every cached result (the hit and miss counters are kept)."""
+        with self._lock:
+            self._latest = None
+            self._window = None
+
+    def stats(self):
+        """Return the hit and miss counters."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def _version(self, backend):
+        """Return the cache key for backend's current data, or None if it cannot be cached."""
+        if self.window_ms <= 0:
+            return None
+        version = backend.data_version()
+        return None if version is None else (id(backend), version)
+
+    def latest(self, backend):
+        """Return backend.latest(), from the cache while no write has happened since it was read."""
+        version = self._version(backend)
+        with self._lock:
+            if version is not None and self._latest is not None and self._latest[0] == version:
+                self.hits += 1
+                return self._latest[1]
+            self.misses += 1
+            # Filling under the lock lets concurrent readers wait for one query instead of all running it
+            row = backend.latest()
+            if version is not None:
+                self._latest = (version, row)
+            return row
+
+    def range(self, backend, start_ms, end_ms):
+        """Return backend.range(start_ms, end_ms), served from the cached window when it covers start_ms."""
+        version = self._version(backend)
+        if version is None:
+            with self._lock:
+                self.misses += 1
+            return backend.range(start_ms, end_ms)
+
+        with self._lock:
+            window = self._window
+            if window is None or window[0] != version or start_ms < window[1]:
+                window_start = int(time.time() * 1000) - self.window_ms - _SLACK_MS
+                if start_ms < window_start:
+                    self.misses += 1
+                    return backend.range(start_ms, end_ms)
+                rows = backend.range(window_start, _MAX_MS)
+                rows.reverse()
+                window = self._window = (version, window_start, [row[0] for row in rows], rows)
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        _, _, timestamps, rows = window
+        low = bisect.bisect_left(timestamps, start_ms)
+        high = bisect.bisect_right(timestamps, end_ms)
+        return rows[low:high][::-1]
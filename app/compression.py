@@ -0,0 +1,222 @@
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from app.export import COLUMNAR_MIMETYPE
+from config import (
+    COMPRESSION_ENCODINGS,
+    COMPRESSION_MIN_BYTES,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_BROTLI_LEVEL,
+    COMPRESSION_ZSTD_LEVEL,
+    COMPRESSION_CACHE_MB
+)
+
+# Optional codecs: brotli and zstd are only offered when their packages are installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Response types worth compressing; event streams must reach the client unbuffered
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/html',
+    'text/plain',
+    COLUMNAR_MIMETYPE
+))
+
+LEVELS = {
+    'gzip': COMPRESSION_GZIP_LEVEL,
+    'br': COMPRESSION_BROTLI_LEVEL,
+    'zstd': COMPRESSION_ZSTD_LEVEL
+}
+
+def available_encodings(encodings=COMPRESSION_ENCODINGS):
+    """Return the encodings from encodings whose codec is installed, in the same order."""
+    installed = {'gzip': True, 'br': brotli is not None, 'zstd': zstandard is not None}
+    return [encoding for encoding in encodings if installed.get(encoding)]
+
+def negotiate(accept_encodings, encodings=COMPRESSION_ENCODINGS):
+    """Pick the content coding to use for a request.
+
+    Args:
+        accept_encodings: The request's parsed Accept-Encoding header (request.accept_encodings)
+        encodings: Encodings the server offers, most preferred first
+
+    Returns:
+        str: The offered encoding with the highest client quality (ties go to the
+            server's order), or None to send the body as is
+    """
+    best, best_quality = None, 0
+    for encoding in available_encodings(encodings):
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress(data, encoding, level=None):
+    """Compress data with the named content coding.
+
+    Args:
+        data: Bytes to compress
+        encoding: 'gzip', 'br' or 'zstd'
+        level: Compression level (default: the configured level for encoding)
+    """
+    level = LEVELS[encoding] if level is None else level
+    if encoding == 'gzip':
+        # A fixed mtime makes the output depend on the data alone
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+class _BrotliStream:
+    """Adapt brotli.Compressor to the compress()/flush() interface of zlib."""
+
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+def compressobj(encoding, level=None):
+    """Return an incremental compressor with compress(data) and flush() methods.
+
+    Args:
+        encoding: 'gzip', 'br' or 'zstd'
+        level: Compression level (default: the configured level for encoding)
+    """
+    level = LEVELS[encoding] if level is None else level
+    if encoding == 'gzip':
+        # wbits 16 + 15 writes a gzip header and trailer around the deflate stream
+        return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if encoding == 'br':
+        return _BrotliStream(level)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compressobj()
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+class CompressionCache:
+    """LRU cache of compressed response bodies, keyed by encoding, level and body digest.
+
+    Keying on the body itself means an entry can never be served for changed
+    data, and identical responses (every dashboard asking for the same recent
+    window between polls) are compressed once. Hashing costs a small fraction
+    of compressing.
+    """
+
+    def __init__(self, max_bytes):
+        """
+        Args:
+            max_bytes: Total size of compressed bodies to keep (0 disables the cache)
+        """
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Return the hit and miss counters and the bytes held."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "bytes": self._size}
+
+    def clear(self):
+        """Drop every cached body (the hit and miss counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def compress(self, data, encoding, level=None):
+        """Return compress(data, encoding, level), from the cache when the same body was compressed before."""
+        level = LEVELS[encoding] if level is None else level
+        key = (encoding, level, hashlib.sha1(data).digest())
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return body
+            self.misses += 1
+
+        body = compress(data, encoding, level)
+        if len(body) <= self.max_bytes:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = body
+                    self._size += len(body)
+                while self._size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+        return body
+
+_cache = CompressionCache(COMPRESSION_CACHE_MB * 1024 * 1024)
+
+def compression_cache_stats():
+    """Return this process's compression cache counters."""
+    return _cache.stats()
+
+def _compressed_stream(chunks, original, compressor):
+    """Compress a streamed body chunk by chunk, closing the original iterable when done."""
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(original, 'close'):
+            original.close()
+
+def compress_response(response, accept_encodings, encodings=COMPRESSION_ENCODINGS, min_bytes=COMPRESSION_MIN_BYTES):
+    """Compress a response body with the best encoding the client accepts.
+
+    Only successful responses of a compressible type are touched. Buffered
+    bodies smaller than min_bytes are left alone, and the rest go through the
+    compression cache. Streamed bodies (chunked history) are compressed as
+    they are generated, so memory stays flat. Every compressible response
+    gets Vary: Accept-Encoding so shared caches keep the variants apart.
+
+    Args:
+        response: The Flask response to compress in place
+        accept_encodings: The request's parsed Accept-Encoding header
+        encodings: Encodings to offer, most preferred first
+        min_bytes: Smallest buffered body worth compressing
+
+    Returns:
+        The same response
+    """
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(accept_encodings, encodings)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        original = response.response
+        response.response = _compressed_stream(response.iter_encoded(), original, compressobj(encoding))
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < min_bytes:
+            return response
+        response.set_data(_cache.compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -1,38 +1,1003 @@
+import gzip
+import heapq
+import itertools
+import math
 import sqlite3
 import os
-from datetime import datetime, timezone
-from config import DATA_RETENTION_PERIOD
+import shutil
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
+from app.archive import encode_block, decode_block
+from app.cache import ReadCache
+from app.metrics import timed
+from app.storage import (
+    StorageBackend,
+    ROLLUP_RESOLUTIONS,
+    HISTOGRAM_RESOLUTIONS,
+    HISTOGRAM_BINS_PER_DEGREE,
+    bucket_start,
+    histogram_bin,
+    summarize,
+    get_backend
+)
+from config import (
+    DATA_RETENTION_PERIOD,
+    ROLLUP_RETENTION_PERIOD,
+    ARCHIVE_RETENTION_PERIOD,
+    DB_BUSY_TIMEOUT_MS,
+    DB_SYNCHRONOUS,
+    DB_CACHE_SIZE_KB,
+    DB_MMAP_SIZE_MB,
+    COMPACTION_BATCH_SIZE,
+    COMPACTION_VACUUM_PAGES,
+    WRITE_BUFFER_SIZE,
+    WRITE_BUFFER_MAX_AGE_SECONDS,
+    HISTORY_STREAM_CHUNK_SIZE,
+    READ_CACHE_WINDOW_MINUTES,
+    IMPORT_BATCH_SIZE,
+    BACKUP_DIR,
+    BACKUP_KEEP,
+    BACKUP_PAGES_PER_STEP,
+    BACKUP_STEP_SLEEP_MS,
+    BACKUP_COMPRESS
+)
+
+_SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Open upper bound for ranges that must include readings stamped in the future
+_MAX_MS = 2**63 - 1
+
+# Serves get_latest_temperature() and recent fetch_temperature_history() windows
+# (the dashboard's polling) without touching storage until new data is committed
+_read_cache = ReadCache(READ_CACHE_WINDOW_MINUTES * 60 * 1000)
+
+# (data_version() key, validator) last computed by data_validator()
+_validator = None
+_validator_lock = threading.Lock()
+
+# Connections are reused per thread and per process; the registry lets
+# close_connections() reach connections owned by other threads, and bumping
+# the generation tells those threads to open a new one.
+_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+_connections_generation = 0
 
 def get_db_path():
     """Get the database path from environment variable or config."""
     return os.getenv('DB_PATH', '/tmp/temperature.db')
 
-def init_db():
-    """Initialize the SQLite database and create the temperature_readings table."""
+def _open_connection(db_path):
+    """Open a new SQLite connection with WAL journaling and the tuned pragmas."""
+    conn = sqlite3.connect(
+        db_path,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False
+    )
+    synchronous = DB_SYNCHRONOUS if DB_SYNCHRONOUS in _SYNCHRONOUS_MODES else 'NORMAL'
+    # auto_vacuum only takes effect on a new database, and only before WAL is enabled
+    conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(f'PRAGMA synchronous={synchronous}')
+    conn.execute(f'PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}')
+    # A negative cache_size is interpreted by SQLite as KiB rather than pages
+    conn.execute(f'PRAGMA cache_size={-int(DB_CACHE_SIZE_KB)}')
+    conn.execute(f'PRAGMA mmap_size={int(DB_MMAP_SIZE_MB) * 1024 * 1024}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+def get_connection():
+    """Return the calling thread's shared database connection.
+
+    The connection is opened on first use and reused by every later call from
+    the same thread. A new one is opened if the process has forked (e.g. a
+    gunicorn worker inheriting the master's state), DB_PATH has changed or
+    close_connections() has closed it from any thread.
+    """
     db_path = get_db_path()
-    # Ensure the directory exists
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute('''
+    pid = os.getpid()
+    conn = getattr(_local, 'conn', None)
+    if (conn is not None and _local.pid == pid and _local.path == db_path
+            and _local.generation == _connections_generation):
+        return conn
+
+    conn = _open_connection(db_path)
+    with _connections_lock:
+        _connections.append((pid, conn))
+        generation = _connections_generation
+    _local.conn = conn
+    _local.pid = pid
+    _local.path = db_path
+    _local.generation = generation
+    # PRAGMA data_version values are per connection; see SQLiteBackend.data_version()
+    _local.data_version = None
+    return conn
+
+def close_connections():
+    """Close every connection opened by this process, in any thread.
+
+    Threads whose connection was closed open a new one on their next get_connection().
+    """
+    global _connections_generation
+    pid = os.getpid()
+    with _connections_lock:
+        _connections_generation += 1
+        owned = [conn for owner, conn in _connections if owner == pid]
+        _connections[:] = [(owner, conn) for owner, conn in _connections if owner != pid]
+    for conn in owned:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    _local.conn = None
+
+def _to_epoch_ms(dt):
+    """Convert a datetime to integer milliseconds since the Unix epoch (naive means UTC)."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - _EPOCH) // timedelta(milliseconds=1)
+
+def _from_epoch_ms(timestamp_ms):
+    """Format epoch milliseconds as the ISO-8601 UTC string returned by the API."""
+    return (_EPOCH + timedelta(milliseconds=timestamp_ms)).isoformat(timespec='milliseconds')
+
+# Conflict clauses merging new readings into existing rollup buckets and histogram bins.
+# A NULL sum_squares (spread unknown since before it was recorded) stays NULL.
+_ROLLUP_UPSERT = '''
+    ON CONFLICT (resolution, bucket_ms) DO UPDATE SET
+        min_temperature = min(min_temperature, excluded.min_temperature),
+        max_temperature = max(max_temperature, excluded.max_temperature),
+        sum_temperature = sum_temperature + excluded.sum_temperature,
+        sum_squares = sum_squares + excluded.sum_squares,
+        count = count + excluded.count
+'''
+_HISTOGRAM_UPSERT = '''
+    ON CONFLICT (resolution, bucket_ms, bin) DO UPDATE SET count = count + excluded.count
+'''
+
+def _update_rollups(conn, readings):
+    """Fold (timestamp_ms, temperature) readings into every rollup resolution and histogram."""
+    rows = [
+        (resolution, bucket_start(timestamp_ms, resolution), temperature, temperature, temperature,
+         temperature * temperature)
+        for resolution in ROLLUP_RESOLUTIONS
+        for timestamp_ms, temperature in readings
+    ]
+    conn.executemany('''
+        INSERT INTO temperature_rollups
+            (resolution, bucket_ms, min_temperature, max_temperature, sum_temperature, sum_squares, count)
+        VALUES (?, ?, ?, ?, ?, ?, 1)
+    ''' + _ROLLUP_UPSERT, rows)
+
+    bins = {}
+    for resolution in HISTOGRAM_RESOLUTIONS:
+        for timestamp_ms, temperature in readings:
+            key = (resolution, bucket_start(timestamp_ms, resolution), histogram_bin(temperature))
+            bins[key] = bins.get(key, 0) + 1
+    conn.executemany('''
+        INSERT INTO temperature_histograms (resolution, bucket_ms, bin, count)
+        VALUES (?, ?, ?, ?)
+    ''' + _HISTOGRAM_UPSERT, [(*key, count) for key, count in bins.items()])
+
+# SQL equivalent of histogram_bin(temperature): floor() of the scaled value, as
+# CAST truncates toward zero and SQLite's math functions are optional
+_HISTOGRAM_BIN_SQL = (
+    f'(CAST(temperature * {HISTOGRAM_BINS_PER_DEGREE} AS INTEGER)'
+    f' - (temperature * {HISTOGRAM_BINS_PER_DEGREE} < CAST(temperature * {HISTOGRAM_BINS_PER_DEGREE} AS INTEGER)))'
+)
+
+def _create_readings_table(conn):
+    """Schema version 1: ISO-8601 TEXT timestamps."""
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS temperature_readings (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             temperature REAL NOT NULL,
             timestamp TEXT NOT NULL
         )
     ''')
-    conn.commit()
-    conn.close()
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_temperature_readings_timestamp
+        ON temperature_readings (timestamp)
+    ''')
+
+def _migrate_epoch_timestamps(conn):
+    """Schema version 2: indexed INTEGER epoch-millisecond timestamps.
+
+    Rewrites the readings table in place, parsing every stored ISO-8601 string
+    (with either a 'Z' or '+00:00' offset) into UTC epoch milliseconds.
+    """
+    conn.execute('DROP INDEX IF EXISTS idx_temperature_readings_timestamp')
+    conn.execute('ALTER TABLE temperature_readings RENAME TO temperature_readings_v1')
+    conn.execute('''
+        CREATE TABLE temperature_readings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            temperature REAL NOT NULL,
+            timestamp_ms INTEGER NOT NULL
+        )
+    ''')
+
+    legacy = conn.execute('SELECT id, temperature, timestamp FROM temperature_readings_v1')
+    skipped = 0
+    while True:
+        rows = legacy.fetchmany(10000)
+        if not rows:
+            break
+        converted = []
+        for reading_id, temperature, timestamp in rows:
+            try:
+                converted.append((reading_id, temperature, _to_epoch_ms(datetime.fromisoformat(timestamp))))
+            except (TypeError, ValueError):
+                skipped += 1
+        conn.executemany(
+            'INSERT INTO temperature_readings (id, temperature, timestamp_ms) VALUES (?, ?, ?)',
+            converted
+        )
+    if skipped:
+        print(f"Skipped {skipped} readings with unparseable timestamps during migration")
+
+    conn.execute('DROP TABLE temperature_readings_v1')
+    conn.execute('''
+        CREATE INDEX idx_temperature_readings_timestamp_ms
+        ON temperature_readings (timestamp_ms)
+    ''')
+
+def _create_rollup_table(conn):
+    """Schema version 3: per-minute/hour/day min/max/sum/count rollups."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS temperature_rollups (
+            resolution TEXT NOT NULL,
+            bucket_ms INTEGER NOT NULL,
+            min_temperature REAL NOT NULL,
+            max_temperature REAL NOT NULL,
+            sum_temperature REAL NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (resolution, bucket_ms)
+        ) WITHOUT ROWID
+    ''')
+    # Backfill with this version's columns; later migrations add and fill the rest
+    for resolution, width in ROLLUP_RESOLUTIONS.items():
+        conn.execute('''
+            INSERT INTO temperature_rollups
+                (resolution, bucket_ms, min_temperature, max_temperature, sum_temperature, count)
+            SELECT ?, timestamp_ms - timestamp_ms % ?, MIN(temperature), MAX(temperature),
+                   SUM(temperature), COUNT(*)
+            FROM temperature_readings
+            GROUP BY 2
+        ''', (resolution, width))
+
+def _create_sensor_tables(conn):
+    """Schema version 4: readings from every sensor and channel.
+
+    sensor_channels is the dimension table; sensor_readings is clustered on
+    (channel_id, timestamp_ms), so a per-channel range query is a single
+    contiguous primary-key scan however many sensors share the table.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sensor_channels (
+            id INTEGER PRIMARY KEY,
+            sensor TEXT NOT NULL,
+            channel TEXT NOT NULL,
+            UNIQUE (sensor, channel)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sensor_readings (
+            channel_id INTEGER NOT NULL REFERENCES sensor_channels (id),
+            timestamp_ms INTEGER NOT NULL,
+            value REAL NOT NULL,
+            PRIMARY KEY (channel_id, timestamp_ms)
+        ) WITHOUT ROWID
+    ''')
+
+def _create_archive_table(conn):
+    """Schema version 5: compressed per-day blocks of readings past raw retention.
+
+    series_id is PRIMARY_SERIES for temperature_readings, otherwise the
+    sensor_channels id; block_ms is the UTC day the block covers.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS archive_blocks (
+            series_id INTEGER NOT NULL,
+            block_ms INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            PRIMARY KEY (series_id, block_ms)
+        ) WITHOUT ROWID
+    ''')
+
+def _add_rollup_statistics(conn):
+    """Schema version 6: sums of squares and histograms for /temperature/stats.
+
+    Buckets whose readings are all still in temperature_readings are
+    backfilled. Older ones keep a NULL sum_squares and no histogram, which
+    marks their spread as unknown.
+    """
+    conn.execute('ALTER TABLE temperature_rollups ADD COLUMN sum_squares REAL')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS temperature_histograms (
+            resolution TEXT NOT NULL,
+            bucket_ms INTEGER NOT NULL,
+            bin INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (resolution, bucket_ms, bin)
+        ) WITHOUT ROWID
+    ''')
+    for resolution, width in ROLLUP_RESOLUTIONS.items():
+        conn.execute('''
+            UPDATE temperature_rollups SET sum_squares = (
+                SELECT SUM(temperature * temperature) FROM temperature_readings
+                WHERE timestamp_ms BETWEEN bucket_ms AND bucket_ms + ? - 1
+            )
+            WHERE resolution = ? AND count = (
+                SELECT COUNT(*) FROM temperature_readings
+                WHERE timestamp_ms BETWEEN bucket_ms AND bucket_ms + ? - 1
+            )
+        ''', (width, resolution, width))
+        if resolution in HISTOGRAM_RESOLUTIONS:
+            conn.execute(f'''
+                INSERT INTO temperature_histograms (resolution, bucket_ms, bin, count)
+                SELECT r.resolution, r.bucket_ms, {_HISTOGRAM_BIN_SQL}, COUNT(*)
+                FROM temperature_rollups r
+                JOIN temperature_readings ON timestamp_ms BETWEEN r.bucket_ms AND r.bucket_ms + ? - 1
+                WHERE r.resolution = ? AND r.sum_squares IS NOT NULL
+                GROUP BY 2, 3
+            ''', (width, resolution))
+
+def _enable_incremental_vacuum(conn):
+    """Rebuild a database created before incremental auto_vacuum so compaction can shrink it.
+
+    _open_connection() asks for auto_vacuum=INCREMENTAL, but that only
+    applies to a new database; an existing one keeps auto_vacuum=NONE until
+    a VACUUM rewrites it. VACUUM cannot run inside the migration
+    transaction, so this runs after it, for as long as PRAGMA auto_vacuum
+    still reports NONE (an interrupted rebuild is retried on the next start).
+    It rewrites the whole file once and needs as much free disk space again.
+    """
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 0:
+        return
+    print("Rebuilding database to enable incremental vacuum (one time)...")
+    try:
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('VACUUM')
+    except sqlite3.OperationalError as e:
+        # E.g. another process kept a read open past the busy timeout
+        print(f"Error enabling incremental vacuum, will retry on next start: {str(e)}")
+
+# Applied in order by init_db(); PRAGMA user_version records how many have run
+_MIGRATIONS = [
+    _create_readings_table,
+    _migrate_epoch_timestamps,
+    _create_rollup_table,
+    _create_sensor_tables,
+    _create_archive_table,
+    _add_rollup_statistics,
+]
+SCHEMA_VERSION = len(_MIGRATIONS)
+
+# archive_blocks series id of temperature_readings; sensor channel ids start at 1
+PRIMARY_SERIES = 0
+
+def _seal_readings(conn, series_id, readings):
+    """Merge chronological (timestamp_ms, value) readings into their per-day archive blocks.
+
+    Must be called inside a transaction on conn.
+    """
+    days = {}
+    for timestamp_ms, value in readings:
+        days.setdefault(bucket_start(timestamp_ms, 'day'), []).append((timestamp_ms, value))
+    for block_ms, rows in days.items():
+        existing = conn.execute(
+            'SELECT data FROM archive_blocks WHERE series_id = ? AND block_ms = ?',
+            (series_id, block_ms)
+        ).fetchone()
+        if existing is not None:
+            rows = list(heapq.merge(zip(*decode_block(existing[0])), rows, key=lambda row: row[0]))
+        conn.execute(
+            'INSERT OR REPLACE INTO archive_blocks (series_id, block_ms, count, data) VALUES (?, ?, ?, ?)',
+            (series_id, block_ms, len(rows), encode_block([row[0] for row in rows], [row[1] for row in rows]))
+        )
+
+def _archived_readings(conn, series_id, start_ms, end_ms):
+    """Yield the archived (timestamp_ms, value) readings within [start_ms, end_ms], newest first.
+
+    Blocks are read and decoded one day at a time as the caller consumes
+    them, so a long range never holds more than one block's readings.
+    """
+    c = conn.execute(
+        '''SELECT data FROM archive_blocks
+           WHERE series_id = ? AND block_ms BETWEEN ? AND ?
+           ORDER BY block_ms DESC''',
+        (series_id, bucket_start(start_ms, 'day'), end_ms)
+    )
+    try:
+        for (data,) in c:
+            timestamps, values = decode_block(data)
+            for timestamp_ms, value in zip(reversed(timestamps), reversed(values)):
+                if start_ms <= timestamp_ms <= end_ms:
+                    yield timestamp_ms, value
+    finally:
+        c.close()
+
+def _with_archive(conn, series_id, rows, start_ms, end_ms):
+    """Merge raw rows (newest first) with any archived readings in the same range."""
+    archived = list(_archived_readings(conn, series_id, start_ms, end_ms))
+    if not archived:
+        return rows
+    return list(heapq.merge(rows, archived, key=lambda row: row[0], reverse=True))
+
+def _rollup_cover(start_ms, end_ms, resolutions):
+    """Split [start_ms, end_ms] into runs of whole rollup buckets and the edges left over.
+
+    Yields (resolution, first_bucket_ms, last_bucket_ms) for each run, trying
+    resolutions coarsest first, and (None, start_ms, end_ms) for edges
+    narrower than the finest resolution.
+    """
+    if start_ms > end_ms:
+        return
+    if not resolutions:
+        yield None, start_ms, end_ms
+        return
+    resolution, finer = resolutions[0], resolutions[1:]
+    width = ROLLUP_RESOLUTIONS[resolution]
+    first = -(-start_ms // width) * width
+    stop = (end_ms + 1) // width * width
+    if first >= stop:
+        yield from _rollup_cover(start_ms, end_ms, finer)
+        return
+    yield from _rollup_cover(start_ms, first - 1, finer)
+    yield resolution, first, stop - width
+    yield from _rollup_cover(stop, end_ms, finer)
+
+def _insert_readings(conn, readings):
+    """Insert (timestamp_ms, temperature) readings and fold them into the rollups.
+
+    Must be called inside a transaction on conn.
+    """
+    conn.executemany(
+        'INSERT INTO temperature_readings (timestamp_ms, temperature) VALUES (?, ?)',
+        readings
+    )
+    _update_rollups(conn, readings)
+
+class SQLiteBackend(StorageBackend):
+    """Stores readings in the SQLite database at DB_PATH (the default backend).
+
+    Rollups are maintained incrementally on every write, so aggregate() reads
+    precomputed buckets instead of scanning raw readings.
+    """
+
+    def __init__(self):
+        # (db_path, sensor, channel) -> sensor_channels.id; ids never change once assigned
+        self._channel_ids = {}
+        self._channel_ids_lock = threading.Lock()
+        # Bumped whenever any connection in this process sees the database change
+        self._generation = 0
+        self._generation_lock = threading.Lock()
+
+    def _changed(self):
+        """Record that the database has changed since data_version() was last read."""
+        with self._generation_lock:
+            self._generation += 1
+
+    def initialize(self):
+        """Create the database and migrate it to the current schema version."""
+        # The file may have been replaced since connections were last opened
+        close_connections()
+        with self._channel_ids_lock:
+            self._channel_ids.clear()
+
+        db_path = get_db_path()
+        # Ensure the directory exists
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._changed()
+        conn = get_connection()
+        with conn:
+            # Take the write lock up front so the web and poller processes never migrate concurrently
+            conn.execute('BEGIN IMMEDIATE')
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            for target, migration in enumerate(_MIGRATIONS[version:], start=version + 1):
+                if version:
+                    print(f"Migrating database to schema version {target}...")
+                migration(conn)
+                conn.execute(f'PRAGMA user_version={target}')
+        _enable_incremental_vacuum(conn)
+
+    def close(self):
+        close_connections()
+
+    def append(self, readings):
+        conn = get_connection()
+        with conn:
+            _insert_readings(conn, readings)
+        self._changed()
+
+    def import_readings(self, readings):
+        """Store a batch of readings in one transaction, skipping known timestamps.
+
+        The batch is staged in a temporary table keyed by timestamp, so
+        duplicates within it, among raw readings and in archive blocks are
+        dropped with set-based SQL, and the rollups and histograms are updated
+        per bucket rather than per reading.
+        """
+        conn = get_connection()
+        with conn:
+            conn.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS import_staging (
+                    timestamp_ms INTEGER PRIMARY KEY,
+                    temperature REAL NOT NULL
+                )
+            ''')
+            conn.execute('DELETE FROM import_staging')
+            conn.executemany('INSERT OR IGNORE INTO import_staging (timestamp_ms, temperature) VALUES (?, ?)', readings)
+            low, high = conn.execute('SELECT MIN(timestamp_ms), MAX(timestamp_ms) FROM import_staging').fetchone()
+            if low is None:
+                return 0
+            conn.executemany(
+                'DELETE FROM import_staging WHERE timestamp_ms = ?',
+                [(timestamp_ms,) for timestamp_ms, _ in _archived_readings(conn, PRIMARY_SERIES, low, high)]
+            )
+            conn.execute('''
+                DELETE FROM import_staging WHERE EXISTS (
+                    SELECT 1 FROM temperature_readings
+                    WHERE temperature_readings.timestamp_ms = import_staging.timestamp_ms
+                )
+            ''')
+            inserted = conn.execute('''
+                INSERT INTO temperature_readings (timestamp_ms, temperature)
+                SELECT timestamp_ms, temperature FROM import_staging ORDER BY timestamp_ms
+            ''').rowcount
+            for resolution, width in ROLLUP_RESOLUTIONS.items():
+                # "WHERE true" keeps SQLite from parsing ON CONFLICT as a join constraint
+                conn.execute('''
+                    INSERT INTO temperature_rollups
+                        (resolution, bucket_ms, min_temperature, max_temperature, sum_temperature, sum_squares, count)
+                    SELECT ?, timestamp_ms - timestamp_ms % ?, MIN(temperature), MAX(temperature),
+                           SUM(temperature), SUM(temperature * temperature), COUNT(*)
+                    FROM import_staging WHERE true
+                    GROUP BY 2
+                ''' + _ROLLUP_UPSERT, (resolution, width))
+                if resolution in HISTOGRAM_RESOLUTIONS:
+                    conn.execute(f'''
+                        INSERT INTO temperature_histograms (resolution, bucket_ms, bin, count)
+                        SELECT ?, timestamp_ms - timestamp_ms % ?, {_HISTOGRAM_BIN_SQL}, COUNT(*)
+                        FROM import_staging WHERE true
+                        GROUP BY 2, 3
+                    ''' + _HISTOGRAM_UPSERT, (resolution, width))
+            conn.execute('DELETE FROM import_staging')
+        self._changed()
+        return inserted
+
+    def backup(self, path, pages_per_step, step_sleep_seconds):
+        """Copy the database to path with SQLite's online backup API.
+
+        A commit from another connection mid-copy normally makes SQLite start
+        the copy again, which never finishes if writes arrive faster than a
+        full copy. The copy therefore reads from its own connection inside one
+        read transaction: in WAL mode that pins a consistent snapshot while
+        writers carry on appending to the WAL (which cannot be checkpointed
+        past the snapshot until the copy ends). Each step copies
+        pages_per_step pages and then pauses, so the copy's I/O does not
+        crowd out the poller. The copy uses rollback journaling, so it is a
+        self-contained file.
+        """
+        progress = {"pages": 0, "steps": 0}
+
+        def step(status, remaining, total):
+            progress["pages"] = total
+            progress["steps"] += 1
+            if remaining and step_sleep_seconds > 0:
+                time.sleep(step_sleep_seconds)
+
+        source = _open_connection(get_db_path())
+        target = sqlite3.connect(path)
+        try:
+            source.execute('BEGIN')
+            # The read transaction (and its snapshot) starts with the first read
+            source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+            source.backup(target, pages=max(1, pages_per_step), progress=step)
+            source.rollback()
+            target.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            target.close()
+            source.close()
+        return progress
+
+    def _channel_id(self, conn, sensor, channel):
+        """Return the id of a sensor channel, registering it on first use.
+
+        Must be called inside a transaction on conn.
+        """
+        key = (get_db_path(), sensor, channel)
+        with self._channel_ids_lock:
+            channel_id = self._channel_ids.get(key)
+        if channel_id is None:
+            conn.execute(
+                'INSERT OR IGNORE INTO sensor_channels (sensor, channel) VALUES (?, ?)',
+                (sensor, channel)
+            )
+            channel_id = conn.execute(
+                'SELECT id FROM sensor_channels WHERE sensor = ? AND channel = ?',
+                (sensor, channel)
+            ).fetchone()[0]
+            with self._channel_ids_lock:
+                self._channel_ids[key] = channel_id
+        return channel_id
+
+    def append_channels(self, readings):
+        conn = get_connection()
+        with conn:
+            rows = [
+                (self._channel_id(conn, sensor, channel), timestamp_ms, value)
+                for sensor, channel, timestamp_ms, value in readings
+            ]
+            # A repeated (channel, timestamp) keeps the latest value
+            conn.executemany(
+                'INSERT OR REPLACE INTO sensor_readings (channel_id, timestamp_ms, value) VALUES (?, ?, ?)',
+                rows
+            )
+        self._changed()
+
+    def channel_range(self, sensor, channel, start_ms, end_ms):
+        conn = get_connection()
+        known = conn.execute(
+            'SELECT id FROM sensor_channels WHERE sensor = ? AND channel = ?',
+            (sensor, channel)
+        ).fetchone()
+        if known is None:
+            return None
+        rows = conn.execute(
+            '''SELECT timestamp_ms, value FROM sensor_readings
+               WHERE channel_id = ? AND timestamp_ms BETWEEN ? AND ?
+               ORDER BY timestamp_ms DESC''',
+            (known[0], start_ms, end_ms)
+        ).fetchall()
+        return _with_archive(conn, known[0], rows, start_ms, end_ms)
+
+    def list_channels(self):
+        return get_connection().execute(
+            'SELECT sensor, channel FROM sensor_channels ORDER BY sensor, channel'
+        ).fetchall()
+
+    def usage(self):
+        """Return the database's size on disk (including its write-ahead log) and raw reading count.
+
+        Readings sealed into archive blocks are not counted.
+        """
+        db_path = get_db_path()
+        size = sum(os.path.getsize(path) for path in (db_path, db_path + '-wal') if os.path.exists(path))
+        count = get_connection().execute('SELECT COUNT(*) FROM temperature_readings').fetchone()[0]
+        return {"bytes": size, "readings": count}
+
+    @contextmanager
+    def snapshot(self):
+        """Run the block's reads in one read transaction on this thread's connection.
+
+        In WAL mode the transaction pins the database as of its first read, so
+        a reading the poller commits halfway through is seen by all of the
+        block's queries or by none.
+        """
+        conn = get_connection()
+        if conn.in_transaction:
+            yield
+            return
+        conn.execute('BEGIN')
+        try:
+            yield
+        finally:
+            conn.rollback()
+
+    def data_version(self):
+        """Return (db_path, generation), where generation changes with every commit.
+
+        PRAGMA data_version changes when another connection (another thread, or
+        the poller process) commits, but only relative to earlier reads on the
+        same connection, and not for the connection's own writes. Each thread
+        therefore remembers the value its connection last returned, and a
+        difference, a newly opened connection or a write through this backend
+        bumps a process-wide generation that every thread can compare.
+        """
+        conn = get_connection()
+        version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if _local.data_version != version:
+            _local.data_version = version
+            self._changed()
+        return get_db_path(), self._generation
+
+    def validator(self):
+        """Return the newest reading id and row counts of the readings, sensor and archive tables.
+
+        Appends raise the newest id, and compaction, which deletes or
+        archives readings, lowers the counts.
+        """
+        return tuple(get_connection().execute('''
+            SELECT (SELECT MAX(id) FROM temperature_readings), (SELECT COUNT(*) FROM temperature_readings),
+                   (SELECT MAX(timestamp_ms) FROM sensor_readings), (SELECT COUNT(*) FROM sensor_readings),
+                   (SELECT TOTAL(count) FROM archive_blocks)
+        ''').fetchone())
+
+    def range(self, start_ms, end_ms):
+        conn = get_connection()
+        rows = conn.execute(
+            '''SELECT timestamp_ms, temperature FROM temperature_readings
+               WHERE timestamp_ms BETWEEN ? AND ?
+               ORDER BY timestamp_ms DESC, id DESC''',
+            (start_ms, end_ms)
+        ).fetchall()
+        return _with_archive(conn, PRIMARY_SERIES, rows, start_ms, end_ms)
+
+    def latest(self):
+        return get_connection().execute(
+            '''SELECT timestamp_ms, temperature FROM temperature_readings
+               ORDER BY timestamp_ms DESC, id DESC LIMIT 1'''
+        ).fetchone()
+
+    def _expire_batch(self, conn, series_id, cutoff_ms, batch_size, archive):
+        """Archive (if enabled) and delete up to batch_size of a series' oldest expired readings.
+
+        Returns:
+            int: Number of raw readings removed
+        """
+        with conn:
+            if series_id == PRIMARY_SERIES:
+                rows = conn.execute(
+                    '''SELECT id, timestamp_ms, temperature FROM temperature_readings
+                       WHERE timestamp_ms < ? ORDER BY timestamp_ms, id LIMIT ?''',
+                    (cutoff_ms, batch_size)
+                ).fetchall()
+                if archive:
+                    _seal_readings(conn, series_id, [(ts, temp) for _, ts, temp in rows])
+                conn.executemany('DELETE FROM temperature_readings WHERE id = ?', [(row[0],) for row in rows])
+            else:
+                rows = conn.execute(
+                    '''SELECT timestamp_ms, value FROM sensor_readings
+                       WHERE channel_id = ? AND timestamp_ms < ? ORDER BY timestamp_ms LIMIT ?''',
+                    (series_id, cutoff_ms, batch_size)
+                ).fetchall()
+                if rows:
+                    if archive:
+                        _seal_readings(conn, series_id, rows)
+                    conn.execute(
+                        'DELETE FROM sensor_readings WHERE channel_id = ? AND timestamp_ms BETWEEN ? AND ?',
+                        (series_id, rows[0][0], rows[-1][0])
+                    )
+        return len(rows)
+
+    def prune(self, cutoff_ms, batch_size=COMPACTION_BATCH_SIZE, vacuum_pages=COMPACTION_VACUUM_PAGES):
+        """Expire readings from every series in short batched transactions and reclaim free pages.
+
+        Expired readings are sealed into compressed archive blocks before they
+        are deleted, unless ARCHIVE_RETENTION_PERIOD is zero; blocks older than
+        that are dropped. Minute rollups expire with the raw readings at
+        cutoff_ms; hour and day rollups are kept for ROLLUP_RETENTION_PERIOD.
+        """
+        batch_size = max(1, int(batch_size or COMPACTION_BATCH_SIZE))
+        archive = ARCHIVE_RETENTION_PERIOD > timedelta(0)
+        conn = get_connection()
+        channel_ids = [row[0] for row in conn.execute('SELECT id FROM sensor_channels').fetchall()]
+        deleted_rows = 0
+        batches = 0
+        for series_id in [PRIMARY_SERIES] + channel_ids:
+            while True:
+                deleted = self._expire_batch(conn, series_id, cutoff_ms, batch_size, archive)
+                deleted_rows += deleted
+                batches += 1
+                if deleted < batch_size:
+                    break
+
+        archive_cutoff_ms = _to_epoch_ms(datetime.now(timezone.utc) - ARCHIVE_RETENTION_PERIOD)
+        with conn:
+            # Only drop blocks whose whole day is past the archive retention
+            deleted_blocks = conn.execute(
+                'DELETE FROM archive_blocks WHERE block_ms < ?',
+                (bucket_start(archive_cutoff_ms, 'day'),)
+            ).rowcount
+
+        rollup_cutoff_ms = _to_epoch_ms(datetime.now(timezone.utc) - ROLLUP_RETENTION_PERIOD)
+        with conn:
+            deleted_rollups = conn.execute(
+                "DELETE FROM temperature_rollups WHERE resolution = 'minute' AND bucket_ms < ?",
+                (cutoff_ms,)
+            ).rowcount
+            deleted_rollups += conn.execute(
+                "DELETE FROM temperature_rollups WHERE resolution IN ('hour', 'day') AND bucket_ms < ?",
+                (rollup_cutoff_ms,)
+            ).rowcount
+            conn.execute('DELETE FROM temperature_histograms WHERE bucket_ms < ?', (rollup_cutoff_ms,))
+
+        self._changed()
+
+        vacuumed_pages = 0
+        if vacuum_pages > 0:
+            free_before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            # sqlite3's execute() steps a statement without result columns only once, which
+            # frees a single page; executescript() runs it to completion
+            conn.executescript(f'PRAGMA incremental_vacuum({int(vacuum_pages)})')
+            vacuumed_pages = free_before - conn.execute('PRAGMA freelist_count').fetchone()[0]
+
+        return {
+            "deleted_rows": deleted_rows,
+            "archived_rows": deleted_rows if archive else 0,
+            "batches": batches,
+            "deleted_rollups": deleted_rollups,
+            "deleted_blocks": deleted_blocks,
+            "vacuumed_pages": vacuumed_pages
+        }
+
+    def aggregate(self, resolution, start_ms, end_ms):
+        # Include the bucket that straddles start_ms
+        return get_connection().execute(
+            '''SELECT bucket_ms, min_temperature, max_temperature, sum_temperature, count
+               FROM temperature_rollups
+               WHERE resolution = ? AND bucket_ms BETWEEN ? AND ?
+               ORDER BY bucket_ms DESC''',
+            (resolution, bucket_start(start_ms, resolution), end_ms)
+        ).fetchall()
+
+    def summary(self, start_ms, end_ms):
+        """Summarize the window from whole day and hour rollups, reading raw rows only at the edges.
+
+        Cost grows with the number of buckets covering the window (one per day
+        plus at most 46 hours) and the sub-hour edges, not with its readings.
+        """
+        conn = get_connection()
+        parts = []
+        complete = True
+        for resolution, low, high in _rollup_cover(start_ms, end_ms, ('day', 'hour')):
+            if resolution is None:
+                parts.append(summarize([temperature for _, temperature in self.range(low, high)]))
+                continue
+            count, minimum, maximum, total, squares, unknown = conn.execute(
+                '''SELECT SUM(count), MIN(min_temperature), MAX(max_temperature), SUM(sum_temperature),
+                          SUM(sum_squares), COUNT(*) - COUNT(sum_squares)
+                   FROM temperature_rollups
+                   WHERE resolution = ? AND bucket_ms BETWEEN ? AND ?''',
+                (resolution, low, high)
+            ).fetchone()
+            if not count:
+                continue
+            complete = complete and not unknown
+            histogram = dict(conn.execute(
+                '''SELECT bin, SUM(count) FROM temperature_histograms
+                   WHERE resolution = ? AND bucket_ms BETWEEN ? AND ?
+                   GROUP BY bin''',
+                (resolution, low, high)
+            ).fetchall())
+            parts.append((count, minimum, maximum, total, squares, histogram))
+
+        parts = [part for part in parts if part[0]]
+        if not parts:
+            return summarize([])
+        histogram = {}
+        for part in parts:
+            for index, count in part[5].items():
+                histogram[index] = histogram.get(index, 0) + count
+        return (
+            sum(part[0] for part in parts),
+            min(part[1] for part in parts),
+            max(part[2] for part in parts),
+            sum(part[3] for part in parts),
+            sum(part[4] for part in parts) if complete else None,
+            histogram if complete else None
+        )
+
+    def iter_range(self, start_ms, end_ms, chunk_size):
+        conn = get_connection()
+        # One read transaction, so compaction moving readings into the archive
+        # mid-export cannot make them appear twice or not at all
+        with self.snapshot():
+            archived = _archived_readings(conn, PRIMARY_SERIES, start_ms, end_ms)
+            c = conn.execute(
+                '''SELECT timestamp_ms, temperature FROM temperature_readings
+                   WHERE timestamp_ms BETWEEN ? AND ?
+                   ORDER BY timestamp_ms DESC, id DESC''',
+                (start_ms, end_ms)
+            )
+            # Closing the cursors ends their reads even if the consumer stops early
+            try:
+                newest_archived = next(archived, None)
+                if newest_archived is None:
+                    while True:
+                        rows = c.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        yield rows
+                    return
+
+                # Both sides are pulled lazily: raw rows a chunk at a time, archive blocks a day at a time
+                def raw_rows():
+                    while True:
+                        rows = c.fetchmany(chunk_size)
+                        if not rows:
+                            return
+                        yield from rows
+
+                merged = heapq.merge(
+                    raw_rows(), itertools.chain([newest_archived], archived), key=lambda row: row[0], reverse=True
+                )
+                while True:
+                    rows = list(itertools.islice(merged, chunk_size))
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                archived.close()
+                c.close()
+
+    def newest(self, start_ms, end_ms, limit):
+        conn = get_connection()
+        with self.snapshot():
+            rows = conn.execute(
+                '''SELECT timestamp_ms, temperature FROM temperature_readings
+                   WHERE timestamp_ms BETWEEN ? AND ?
+                   ORDER BY timestamp_ms DESC, id DESC LIMIT ?''',
+                (start_ms, end_ms, limit)
+            ).fetchall()
+            # With limit raw rows, only archived readings at least as new as the oldest can displace one
+            if rows and len(rows) == limit:
+                start_ms = max(start_ms, rows[-1][0])
+            archived = _archived_readings(conn, PRIMARY_SERIES, start_ms, end_ms)
+            try:
+                merged = heapq.merge(rows, archived, key=lambda row: row[0], reverse=True)
+                return list(itertools.islice(merged, limit))
+            finally:
+                archived.close()
+
+    def columns(self, start_ms, end_ms):
+        rows = self.range(start_ms, end_ms)
+        return array('q', [row[0] for row in rows]), array('d', [row[1] for row in rows])
+
+    def page(self, start_ms, end_ms, limit, before=None, after=None):
+        """Keyset page on (timestamp_ms, id) using the timestamp index.
+
+        Archived readings have no id, so pages only cover raw retention.
+        """
+        conn = get_connection()
+        if after is not None:
+            cursor_ms, cursor_id = after
+            # Walk forward in time from the cursor, then flip to newest-first
+            rows = conn.execute(
+                '''SELECT id, timestamp_ms, temperature FROM temperature_readings
+                   WHERE timestamp_ms BETWEEN max(?, ?) AND ?
+                     AND (timestamp_ms > ? OR id > ?)
+                   ORDER BY timestamp_ms ASC, id ASC LIMIT ?''',
+                (start_ms, cursor_ms, end_ms, cursor_ms, cursor_id, limit)
+            ).fetchall()
+            next_row = rows[-1] if len(rows) == limit else None
+            rows.reverse()
+        else:
+            if before is not None:
+                cursor_ms, cursor_id = before
+                end_ms = min(end_ms, cursor_ms)
+            else:
+                cursor_ms, cursor_id = end_ms + 1, 0
+            rows = conn.execute(
+                '''SELECT id, timestamp_ms, temperature FROM temperature_readings
+                   WHERE timestamp_ms BETWEEN ? AND ?
+                     AND (timestamp_ms < ? OR id < ?)
+                   ORDER BY timestamp_ms DESC, id DESC LIMIT ?''',
+                (start_ms, end_ms, cursor_ms, cursor_id, limit)
+            ).fetchall()
+            next_row = rows[-1] if len(rows) == limit else None
+
+        next_key = (next_row[1], next_row[0]) if next_row else None
+        return [(ts, temp) for _, ts, temp in rows], next_key
+
+def init_db():
+    """Initialize the configured storage backend (for SQLite, create and migrate the database)."""
+    get_backend().initialize()
+
+def _validate_temperature(temperature):
+    """Return temperature as a float, rejecting values outside -50°C to 50°C.
 
-def store_temperature(temperature: float):
-    """Store a temperature reading with current timestamp.
-    
-    Args:
-        temperature: Temperature reading in Celsius
-        
     Raises:
-        ValueError: If temperature is None, not a number, or outside valid range (-50 to 50°C)
+        ValueError: If temperature is None, not a number, or outside the valid range
     """
     # Validate temperature value
     if temperature is None:
@@ -41,80 +1006,629 @@ def store_temperature(temperature: float):
         temperature = float(temperature)
     except (TypeError, ValueError):
         raise ValueError("Temperature must be a number")
-        
+
     # Validate temperature range (-50°C to 50°C)
     if temperature < -50 or temperature > 50:
         raise ValueError("Temperature must be between -50°C and 50°C")
-        
-    conn = sqlite3.connect(get_db_path())
-    c = conn.cursor()
-    
-    # Store new reading
-    timestamp = datetime.now(timezone.utc).isoformat()
-    c.execute(
-        'INSERT INTO temperature_readings (temperature, timestamp) VALUES (?, ?)',
-        (temperature, timestamp)
-    )
-    
-    # Delete old readings
-    cutoff = (datetime.now(timezone.utc) - DATA_RETENTION_PERIOD).isoformat()
-    c.execute('DELETE FROM temperature_readings WHERE timestamp < ?', (cutoff,))
-    
-    conn.commit()
-    conn.close()
+    return temperature
+
+def _validate_channel_value(channel, value):
+    """Return a sensor channel reading as a float, rejecting implausible values.
+
+    Temperature channels share the -50°C to 50°C range of the primary reading;
+    humidity channels must be a percentage.
+
+    Raises:
+        ValueError: If value is not a number or outside the channel's range
+    """
+    if channel.endswith('temperature'):
+        return _validate_temperature(value)
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{channel} must be a number")
+    if channel.endswith('humidity') and not 0 <= value <= 100:
+        raise ValueError(f"{channel} must be between 0% and 100%")
+    return value
+
+@timed('store_temperature')
+def store_temperature(temperature: float):
+    """Store a temperature reading with current timestamp.
 
-def fetch_temperature_history(start_time=None, end_time=None):
-    """Fetch temperature readings within the specified time range.
-    Returns readings in reverse chronological order (newest first).
-    
     Args:
-        start_time: datetime object for start of range (default: 14 days ago)
-        end_time: datetime object for end of range (default: now)
+        temperature: Temperature reading in Celsius
+
+    Raises:
+        ValueError: If temperature is None, not a number, or outside valid range (-50 to 50°C)
+    """
+    temperature = _validate_temperature(temperature)
+    # Expired readings are removed separately by compact_database()
+    get_backend().append([(_to_epoch_ms(datetime.now(timezone.utc)), temperature)])
+
+class BufferedWriter:
+    """Collects readings in memory and commits them to the database in batches.
+
+    A batch is written in a single transaction (one fsync) once max_size polls
+    are pending or the oldest pending poll is max_age_seconds old. Readings
+    still in memory are lost if the process dies, so max_age_seconds is the
+    maximum data-loss window; call flush() on shutdown.
+    """
+
+    def __init__(self, max_size=WRITE_BUFFER_SIZE, max_age_seconds=WRITE_BUFFER_MAX_AGE_SECONDS):
+        self.max_size = max(1, int(max_size))
+        self.max_age_seconds = max_age_seconds
+        self._readings = []
+        self._channel_readings = []
+        self._polls = 0
+        self._oldest = None
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        """Number of readings waiting to be written."""
+        return len(self._readings) + len(self._channel_readings)
+
+    def add(self, temperature: float, channels=()):
+        """Buffer one poll's readings stamped with the current time.
+
+        Flushes the buffer when the size or age threshold is reached. Channel
+        readings outside their valid range are logged and dropped.
+
+        Args:
+            temperature: Primary temperature in Celsius, or None if only channels were read
+            channels: (sensor, channel, value) readings from every attached sensor
+
+        Raises:
+            ValueError: If temperature is not a number or outside valid range (-50 to 50°C)
+        """
+        if temperature is not None:
+            temperature = _validate_temperature(temperature)
+        valid_channels = []
+        for sensor, channel, value in channels:
+            try:
+                valid_channels.append((sensor, channel, _validate_channel_value(channel, value)))
+            except ValueError as e:
+                print(f"Skipping reading from sensor {sensor}: {str(e)}")
+        if temperature is None and not valid_channels:
+            return
+
+        with self._lock:
+            if not self._polls:
+                self._oldest = time.monotonic()
+            timestamp_ms = _to_epoch_ms(datetime.now(timezone.utc))
+            if temperature is not None:
+                self._readings.append((timestamp_ms, temperature))
+            self._channel_readings.extend(
+                (sensor, channel, timestamp_ms, value) for sensor, channel, value in valid_channels
+            )
+            self._polls += 1
+            if self._is_due():
+                self._flush()
+
+    def flush(self):
+        """Write all pending readings in one transaction.
+
+        Returns:
+            int: Number of readings written
+        """
+        with self._lock:
+            return self._flush()
+
+    def _is_due(self):
+        return (
+            self._polls >= self.max_size
+            or time.monotonic() - self._oldest >= self.max_age_seconds
+        )
+
+    @timed('flush_readings')
+    def _flush(self):
+        written = 0
+        backend = get_backend()
+        # On failure the unwritten readings stay buffered and are retried on the next flush
+        if self._channel_readings:
+            backend.append_channels(self._channel_readings)
+            written += len(self._channel_readings)
+            self._channel_readings = []
+        if self._readings:
+            backend.append(self._readings)
+            written += len(self._readings)
+            self._readings = []
+        self._polls = 0
+        self._oldest = None
+        return written
+
+@timed('compact_database')
+def compact_database(batch_size=COMPACTION_BATCH_SIZE, vacuum_pages=COMPACTION_VACUUM_PAGES):
+    """Expire readings older than the retention period and reclaim free pages.
+
+    With the SQLite backend, expired readings are first sealed into compressed
+    archive blocks (see app/archive.py) that history queries still read.
+    Rows are deleted in batches of at most batch_size, each in its own short
+    transaction, so the poller is never locked out for long.
+
+    Args:
+        batch_size: Maximum number of rows deleted per transaction
+        vacuum_pages: Maximum number of free pages released by incremental vacuum (0 to skip)
+
+    Returns:
+        dict: deleted_rows, archived_rows, batches, deleted_rollups, deleted_blocks,
+        vacuumed_pages and duration_seconds
+    """
+    started = time.perf_counter()
+    cutoff_ms = _to_epoch_ms(datetime.now(timezone.utc) - DATA_RETENTION_PERIOD)
+    report = get_backend().prune(cutoff_ms, batch_size=batch_size, vacuum_pages=vacuum_pages)
+    report["duration_seconds"] = time.perf_counter() - started
+    return report
+
+def _snapshot_prefix():
+    """Return the file name prefix of snapshots of the current database."""
+    return os.path.splitext(os.path.basename(get_db_path()))[0] + '-'
+
+def list_backups(directory=BACKUP_DIR):
+    """Return the paths of the current database's snapshots in directory, oldest first."""
+    prefix = _snapshot_prefix()
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [
+        os.path.join(directory, name) for name in sorted(names)
+        if name.startswith(prefix) and name.endswith(('.db', '.db.gz'))
+    ]
+
+@timed('backup_database')
+def backup_database(directory=BACKUP_DIR, compress=BACKUP_COMPRESS, keep=BACKUP_KEEP,
+                    pages_per_step=BACKUP_PAGES_PER_STEP, step_sleep_ms=BACKUP_STEP_SLEEP_MS):
+    """Write a consistent snapshot of the database without blocking writers.
+
+    The snapshot is named after the database and the UTC time, e.g.
+    temperature-20240301T000000Z.db.gz, and is written under a temporary
+    name first, so a snapshot that exists is always complete. Older
+    snapshots beyond the newest keep are deleted afterwards.
+
+    Args:
+        directory: Directory to write the snapshot to (created if missing)
+        compress: Gzip the snapshot
+        keep: Number of snapshots to keep, including this one (0 keeps all)
+        pages_per_step: Database pages copied per backup step
+        step_sleep_ms: Pause between steps, in milliseconds
+
+    Returns:
+        dict: path, bytes (snapshot file size), database_bytes (uncompressed size),
+        pages, steps, deleted_backups and duration_seconds
+
+    Raises:
+        NotImplementedError: If the storage backend cannot take snapshots
+    """
+    started = time.perf_counter()
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    path = os.path.join(directory, f'{_snapshot_prefix()}{stamp}.db')
+    partial = path + '.partial'
+    try:
+        report = get_backend().backup(partial, pages_per_step, step_sleep_ms / 1000)
+        report["database_bytes"] = os.path.getsize(partial)
+        if compress:
+            with open(partial, 'rb') as source, gzip.open(partial + '.gz', 'wb', compresslevel=6) as target:
+                shutil.copyfileobj(source, target, 1024 * 1024)
+            os.remove(partial)
+            partial, path = partial + '.gz', path + '.gz'
+        os.replace(partial, path)
+    finally:
+        for leftover in (partial, partial + '.gz'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    expired = list_backups(directory)[:-keep] if keep > 0 else []
+    for old in expired:
+        os.remove(old)
+    report.update({
+        "path": path,
+        "bytes": os.path.getsize(path),
+        "deleted_backups": len(expired),
+        "duration_seconds": time.perf_counter() - started
+    })
+    return report
+
+def _import_timestamp(timestamp):
+    """Return an imported reading's timestamp as epoch milliseconds.
+
+    Accepts datetimes, epoch-millisecond numbers (or strings of digits) and
+    ISO-8601 strings with a trailing Z, an offset or no zone (taken as UTC).
+
+    Raises:
+        ValueError: If the timestamp cannot be interpreted
+    """
+    if isinstance(timestamp, str):
+        # Epoch milliseconds are tried first as the cheapest to parse
+        try:
+            return int(timestamp)
+        except ValueError:
+            pass
+        timestamp = timestamp.strip()
+        if timestamp.endswith(('Z', 'z')):
+            timestamp = timestamp[:-1] + '+00:00'
+        return _to_epoch_ms(datetime.fromisoformat(timestamp))
+    if isinstance(timestamp, datetime):
+        return _to_epoch_ms(timestamp)
+    if isinstance(timestamp, (int, float)) and not isinstance(timestamp, bool):
+        if not math.isfinite(timestamp):
+            raise ValueError("Timestamp must be finite")
+        return int(timestamp)
+    raise ValueError("Timestamp must be a datetime, epoch milliseconds or an ISO-8601 string")
+
+def import_readings(readings, batch_size=IMPORT_BATCH_SIZE):
+    """Bulk-load historical readings with explicit timestamps (backfills).
+
+    Readings are validated like store_temperature() (invalid ones are counted
+    and skipped) and stored in batches of batch_size, one transaction each.
+    Readings whose timestamp is already stored, or repeated in the input,
+    are skipped, so re-running an import is harmless. Readings older than
+    the retention period are archived by the next compact_database().
+
+    Args:
+        readings: Iterable of (timestamp, temperature) pairs; timestamps may be
+            datetimes, epoch milliseconds or ISO-8601 strings (see _import_timestamp)
+        batch_size: Maximum number of readings per transaction
+
+    Returns:
+        dict: inserted, skipped (duplicates), invalid, batches and duration_seconds
+    """
+    started = time.perf_counter()
+    backend = get_backend()
+    report = {"inserted": 0, "skipped": 0, "invalid": 0, "batches": 0}
+    readings = iter(readings)
+    while True:
+        chunk = list(itertools.islice(readings, batch_size))
+        if not chunk:
+            break
+        batch = []
+        for timestamp, temperature in chunk:
+            try:
+                batch.append((_import_timestamp(timestamp), _validate_temperature(temperature)))
+            except (TypeError, ValueError, OverflowError):
+                report["invalid"] += 1
+        if batch:
+            inserted = backend.import_readings(batch)
+            report["inserted"] += inserted
+            report["skipped"] += len(batch) - inserted
+            report["batches"] += 1
+    report["duration_seconds"] = time.perf_counter() - started
+    return report
+
+def _time_range(start_time, end_time):
+    """Resolve optional datetimes to an epoch-millisecond (start_ms, end_ms) range.
+
+    end_time defaults to now and start_time to DATA_RETENTION_PERIOD before it.
     """
-    conn = sqlite3.connect(get_db_path())
-    c = conn.cursor()
-    
-    # Use provided times or defaults
     if end_time is None:
         end_time = datetime.now(timezone.utc)
     if start_time is None:
         start_time = end_time - DATA_RETENTION_PERIOD
-    
-    # Convert to ISO format for SQLite
-    start_iso = start_time.isoformat()
-    end_iso = end_time.isoformat()
-    
-    c.execute(
-        'SELECT temperature, timestamp FROM temperature_readings WHERE timestamp BETWEEN ? AND ? ORDER BY timestamp DESC',
-        (start_iso, end_iso)
+    return _to_epoch_ms(start_time), _to_epoch_ms(end_time)
+
+@timed('fetch_temperature_history')
+def fetch_temperature_history(start_time=None, end_time=None):
+    """Fetch temperature readings within the specified time range.
+    Returns readings in reverse chronological order (newest first). Ranges
+    starting within READ_CACHE_WINDOW_MINUTES of now are served from the
+    read cache until new data is committed.
+
+    Args:
+        start_time: datetime object for start of range (default: 14 days ago)
+        end_time: datetime object for end of range (default: now)
+    """
+    return [
+        {"temperature": temp, "collected_at": _from_epoch_ms(ts)}
+        for ts, temp in _read_cache.range(get_backend(), *_time_range(start_time, end_time))
+    ]
+
+def fetch_readings_after(timestamp_ms, limit=None):
+    """Fetch the readings stamped after timestamp_ms, oldest first.
+
+    Used by the live stream to find new readings and to replay the ones a
+    reconnecting client missed.
+
+    Args:
+        timestamp_ms: Epoch milliseconds of the last reading already seen
+        limit: Keep only the newest this many readings (default: all); the
+            rest are never read
+
+    Returns:
+        list: Reading dicts as from fetch_temperature_history(), plus their timestamp_ms
+    """
+    backend = get_backend()
+    if limit is None:
+        rows = backend.range(timestamp_ms + 1, _MAX_MS)
+    else:
+        rows = backend.newest(timestamp_ms + 1, _MAX_MS, limit)
+    return [
+        {"temperature": temp, "collected_at": _from_epoch_ms(ts), "timestamp_ms": ts}
+        for ts, temp in reversed(rows)
+    ]
+
+def fetch_dashboard_snapshot(start_time, after_ms=None):
+    """Fetch the latest reading and a chart window of readings from one consistent read.
+
+    Both come from the read cache inside a storage snapshot, so the latest
+    reading is always the window's newest one when the window has any.
+
+    Args:
+        start_time: datetime object for the start of the window
+        after_ms: Only return window readings stamped after this epoch-millisecond
+            cursor, for clients that already hold the rest
+
+    Returns:
+        tuple: (latest, readings): the latest reading dict (as from
+            fetch_readings_after(), so with its timestamp_ms) or None, and the
+            window's reading dicts newest first
+    """
+    backend = get_backend()
+    start_ms = _to_epoch_ms(start_time)
+    if after_ms is not None:
+        start_ms = max(start_ms, after_ms + 1)
+    with backend.snapshot():
+        rows = _read_cache.range(backend, start_ms, _MAX_MS)
+        latest = rows[0] if rows else _read_cache.latest(backend)
+    if latest is not None:
+        latest = {"temperature": latest[1], "collected_at": _from_epoch_ms(latest[0]), "timestamp_ms": latest[0]}
+    return latest, [
+        {"temperature": temp, "collected_at": _from_epoch_ms(ts), "timestamp_ms": ts}
+        for ts, temp in rows
+    ]
+
+def fetch_temperature_columns(start_time=None, end_time=None):
+    """Fetch readings within the time range as parallel columns, newest first.
+
+    Skips building per-reading dicts; used by the binary export.
+
+    Args:
+        start_time: datetime object for start of range (default: 14 days ago)
+        end_time: datetime object for end of range (default: now)
+
+    Returns:
+        tuple: (array('q') of epoch-millisecond timestamps, array('d') of temperatures)
+    """
+    return get_backend().columns(*_time_range(start_time, end_time))
+
+def iter_temperature_history(start_time=None, end_time=None, chunk_size=HISTORY_STREAM_CHUNK_SIZE):
+    """Yield readings within the time range in batches, newest first.
+
+    With the SQLite backend rows are pulled with fetchmany(), so memory use is
+    bounded by chunk_size no matter how large the range is.
+
+    Args:
+        start_time: datetime object for start of range (default: 14 days ago)
+        end_time: datetime object for end of range (default: now)
+        chunk_size: Number of readings per yielded batch
+
+    Yields:
+        list: Reading dicts with the same shape as fetch_temperature_history()
+    """
+    rows = get_backend().iter_range(*_time_range(start_time, end_time), chunk_size)
+    try:
+        for chunk in rows:
+            yield [
+                {"temperature": temp, "collected_at": _from_epoch_ms(ts)}
+                for ts, temp in chunk
+            ]
+    finally:
+        rows.close()
+
+def encode_cursor(timestamp_ms, reading_id):
+    """Build the opaque pagination cursor for a reading."""
+    return f"{timestamp_ms}_{reading_id}"
+
+def decode_cursor(cursor):
+    """Split a pagination cursor into (timestamp_ms, reading_id).
+
+    Raises:
+        ValueError: If the cursor is malformed or out of SQLite's integer range
+    """
+    try:
+        timestamp_ms, reading_id = cursor.split('_')
+        timestamp_ms, reading_id = int(timestamp_ms), int(reading_id)
+    except (AttributeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not (0 <= timestamp_ms <= _MAX_MS and 0 <= reading_id <= _MAX_MS):
+        raise ValueError("Invalid cursor")
+    return timestamp_ms, reading_id
+
+def fetch_temperature_page(start_time=None, end_time=None, limit=100, before=None, after=None):
+    """Fetch one page of readings using keyset pagination on (timestamp, id).
+    Readings are always returned in reverse chronological order (newest first).
+
+    Args:
+        start_time: datetime object for start of range (default: 14 days ago)
+        end_time: datetime object for end of range (default: now)
+        limit: Maximum number of readings in the page
+        before: Cursor; return the readings immediately older than it
+        after: Cursor; return the readings immediately newer than it
+
+    Returns:
+        tuple: (readings, next_cursor). next_cursor continues in the same
+        direction and is None once the range is exhausted.
+
+    Raises:
+        ValueError: If a cursor is malformed or both before and after are given
+    """
+    if before is not None and after is not None:
+        raise ValueError("Use either before or after, not both")
+
+    rows, next_key = get_backend().page(
+        *_time_range(start_time, end_time),
+        limit,
+        before=decode_cursor(before) if before is not None else None,
+        after=decode_cursor(after) if after is not None else None
     )
-    
     readings = [
-        {"temperature": temp, "collected_at": ts}
-        for temp, ts in c.fetchall()
+        {"temperature": temp, "collected_at": _from_epoch_ms(ts)}
+        for ts, temp in rows
+    ]
+    next_cursor = encode_cursor(*next_key) if next_key else None
+    return readings, next_cursor
+
+def fetch_temperature_rollups(resolution, start_time=None, end_time=None):
+    """Fetch aggregated readings per minute, hour or day within a time range.
+    Returns buckets in reverse chronological order (newest first).
+
+    Args:
+        resolution: One of ROLLUP_RESOLUTIONS ('minute', 'hour' or 'day')
+        start_time: datetime object for start of range (default: 14 days ago)
+        end_time: datetime object for end of range (default: now)
+
+    Raises:
+        ValueError: If resolution is not a known rollup resolution
+    """
+    if resolution not in ROLLUP_RESOLUTIONS:
+        raise ValueError(f"Resolution must be one of: {', '.join(ROLLUP_RESOLUTIONS)}")
+
+    return [
+        {
+            "temperature": total / count,
+            "collected_at": _from_epoch_ms(bucket),
+            "min_temperature": low,
+            "max_temperature": high,
+            "count": count
+        }
+        for bucket, low, high, total, count in get_backend().aggregate(
+            resolution, *_time_range(start_time, end_time)
+        )
     ]
-    
-    conn.close()
-    return readings
+
+# Percentiles /temperature/stats reports when none are requested
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+def _histogram_percentiles(histogram, count, minimum, maximum, percentiles):
+    """Estimate percentiles from histogram bin counts, interpolating linearly within a bin."""
+    bins = sorted(histogram.items())
+    estimates = {}
+    for percentile in percentiles:
+        rank = percentile / 100 * count
+        value = maximum
+        seen = 0
+        for index, bin_count in bins:
+            if seen + bin_count >= rank:
+                value = (index + (rank - seen) / bin_count) / HISTOGRAM_BINS_PER_DEGREE
+                break
+            seen += bin_count
+        # The bin edges can overshoot the readings actually seen
+        estimates[f"p{percentile:g}"] = round(min(max(value, minimum), maximum), 4)
+    return estimates
+
+def fetch_temperature_stats(start_time=None, end_time=None, percentiles=DEFAULT_PERCENTILES):
+    """Summarize the readings within a time range.
+
+    With the SQLite backend the summary is assembled from hour and day
+    rollups and their 1/16 °C histograms, so long windows cost about as much
+    as short ones. Percentiles are estimated from the histogram and are
+    accurate to within one bin.
+
+    Args:
+        start_time: datetime object for start of range (default: 14 days ago)
+        end_time: datetime object for end of range (default: now)
+        percentiles: Percentiles to estimate, each between 0 and 100
+
+    Returns:
+        dict: count, min, max, mean, stddev (population) and percentiles
+        ({"p50": value, ...}). Values are None for an empty range; stddev and
+        percentiles are also None when the range includes rollups recorded
+        before their spread was tracked.
+
+    Raises:
+        ValueError: If a percentile is outside 0 to 100
+    """
+    if any(not 0 <= percentile <= 100 for percentile in percentiles):
+        raise ValueError("Percentiles must be between 0 and 100")
+
+    count, minimum, maximum, total, squares, histogram = get_backend().summary(
+        *_time_range(start_time, end_time)
+    )
+    stats = {
+        "count": count,
+        "min": minimum,
+        "max": maximum,
+        "mean": total / count if count else None,
+        "stddev": None,
+        "percentiles": {f"p{percentile:g}": None for percentile in percentiles}
+    }
+    if count and squares is not None:
+        # Clamp the rounding error that can make a near-zero variance negative
+        stats["stddev"] = math.sqrt(max(0.0, squares / count - stats["mean"] ** 2))
+        stats["percentiles"] = _histogram_percentiles(histogram, count, minimum, maximum, percentiles)
+    return stats
+
+def list_sensor_channels():
+    """Return every sensor that has reported readings, with its channel names.
+
+    Returns:
+        list: {"sensor": id, "channels": [names]} dicts sorted by sensor id
+    """
+    sensors = {}
+    for sensor, channel in get_backend().list_channels():
+        sensors.setdefault(sensor, []).append(channel)
+    return [{"sensor": sensor, "channels": channels} for sensor, channels in sensors.items()]
+
+def fetch_sensor_history(sensor, channel, start_time=None, end_time=None):
+    """Fetch one sensor channel's readings within a time range.
+    Returns readings in reverse chronological order (newest first), or None
+    if the sensor has never reported that channel.
+
+    Args:
+        sensor: Sensor id, as returned by list_sensor_channels()
+        channel: Channel name (e.g. 'external_temperature' or 'internal_humidity')
+        start_time: datetime object for start of range (default: 14 days ago)
+        end_time: datetime object for end of range (default: now)
+    """
+    rows = get_backend().channel_range(sensor, channel, *_time_range(start_time, end_time))
+    if rows is None:
+        return None
+    return [{"value": value, "collected_at": _from_epoch_ms(ts)} for ts, value in rows]
+
+def data_version():
+    """Return a token that changes whenever stored readings change, or None if the backend cannot tell.
+
+    Tokens are only meaningful within this process (see StorageBackend.data_version()).
+    """
+    return get_backend().data_version()
+
+def storage_usage():
+    """Return the storage backend's size on disk and reading count (see StorageBackend.usage())."""
+    return get_backend().usage()
+
+def data_validator():
+    """Return a token for the stored data that is equal in every process, or None if the backend cannot tell.
+
+    The token is recomputed only when data_version() changes (see
+    StorageBackend.validator()).
+    """
+    global _validator
+    backend = get_backend()
+    version = backend.data_version()
+    if version is None:
+        return None
+    key = (id(backend), version)
+    with _validator_lock:
+        if _validator is not None and _validator[0] == key:
+            return _validator[1]
+    validator = backend.validator()
+    with _validator_lock:
+        _validator = (key, validator)
+    return validator
+
+def read_cache_stats():
+    """Return the read cache's hit and miss counters for this process."""
+    return _read_cache.stats()
 
 def get_latest_temperature():
-    """Fetch the most recent temperature reading.
+    """Fetch the most recent temperature reading (through the read cache).
     Returns None if no readings are available.
     """
-    conn = sqlite3.connect(get_db_path())
-    c = conn.cursor()
-    
-    c.execute(
-        'SELECT temperature, timestamp FROM temperature_readings ORDER BY timestamp DESC LIMIT 1'
-    )
-    
-    result = c.fetchone()
-    conn.close()
-    
+    result = _read_cache.latest(get_backend())
     if result is None:
         return None
-        
+
     return {
-        "temperature": result[0],
-        "collected_at": result[1]
-    } 
\ No newline at end of file
+        "temperature": result[1],
+        "collected_at": _from_epoch_ms(result[0])
+    }
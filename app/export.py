@@ -0,0 +1,101 @@
+import struct
+import sys
+from array import array
+
+# Columnar export layout (all values little-endian):
+#   header      magic b'TBCF', version (uint8), flags (uint8), 2 pad bytes, count (uint32)
+#   timestamps  count x int64 epoch milliseconds, or with FLAG_DELTA the first
+#               timestamp as int64 followed by count - 1 int32 differences
+#   values      count x float32 temperatures in Celsius
+# Rows are in the same order as the JSON API (newest first).
+COLUMNAR_MIMETYPE = 'application/vnd.temperbot.columnar'
+MAGIC = b'TBCF'
+VERSION = 1
+FLAG_DELTA = 0x01
+
+_HEADER = struct.Struct('<4sBBxxI')
+_INT32_MIN = -2**31
+_INT32_MAX = 2**31 - 1
+
+def _little_endian(values):
+    """Return the raw little-endian bytes of an array."""
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _from_little_endian(typecode, data):
+    """Build an array from raw little-endian bytes."""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+def encode_columnar(timestamps_ms, temperatures, delta=False):
+    """Pack parallel timestamp and temperature columns into the binary export format.
+
+    Args:
+        timestamps_ms: Sequence of epoch-millisecond timestamps
+        temperatures: Sequence of temperatures, same length as timestamps_ms
+        delta: Store timestamps as int32 differences; ignored if a gap does not fit
+
+    Returns:
+        bytes: The encoded payload
+
+    Raises:
+        ValueError: If the columns have different lengths
+    """
+    if len(timestamps_ms) != len(temperatures):
+        raise ValueError("Timestamp and temperature columns must have the same length")
+
+    flags = 0
+    timestamp_bytes = None
+    if delta and timestamps_ms:
+        deltas = [later - earlier for earlier, later in zip(timestamps_ms, timestamps_ms[1:])]
+        if all(_INT32_MIN <= d <= _INT32_MAX for d in deltas):
+            flags |= FLAG_DELTA
+            timestamp_bytes = (
+                _little_endian(array('q', timestamps_ms[:1])) + _little_endian(array('i', deltas))
+            )
+    if timestamp_bytes is None:
+        timestamp_bytes = _little_endian(array('q', timestamps_ms))
+
+    return b''.join((
+        _HEADER.pack(MAGIC, VERSION, flags, len(timestamps_ms)),
+        timestamp_bytes,
+        _little_endian(array('f', temperatures)),
+    ))
+
+def decode_columnar(payload):
+    """Unpack a payload produced by encode_columnar().
+
+    Returns:
+        tuple: (array('q') of epoch-millisecond timestamps, array('f') of temperatures)
+
+    Raises:
+        ValueError: If the payload is not a valid columnar export
+    """
+    if len(payload) < _HEADER.size:
+        raise ValueError("Payload too short for a columnar export")
+    magic, version, flags, count = _HEADER.unpack_from(payload)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a columnar export (bad magic or version)")
+
+    offset = _HEADER.size
+    if flags & FLAG_DELTA and count:
+        timestamp_size = 8 + 4 * (count - 1)
+    else:
+        timestamp_size = 8 * count
+    if len(payload) != offset + timestamp_size + 4 * count:
+        raise ValueError("Columnar export has the wrong length for its row count")
+
+    timestamp_data = payload[offset:offset + timestamp_size]
+    if flags & FLAG_DELTA and count:
+        timestamps = _from_little_endian('q', timestamp_data[:8])
+        for difference in _from_little_endian('i', timestamp_data[8:]):
+            timestamps.append(timestamps[-1] + difference)
+    else:
+        timestamps = _from_little_endian('q', timestamp_data)
+    temperatures = _from_little_endian('f', payload[offset + timestamp_size:])
+    return timestamps, temperatures
@@ -1,32 +1,81 @@
 from app.temper import Temper
+from app.metrics import timed
 from config import TEMPERATURE_SOURCE
 
-def read_temperature() -> float:
+# Reading keys reported by Temper.read(), mapped to the channel names used in storage and the API
+CHANNELS = {
+    'internal temperature': 'internal_temperature',
+    'external temperature': 'external_temperature',
+    'internal humidity': 'internal_humidity',
+    'external humidity': 'external_humidity',
+}
+
+@timed('read_devices')
+def read_devices() -> list:
+    """Read every attached USB temperature sensor once.
+    Returns the per-device dictionaries from Temper.read(), or an empty list on error.
+    """
+    try:
+        return Temper().read()
+    except Exception as e:
+        print(f"Error reading temperature sensors: {str(e)}")
+        return []
+
+def sensor_id(device: dict, index: int) -> str:
+    """Return a stable identifier for a device.
+
+    Uses the sysfs port name (e.g. '1-1.2'), which stays the same across
+    replugs into the same port, falling back to the bus/device numbers and
+    finally to the device's position in the read.
+    """
+    if device.get('port'):
+        return device['port']
+    if 'busnum' in device and 'devnum' in device:
+        return f"{device['busnum']}-{device['devnum']}"
+    return str(index)
+
+def sensor_channels(devices: list) -> list:
+    """Flatten device readings into (sensor, channel, value) tuples for every device and channel.
+    Devices that reported an error are skipped.
+    """
+    readings = []
+    for index, device in enumerate(devices):
+        if 'error' in device:
+            print(f"Error reading sensor {sensor_id(device, index)}: {device['error']}")
+            continue
+        for key, channel in CHANNELS.items():
+            if key in device:
+                readings.append((sensor_id(device, index), channel, device[key]))
+    return readings
+
+def read_temperature(devices: list = None) -> float:
     """Read temperature from a USB temperature sensor using the Temper class.
     Returns the temperature in Celsius from the configured source (internal or external).
     If no sensor is found or there's an error, returns None.
+
+    Args:
+        devices: Results of read_devices() to use instead of reading the sensors again
     """
     try:
-        temper = Temper()
-        results = temper.read()
-        
+        results = read_devices() if devices is None else devices
+
         if not results:
             print("No temperature sensors found")
             return None
-            
+
         # Get the first sensor's temperature from configured source
         sensor_data = results[0]
         if 'error' in sensor_data:
             print(f"Error reading sensor: {sensor_data['error']}")
             return None
-            
+
         temp_key = f"{TEMPERATURE_SOURCE} temperature"
         if temp_key not in sensor_data:
             print(f"No {TEMPERATURE_SOURCE} temperature reading available")
             return None
-            
+
         return sensor_data[temp_key]
-        
+
     except Exception as e:
         print(f"Error reading temperature: {str(e)}")
-        return None 
\ No newline at end of file
+        return None
@@ -0,0 +1,153 @@
+import argparse
+import csv
+import io
+import itertools
+import json
+import os
+import sys
+from app.database import init_db, import_readings
+
+# Recognised column (or object key) names, in order of preference
+TIMESTAMP_FIELDS = ('collected_at', 'timestamp', 'timestamp_ms', 'time')
+TEMPERATURE_FIELDS = ('temperature', 'value')
+
+FORMATS = ('csv', 'json', 'ndjson')
+_EXTENSIONS = {'.csv': 'csv', '.json': 'json', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+def _field(names, candidates, kind):
+    """Return the first of candidates present in names.
+
+    Raises:
+        ValueError: If none is present
+    """
+    for candidate in candidates:
+        if candidate in names:
+            return candidate
+    raise ValueError(f"No {kind} field (expected one of: {', '.join(candidates)})")
+
+def read_csv(lines):
+    """Yield (timestamp, temperature) pairs from CSV lines.
+
+    A header row naming the columns (see TIMESTAMP_FIELDS and
+    TEMPERATURE_FIELDS) is optional; without one the first two columns are
+    the timestamp and the temperature. Blank lines are skipped and short rows
+    are yielded as (None, None), which import_readings() counts as invalid.
+
+    Raises:
+        ValueError: If the header names no timestamp or temperature column
+    """
+    # csv yields an empty row for a blank line
+    rows = filter(None, csv.reader(lines))
+    first = next(rows, None)
+    if first is None:
+        return
+    names = [cell.strip().lower() for cell in first]
+    if set(names) & set(TIMESTAMP_FIELDS + TEMPERATURE_FIELDS):
+        timestamp_index = names.index(_field(names, TIMESTAMP_FIELDS, 'timestamp'))
+        temperature_index = names.index(_field(names, TEMPERATURE_FIELDS, 'temperature'))
+    else:
+        timestamp_index, temperature_index = 0, 1
+        rows = itertools.chain([first], rows)
+
+    width = max(timestamp_index, temperature_index) + 1
+    for row in rows:
+        if len(row) < width:
+            yield None, None
+        else:
+            yield row[timestamp_index], row[temperature_index]
+
+def _from_object(record):
+    """Return the (timestamp, temperature) pair of one JSON object, or (None, None)."""
+    if not isinstance(record, dict):
+        return None, None
+    timestamp = next((record[name] for name in TIMESTAMP_FIELDS if name in record), None)
+    temperature = next((record[name] for name in TEMPERATURE_FIELDS if name in record), None)
+    return timestamp, temperature
+
+def read_json(text):
+    """Yield (timestamp, temperature) pairs from a JSON list of reading objects.
+
+    The objects may be /temperature/history output, so an export from one
+    instance can be imported into another.
+
+    Raises:
+        ValueError: If the document is not valid JSON or not a list
+    """
+    document = json.loads(text)
+    if not isinstance(document, list):
+        raise ValueError("Expected a list of readings")
+    for record in document:
+        yield _from_object(record)
+
+def read_ndjson(lines):
+    """Yield (timestamp, temperature) pairs from newline-delimited JSON objects.
+
+    Lines that are not valid JSON are yielded as (None, None).
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield None, None
+            continue
+        yield _from_object(record)
+
+def read_readings(stream, fmt):
+    """Yield (timestamp, temperature) pairs from a text stream in one of FORMATS.
+
+    CSV and NDJSON are read line by line, so files larger than memory can be
+    imported; a JSON document is parsed whole.
+
+    Raises:
+        ValueError: If fmt is unknown or the input is malformed
+    """
+    if fmt == 'csv':
+        return read_csv(stream)
+    if fmt == 'json':
+        return read_json(stream.read())
+    if fmt == 'ndjson':
+        return read_ndjson(stream)
+    raise ValueError(f"Unknown format: {fmt}")
+
+def parse_text(text, fmt):
+    """Return every (timestamp, temperature) pair in text, in one of FORMATS.
+
+    Raises:
+        ValueError: If fmt is unknown or the input is malformed
+    """
+    return list(read_readings(io.StringIO(text), fmt))
+
+def guess_format(path):
+    """Guess a file's format from its extension, defaulting to CSV."""
+    return _EXTENSIONS.get(os.path.splitext(path)[1].lower(), 'csv')
+
+def main(argv=None):
+    """Import readings from files (or stdin, as "-") given on the command line."""
+    parser = argparse.ArgumentParser(description="Bulk-import temperature readings with explicit timestamps.")
+    parser.add_argument('files', nargs='+', help="CSV, JSON or NDJSON files to import ('-' reads stdin)")
+    parser.add_argument('--format', choices=FORMATS, help="Input format (default: guessed from the file extension)")
+    parser.add_argument('--batch-size', type=int, help="Readings per transaction (default: IMPORT_BATCH_SIZE)")
+    args = parser.parse_args(argv)
+
+    init_db()
+    options = {'batch_size': args.batch_size} if args.batch_size else {}
+    for path in args.files:
+        fmt = args.format or ('csv' if path == '-' else guess_format(path))
+        try:
+            if path == '-':
+                report = import_readings(read_readings(sys.stdin, fmt), **options)
+            else:
+                with open(path, newline='', encoding='utf-8') as stream:
+                    report = import_readings(read_readings(stream, fmt), **options)
+        except (OSError, ValueError) as e:
+            print(f"Error importing {path}: {e}")
+            return 1
+        rate = report['inserted'] / report['duration_seconds'] if report['duration_seconds'] else 0
+        print(
+            f"{path}: inserted {report['inserted']}, skipped {report['skipped']} duplicates, "
+            f"{report['invalid']} invalid in {report['batches']} batches "
+            f"({report['duration_seconds']:.2f}s, {rate:.0f} readings/s)"
+        )
+    return 0
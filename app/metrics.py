@@ -0,0 +1,134 @@
+import functools
+import os
+import time
+from config import PROMETHEUS_MULTIPROC_DIR
+
+# prometheus_client picks its value storage from the environment when imported, so the
+# directory (which may come from .env) must be in place and exported before that
+if PROMETHEUS_MULTIPROC_DIR:
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = PROMETHEUS_MULTIPROC_DIR
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, multiprocess
+from prometheus_client.exposition import CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.openmetrics.exposition import (
+    CONTENT_TYPE_LATEST as OPENMETRICS_CONTENT_TYPE,
+    generate_latest as generate_openmetrics
+)
+from prometheus_client.core import GaugeMetricFamily
+from app.storage import get_backend
+
+OPERATION_SECONDS = Histogram(
+    'temperbot_operation_duration_seconds',
+    'Time spent in sensor reads, database operations and notification sends',
+    ['operation']
+)
+OPERATION_ERRORS = Counter(
+    'temperbot_operation_errors',
+    'Instrumented operations that raised an exception',
+    ['operation']
+)
+NOTIFICATIONS = Counter(
+    'temperbot_notifications',
+    'Pushover notifications attempted, by whether they were delivered',
+    ['result']
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'temperbot_http_request_duration_seconds',
+    'Time until a response is ready to send (streamed bodies are sent after this)',
+    ['endpoint', 'method']
+)
+HTTP_REQUESTS = Counter(
+    'temperbot_http_requests',
+    'HTTP requests answered, by route and status',
+    ['endpoint', 'method', 'status']
+)
+
+def timed(operation):
+    """Decorate a function to record its duration, and any exception it raises, under operation.
+
+    Args:
+        operation: Value of the operation label, usually the function's name
+    """
+    def decorator(func):
+        histogram = OPERATION_SECONDS.labels(operation)
+        errors = OPERATION_ERRORS.labels(operation)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+def observe_request(endpoint, method, status, seconds):
+    """Record one answered HTTP request.
+
+    Args:
+        endpoint: The matched URL rule (e.g. /temperature/history), or None if no route matched
+        method: HTTP method
+        status: Response status code
+        seconds: Time taken to produce the response
+    """
+    # Rules rather than paths keep the label set bounded
+    endpoint = endpoint or 'unmatched'
+    HTTP_REQUEST_SECONDS.labels(endpoint, method).observe(seconds)
+    HTTP_REQUESTS.labels(endpoint, method, str(status)).inc()
+
+class StorageCollector:
+    """Reports the storage backend's size and reading count when scraped.
+
+    These describe shared storage rather than a process, so they are read
+    at scrape time by the serving process instead of being recorded.
+    """
+
+    def describe(self):
+        # Registering would otherwise run collect(), and so a query, at import
+        return []
+
+    def collect(self):
+        try:
+            usage = get_backend().usage()
+        except Exception as e:
+            print(f"Error reading storage usage for metrics: {str(e)}")
+            return
+        readings = GaugeMetricFamily('temperbot_storage_readings', 'Temperature readings currently stored')
+        readings.add_metric([], usage['readings'])
+        yield readings
+        if usage['bytes'] is not None:
+            size = GaugeMetricFamily('temperbot_storage_bytes', 'Size of the stored data on disk')
+            size.add_metric([], usage['bytes'])
+            yield size
+
+_storage_collector = StorageCollector()
+if not PROMETHEUS_MULTIPROC_DIR:
+    REGISTRY.register(_storage_collector)
+
+def _registry():
+    """Return the registry to expose: this process's, or the sum over every process's files."""
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(_storage_collector)
+    return registry
+
+def render(accept):
+    """Render every metric for a scrape.
+
+    Args:
+        accept: The request's Accept header; OpenMetrics is served to clients that ask for it
+
+    Returns:
+        tuple: (body bytes, content type)
+    """
+    registry = _registry()
+    if 'application/openmetrics-text' in (accept or ''):
+        return generate_openmetrics(registry), OPENMETRICS_CONTENT_TYPE
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,4 +1,5 @@
 from apprise import Apprise
+from app.metrics import NOTIFICATIONS, timed
 from config import (
     PUSHOVER_USER_KEY, 
     PUSHOVER_API_TOKEN, 
@@ -37,6 +38,7 @@ def send_temperature_alert(temperature: float, is_normal: bool = False) -> bool:
             f"Temperature has exceeded threshold: {temperature}°C (threshold: {TEMPERATURE_THRESHOLD}°C)"
         )
 
+@timed('send_notification')
 def _send_notification(title: str, body: str) -> bool:
     """Helper function to send a notification.
     
@@ -62,7 +64,9 @@ def _send_notification(title: str, body: str) -> bool:
             body_format="text"
         )
         print(f"Notification sent successfully: {success}")
+        NOTIFICATIONS.labels('sent' if success else 'failed').inc()
         return success
     except Exception as e:
         print(f"Failed to send notification: {str(e)}")
+        NOTIFICATIONS.labels('failed').inc()
         return False 
\ No newline at end of file
@@ -0,0 +1,103 @@
+import cProfile
+import functools
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from config import PROFILE_DIR, PROFILE_SLOW_MS, PROFILE_SAMPLE_RATE, PROFILE_KEEP
+
+# One invocation per process is profiled at a time: it bounds the overhead, and
+# profilers cannot be nested on a thread (nor, from Python 3.12, run on several)
+_lock = threading.Lock()
+
+class _Session:
+    """A profiler running for one invocation, from start() until finish()."""
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.started = time.perf_counter()
+
+def start():
+    """Start profiling the current thread if profiling is enabled and this invocation is sampled.
+
+    Returns:
+        _Session to pass to finish(), or None if this invocation is not profiled
+    """
+    if not PROFILE_DIR or random.random() >= PROFILE_SAMPLE_RATE:
+        return None
+    if not _lock.acquire(blocking=False):
+        return None
+    session = _Session()
+    try:
+        session.profiler.enable()
+    except ValueError:
+        # Another profiler (a debugger, or one started outside this module) is active
+        _lock.release()
+        return None
+    return session
+
+def finish(session, label):
+    """Stop a profile from start() and save it if the invocation took at least PROFILE_SLOW_MS.
+
+    Must be called on the thread that started it. Profiles are written to
+    PROFILE_DIR as <label>-<UTC time>-<pid>-<duration>ms.prof (pstats format),
+    and only the newest PROFILE_KEEP are kept.
+
+    Args:
+        session: Result of start(); None is ignored
+        label: What was profiled, e.g. "GET /temperature/history"
+
+    Returns:
+        str: Path of the saved profile, or None if nothing was saved
+    """
+    if session is None:
+        return None
+    try:
+        session.profiler.disable()
+    finally:
+        _lock.release()
+    elapsed_ms = (time.perf_counter() - session.started) * 1000
+    if elapsed_ms < PROFILE_SLOW_MS:
+        return None
+    try:
+        return _save(session.profiler, label, elapsed_ms)
+    except OSError as e:
+        print(f"Error saving profile of {label}: {str(e)}")
+        return None
+
+def _save(profiler, label, elapsed_ms):
+    """Write a profile to PROFILE_DIR and delete the oldest beyond PROFILE_KEEP."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_') or 'profile'
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+    path = os.path.join(PROFILE_DIR, f"{name}-{stamp}-{os.getpid()}-{elapsed_ms:.0f}ms.prof")
+    profiler.dump_stats(path)
+    print(f"Saved profile of {label} ({elapsed_ms:.0f} ms) to {path}")
+
+    if PROFILE_KEEP > 0:
+        profiles = sorted(
+            (entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith('.prof')),
+            key=lambda entry: (entry.stat().st_mtime, entry.name)
+        )
+        for entry in profiles[:-PROFILE_KEEP]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                # Another process pruned it first
+                pass
+    return path
+
+def profiled(label):
+    """Decorate a function so that slow calls are profiled (see start() and finish())."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            session = start()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                finish(session, label)
+        return wrapper
+    return decorator
@@ -0,0 +1,324 @@
+import fcntl
+import math
+import mmap
+import os
+import struct
+import threading
+from array import array
+from contextlib import contextmanager
+from app.database import SQLiteBackend
+from app.storage import StorageBackend
+from config import DATA_RETENTION_PERIOD, POLL_INTERVAL_MINUTES, RINGBUFFER_HEADROOM
+
+# File layout (little-endian):
+#   header      magic b'TBRB', version (uint32), capacity (uint64), count (uint64), padded to 64 bytes
+#   timestamps  capacity x int64 epoch milliseconds
+#   values      capacity x float64 temperatures
+# count is the total number of readings ever appended; reading n lives in slot
+# n % capacity, so only the newest `capacity` readings are retained.
+MAGIC = b'TBRB'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sIQQ')
+_HEADER_SIZE = 64
+_COUNT_OFFSET = 16
+_COUNT = struct.Struct('<Q')
+_TIMESTAMP = struct.Struct('<q')
+_VALUE = struct.Struct('<d')
+
+def capacity_for(retention, poll_interval_minutes, headroom=1.25):
+    """Return how many slots are needed to hold the retention period at the poll interval.
+
+    Args:
+        retention: timedelta of data to keep
+        poll_interval_minutes: Minutes between readings
+        headroom: Extra fraction of slots for manual or off-schedule readings
+    """
+    readings = retention.total_seconds() / 60 / max(1, poll_interval_minutes)
+    return max(1, math.ceil(readings * headroom))
+
+class RingBuffer:
+    """Fixed-size time series of (timestamp_ms, temperature) in a memory-mapped file.
+
+    Appends are O(1) and overwrite the oldest slot once the buffer is full, so
+    retention is implicit. Timestamps must be appended in non-decreasing order,
+    which lets range lookups binary search in O(log n). Readers in other
+    processes map the same file and read straight from the shared pages;
+    fcntl locks keep them from observing a half-written append.
+    """
+
+    def __init__(self, path, capacity):
+        """Open the ring buffer at path, creating and preallocating it if needed.
+
+        An existing file keeps the capacity it was created with.
+
+        Args:
+            path: File to map
+            capacity: Number of slots for a newly created file
+        """
+        self.path = path
+        if not os.path.exists(path):
+            self._create(path, capacity)
+
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, version, self.capacity, _ = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a temperature ring buffer")
+        self._timestamps_offset = _HEADER_SIZE
+        self._values_offset = _HEADER_SIZE + 8 * self.capacity
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _create(path, capacity):
+        """Write a new, fully allocated ring buffer file."""
+        size = _HEADER_SIZE + 16 * capacity
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as f:
+            f.truncate(size)
+            # Reserve the blocks now so a full disk fails here rather than as SIGBUS on a later write
+            if hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(f.fileno(), 0, size)
+            f.write(_HEADER.pack(MAGIC, VERSION, capacity, 0))
+            f.flush()
+            os.fsync(f.fileno())
+        # Another process may have created it first; keep whichever landed
+        try:
+            os.link(temporary, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temporary)
+
+    def close(self):
+        """Unmap and close the file."""
+        self._map.close()
+        self._file.close()
+
+    @contextmanager
+    def _locked(self, operation):
+        with self._lock:
+            fcntl.flock(self._file.fileno(), operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _count(self):
+        return _COUNT.unpack_from(self._map, _COUNT_OFFSET)[0]
+
+    def _timestamp(self, index):
+        return _TIMESTAMP.unpack_from(self._map, self._timestamps_offset + 8 * (index % self.capacity))[0]
+
+    def _value(self, index):
+        return _VALUE.unpack_from(self._map, self._values_offset + 8 * (index % self.capacity))[0]
+
+    def _bounds(self):
+        """Return the (first, end) absolute indices of the retained readings."""
+        count = self._count()
+        return max(0, count - self.capacity), count
+
+    def _search(self, first, end, timestamp_ms, right):
+        """Binary search for the first index whose timestamp is >= (or > if right) timestamp_ms."""
+        low, high = first, end
+        while low < high:
+            middle = (low + high) // 2
+            value = self._timestamp(middle)
+            if value < timestamp_ms or (right and value == timestamp_ms):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def appended(self):
+        """Return the number of readings ever appended, a write sequence shared by every process."""
+        with self._locked(fcntl.LOCK_SH):
+            return self._count()
+
+    def __len__(self):
+        with self._locked(fcntl.LOCK_SH):
+            first, end = self._bounds()
+        return end - first
+
+    def append(self, timestamp_ms, temperature):
+        """Append a reading in O(1), overwriting the oldest one when full.
+
+        Raises:
+            ValueError: If timestamp_ms is older than the newest stored reading
+        """
+        with self._locked(fcntl.LOCK_EX):
+            count = self._count()
+            if count and timestamp_ms < self._timestamp(count - 1):
+                raise ValueError("Readings must be appended in chronological order")
+            slot = count % self.capacity
+            _TIMESTAMP.pack_into(self._map, self._timestamps_offset + 8 * slot, timestamp_ms)
+            _VALUE.pack_into(self._map, self._values_offset + 8 * slot, temperature)
+            # Publishing the new count is what makes the reading visible to readers
+            _COUNT.pack_into(self._map, _COUNT_OFFSET, count + 1)
+
+    def latest(self):
+        """Return the newest (timestamp_ms, temperature), or None if empty."""
+        with self._locked(fcntl.LOCK_SH):
+            first, end = self._bounds()
+            if first == end:
+                return None
+            return self._timestamp(end - 1), self._value(end - 1)
+
+    def range(self, start_ms, end_ms, limit=None):
+        """Return (timestamp_ms, temperature) readings within [start_ms, end_ms], newest first.
+
+        Args:
+            limit: Return only the newest this many (default: all)
+        """
+        with self._locked(fcntl.LOCK_SH):
+            first, end = self._bounds()
+            low = self._search(first, end, start_ms, right=False)
+            high = self._search(low, end, end_ms, right=True)
+            if limit is not None:
+                low = max(low, high - limit)
+            return [(self._timestamp(i), self._value(i)) for i in range(high - 1, low - 1, -1)]
+
+    def column_views(self, start_ms, end_ms):
+        """Return zero-copy views of the readings within [start_ms, end_ms], oldest first.
+
+        The result is a list of (timestamps, temperatures) memoryview pairs cast to
+        int64/float64, one pair per contiguous run of slots (two when the range wraps
+        around the end of the file). The casts use native byte order, which matches
+        the file on little-endian hosts. The views alias the shared mapping, and once
+        the ring is full an append (from this process or another) overwrites the
+        oldest slot in place. The caller must therefore hold the ring's shared lock
+        (_locked(fcntl.LOCK_SH)) from this call until it is done reading the views,
+        and release them before close(); copy_columns() does all of this.
+        """
+        first, end = self._bounds()
+        low = self._search(first, end, start_ms, right=False)
+        high = self._search(low, end, end_ms, right=True)
+
+        view = memoryview(self._map)
+        runs = []
+        while low < high:
+            slot = low % self.capacity
+            length = min(high - low, self.capacity - slot)
+            timestamps = view[self._timestamps_offset + 8 * slot:self._timestamps_offset + 8 * (slot + length)]
+            values = view[self._values_offset + 8 * slot:self._values_offset + 8 * (slot + length)]
+            runs.append((timestamps.cast('q'), values.cast('d')))
+            low += length
+        return runs
+
+    def copy_columns(self, start_ms, end_ms):
+        """Copy the readings within [start_ms, end_ms] into (array('q'), array('d')) columns, oldest first.
+
+        The views are read under the shared lock, so no append can overwrite a
+        slot while it is copied.
+        """
+        timestamps, temperatures = array('q'), array('d')
+        with self._locked(fcntl.LOCK_SH):
+            for run_timestamps, run_temperatures in self.column_views(start_ms, end_ms):
+                timestamps.extend(run_timestamps)
+                temperatures.extend(run_temperatures)
+                run_timestamps.release()
+                run_temperatures.release()
+        return timestamps, temperatures
+
+class RingBufferBackend(StorageBackend):
+    """Stores readings in the memory-mapped RingBuffer at RINGBUFFER_PATH.
+
+    New files are sized to hold DATA_RETENTION_PERIOD at POLL_INTERVAL_MINUTES
+    plus RINGBUFFER_HEADROOM. Retention is implicit, and rollups are computed
+    from the retained readings on demand. The ring holds a single series, so
+    per-sensor channel readings are kept in the SQLite database at DB_PATH.
+    """
+
+    def __init__(self):
+        self._ring = None
+        self._lock = threading.Lock()
+        self._channels = SQLiteBackend()
+
+    @staticmethod
+    def get_path():
+        """Get the ring buffer file path from environment variable or config."""
+        return os.getenv('RINGBUFFER_PATH', '/tmp/temperature.ring')
+
+    @property
+    def ring(self):
+        """This process's RingBuffer, mapping the file on first use."""
+        path = self.get_path()
+        with self._lock:
+            if self._ring is None or self._ring.path != path:
+                if self._ring is not None:
+                    self._ring.close()
+                capacity = capacity_for(DATA_RETENTION_PERIOD, POLL_INTERVAL_MINUTES, RINGBUFFER_HEADROOM)
+                self._ring = RingBuffer(path, capacity)
+            return self._ring
+
+    def initialize(self):
+        self._channels.initialize()
+        self.ring
+
+    def close(self):
+        self._channels.close()
+        with self._lock:
+            if self._ring is not None:
+                self._ring.close()
+                self._ring = None
+
+    def append(self, readings):
+        ring = self.ring
+        for timestamp_ms, temperature in readings:
+            try:
+                ring.append(timestamp_ms, temperature)
+            except ValueError:
+                # Older than the newest reading (e.g. the clock stepped back). Raising would
+                # leave the reading in BufferedWriter, failing every later flush with it
+                print(f"Skipping reading at {timestamp_ms}: older than the newest one in the ring buffer")
+
+    def import_readings(self, readings):
+        # The ring only appends, so readings older than its newest one are skipped
+        latest = self.latest()
+        if latest is not None:
+            readings = [row for row in readings if row[0] > latest[0]]
+        return super().import_readings(readings)
+
+    def range(self, start_ms, end_ms):
+        return self.ring.range(start_ms, end_ms)
+
+    def newest(self, start_ms, end_ms, limit):
+        return self.ring.range(start_ms, end_ms, limit)
+
+    def latest(self):
+        return self.ring.latest()
+
+    def prune(self, cutoff_ms, batch_size=None, vacuum_pages=0):
+        # Ring readings are overwritten as new ones arrive; only channel readings need pruning
+        return self._channels.prune(cutoff_ms, batch_size=batch_size, vacuum_pages=vacuum_pages)
+
+    def append_channels(self, readings):
+        self._channels.append_channels(readings)
+
+    def channel_range(self, sensor, channel, start_ms, end_ms):
+        return self._channels.channel_range(sensor, channel, start_ms, end_ms)
+
+    def list_channels(self):
+        return self._channels.list_channels()
+
+    def data_version(self):
+        return self.ring.appended(), self._channels.data_version()
+
+    def validator(self):
+        # The append count is a write sequence kept in the shared file
+        return self.ring.appended(), self._channels.validator()
+
+    def usage(self):
+        # The ring file is allocated at full size up front; channel readings add the SQLite file
+        channels = self._channels.usage()
+        return {"bytes": os.path.getsize(self.ring.path) + channels["bytes"], "readings": len(self.ring)}
+
+    def columns(self, start_ms, end_ms):
+        timestamps, temperatures = self.ring.copy_columns(start_ms, end_ms)
+        timestamps.reverse()
+        temperatures.reverse()
+        return timestamps, temperatures
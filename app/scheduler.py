@@ -1,16 +1,29 @@
 from apscheduler.schedulers.background import BackgroundScheduler
-from app.hardware import read_temperature
-from app.database import store_temperature
+from app.hardware import read_devices, read_temperature, sensor_channels
+from app.database import BufferedWriter, compact_database, backup_database
 from app.alert_checker import check_temperature_alert, AlertState
 from app.notifications import send_temperature_alert
-from config import POLL_INTERVAL_MINUTES
+from app.profiling import profiled
+from config import (
+    POLL_INTERVAL_MINUTES,
+    COMPACTION_INTERVAL_MINUTES,
+    BACKUP_INTERVAL_HOURS,
+    WRITE_BUFFER_SIZE,
+    WRITE_BUFFER_MAX_AGE_SECONDS
+)
 
+# Readings go through the group-commit buffer; with WRITE_BUFFER_SIZE=1 every
+# reading is committed as soon as it is added
+write_buffer = BufferedWriter()
+
+@profiled('poll_temperature')
 def poll_temperature():
-    """Read temperature from sensor, store in database, and check for alerts."""
+    """Read every sensor, store all channels in the database, and check the primary temperature for alerts."""
     try:
-        temperature = read_temperature()
+        devices = read_devices()
+        temperature = read_temperature(devices)
+        write_buffer.add(temperature, sensor_channels(devices))
         if temperature is not None:
-            store_temperature(temperature)
             # Check if we should send an alert
             alert_state = check_temperature_alert(temperature)
             if alert_state != AlertState.NO_ALERT:
@@ -19,6 +32,42 @@ def poll_temperature():
         print(f"Error in poll_temperature: {str(e)}")
         return None
 
+def flush_write_buffer():
+    """Commit any buffered readings so none wait longer than the data-loss window."""
+    try:
+        return write_buffer.flush()
+    except Exception as e:
+        print(f"Error in flush_write_buffer: {str(e)}")
+        return None
+
+def compact_readings():
+    """Prune readings past the retention period and report what was removed."""
+    try:
+        report = compact_database()
+        print(
+            f"Compaction removed {report['deleted_rows']} readings in {report['batches']} batches "
+            f"({report['archived_rows']} archived, {report['deleted_blocks']} archive blocks expired), "
+            f"vacuumed {report['vacuumed_pages']} pages in {report['duration_seconds']:.3f}s"
+        )
+        return report
+    except Exception as e:
+        print(f"Error in compact_readings: {str(e)}")
+        return None
+
+def snapshot_database():
+    """Take an online snapshot of the database and report its size and duration."""
+    try:
+        report = backup_database()
+        print(
+            f"Backup wrote {report['path']} ({report['bytes']} bytes from {report['database_bytes']}, "
+            f"{report['pages']} pages in {report['steps']} steps) in {report['duration_seconds']:.3f}s; "
+            f"deleted {report['deleted_backups']} old backups"
+        )
+        return report
+    except Exception as e:
+        print(f"Error in snapshot_database: {str(e)}")
+        return None
+
 def start_scheduler():
     """Initialize and start the background scheduler."""
     scheduler = BackgroundScheduler()
@@ -28,5 +77,25 @@ def start_scheduler():
         minute=f'*/{POLL_INTERVAL_MINUTES}',  # Run every N minutes, starting at minute 0
         id='temperature_poller'
     )
+    scheduler.add_job(
+        compact_readings,
+        'interval',
+        minutes=COMPACTION_INTERVAL_MINUTES,
+        id='retention_compactor'
+    )
+    if BACKUP_INTERVAL_HOURS > 0:
+        scheduler.add_job(
+            snapshot_database,
+            'interval',
+            hours=BACKUP_INTERVAL_HOURS,
+            id='database_backup'
+        )
+    if WRITE_BUFFER_SIZE > 1:
+        scheduler.add_job(
+            flush_write_buffer,
+            'interval',
+            seconds=WRITE_BUFFER_MAX_AGE_SECONDS,
+            id='write_buffer_flusher'
+        )
     scheduler.start()
     return scheduler 
\ No newline at end of file
@@ -4,6 +4,8 @@ let rawData = [];  // Store the raw data in Celsius
 let originalTemp;  // Will be initialized from data attribute
 let refreshInterval;  // Will be initialized from data attribute
 let temperatureThreshold;  // Will be initialized from data attribute
+let eventSource;  // Live stream of new readings, when the browser supports it
+let dashboardCursor = null;  // Epoch ms of the newest reading held, sent back to /dashboard/data as after
 
 function celsiusToFahrenheit(celsius) {
     return (celsius * 9/5) + 32;
@@ -36,59 +38,88 @@ function formatTime(timestamp) {
     return date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
 }
 
-function updateLatestTemperature() {
-    console.log('Fetching latest temperature...');
-    return fetch('/temperature/latest')
-        .then(response => response.json())
-        .then(data => {
-            console.log('Received temperature data:', data);
-            const tempValue = document.getElementById('temperature-value');
-            const timestamp = document.querySelector('.timestamp');
-            
-            // Update temperature display
-            originalTemp = data.temperature;  // Update the global originalTemp
-            tempValue.textContent = isCelsius ? 
-                data.temperature.toFixed(1) : 
-                celsiusToFahrenheit(data.temperature).toFixed(1);
-            
-            // Update timestamp
-            timestamp.textContent = `Last updated: ${new Date(data.collected_at).toLocaleString()}`;
-            
-            // Update body class for background color
-            document.body.classList.remove('alert', 'normal', 'transition');
-            if (data.is_alert) {
-                document.body.classList.add('alert');
-            } else if (data.is_normal) {
-                document.body.classList.add('normal');
-            } else {
-                document.body.classList.add('transition');
-            }
-            
-            console.log('Temperature updated successfully');
-            return data;
-        })
-        .catch(error => {
-            console.error('Error fetching latest temperature:', error);
-            throw error;
-        });
+function showLatestTemperature(data) {
+    const tempValue = document.getElementById('temperature-value');
+    const timestamp = document.querySelector('.timestamp');
+    
+    // Update temperature display
+    originalTemp = data.temperature;  // Update the global originalTemp
+    tempValue.textContent = isCelsius ? 
+        data.temperature.toFixed(1) : 
+        celsiusToFahrenheit(data.temperature).toFixed(1);
+    
+    // Update timestamp
+    timestamp.textContent = `Last updated: ${new Date(data.collected_at).toLocaleString()}`;
+    
+    // Update body class for background color
+    document.body.classList.remove('alert', 'normal', 'transition');
+    if (data.is_alert) {
+        document.body.classList.add('alert');
+    } else if (data.is_normal) {
+        document.body.classList.add('normal');
+    } else {
+        document.body.classList.add('transition');
+    }
+}
+
+function applyDashboardData(data) {
+    // readings are newest first and, once the page holds a cursor, only those after it
+    if (data.latest) {
+        showLatestTemperature(data.latest);
+    }
+    dashboardCursor = data.cursor;
+    rawData = data.readings.concat(rawData);
+
+    const cutoff = new Date(data.window_start).getTime();
+    while (rawData.length && new Date(rawData[rawData.length - 1].collected_at).getTime() < cutoff) {
+        rawData.pop();
+    }
+    updateChartDisplay();
 }
 
-function updateChartData() {
-    console.log('Fetching chart data...');
-    return fetch('/temperature/hourly')
+function updateDashboard() {
+    // The first request loads the whole window; later ones only what is newer than the cursor
+    const query = dashboardCursor === null ? '' : `?after=${dashboardCursor}`;
+    console.log('Fetching dashboard data...');
+    return fetch(`/dashboard/data${query}`)
         .then(response => response.json())
         .then(data => {
-            console.log('Received chart data:', data);
-            rawData = data;  // Store raw data
-            updateChartDisplay();
+            console.log('Received dashboard data:', data);
+            applyDashboardData(data);
             return data;
         })
         .catch(error => {
-            console.error('Error fetching chart data:', error);
+            console.error('Error fetching dashboard data:', error);
             throw error;
         });
 }
 
+function loadEmbeddedDashboard() {
+    // The page is rendered with the same payload /dashboard/data returns
+    const embedded = document.getElementById('dashboard-data');
+    if (!embedded) {
+        return false;
+    }
+    applyDashboardData(JSON.parse(embedded.textContent));
+    return true;
+}
+
+function addChartReading(reading) {
+    // rawData is newest first; the stream can resend the reading the chart already ends with
+    const readingTime = new Date(reading.collected_at).getTime();
+    if (rawData.length && new Date(rawData[0].collected_at).getTime() >= readingTime) {
+        return;
+    }
+    rawData.unshift({temperature: reading.temperature, collected_at: reading.collected_at});
+
+    // Keep the chart to the past hour, like /dashboard/data
+    const cutoff = Date.now() - 60 * 60 * 1000;
+    while (rawData.length && new Date(rawData[rawData.length - 1].collected_at).getTime() < cutoff) {
+        rawData.pop();
+    }
+    updateChartDisplay();
+}
+
 function updateChartDisplay() {
     if (!rawData.length) {
         console.log('No chart data available');
@@ -207,8 +238,7 @@ function scheduleNextUpdate() {
     
     // Schedule the next update
     setTimeout(() => {
-        updateLatestTemperature();
-        updateChartData();
+        updateDashboard();
         scheduleNextUpdate();  // Schedule the next update after this one
     }, delay);
 }
@@ -218,6 +248,43 @@ function updateRefreshInfo(nextUpdate) {
     refreshInfo.textContent = `Next update at ${nextUpdate.toLocaleTimeString([], {hour: '2-digit', minute: '2-digit'})}`;
 }
 
+function startLiveUpdates() {
+    // The server pushes each reading as it is stored; the browser reconnects on its own
+    // and resumes from the last reading it received
+    const refreshInfo = document.getElementById('refresh-info');
+    eventSource = new EventSource('/temperature/stream');
+    eventSource.addEventListener('open', () => {
+        refreshInfo.textContent = 'Live';
+    });
+    eventSource.addEventListener('reading', event => {
+        const reading = JSON.parse(event.data);
+        console.log('Received streamed reading:', reading);
+        showLatestTemperature(reading);
+        addChartReading(reading);
+        // Event ids are epoch milliseconds, so polling can resume from the stream
+        dashboardCursor = Math.max(dashboardCursor || 0, parseInt(event.lastEventId));
+    });
+    eventSource.addEventListener('error', () => {
+        if (eventSource.readyState === EventSource.CLOSED) {
+            // The server refused the stream, so fall back to polling
+            console.error('Live stream unavailable, polling instead');
+            scheduleNextUpdate();
+        } else {
+            refreshInfo.textContent = 'Reconnecting...';
+        }
+    });
+}
+
+function startUpdates() {
+    if (window.EventSource) {
+        startLiveUpdates();
+        console.log('Live updates started');
+    } else {
+        scheduleNextUpdate();
+        console.log(`Update scheduling started with interval of ${refreshInterval} minutes`);
+    }
+}
+
 // Initialize the page
 document.addEventListener('DOMContentLoaded', function() {
     console.log('Page initialized');
@@ -246,17 +313,17 @@ document.addEventListener('DOMContentLoaded', function() {
         document.body.classList.add('transition');
     }
 
-    // Initial data load with Promise.all to wait for both updates
-    Promise.all([
-        updateLatestTemperature(),
-        updateChartData()
-    ]).then(() => {
-        // Start the update scheduling only after initial data is loaded
-        scheduleNextUpdate();
-        console.log(`Update scheduling started with interval of ${refreshInterval} minutes`);
+    // The page carries its initial data, so only fetch it if that is missing
+    if (loadEmbeddedDashboard()) {
+        startUpdates();
+        return;
+    }
+    updateDashboard().then(() => {
+        // Start updating only after initial data is loaded
+        startUpdates();
     }).catch(error => {
         console.error('Error during initial data load:', error);
-        // Still try to schedule updates even if initial load fails
-        scheduleNextUpdate();
+        // Still try to start updates even if initial load fails
+        startUpdates();
     });
-}); 
\ No newline at end of file
+});
\ No newline at end of file
@@ -0,0 +1,403 @@
+import bisect
+import math
+import threading
+from array import array
+from contextlib import contextmanager
+from config import STORAGE_BACKEND
+
+# Rollup bucket widths in milliseconds, keyed by the resolution name used in the API
+ROLLUP_RESOLUTIONS = {
+    'minute': 60 * 1000,
+    'hour': 60 * 60 * 1000,
+    'day': 24 * 60 * 60 * 1000,
+}
+
+# Rollup resolutions that also keep a temperature histogram, for percentiles
+HISTOGRAM_RESOLUTIONS = ('hour', 'day')
+
+# Histogram bins are 1/16 °C wide, the USB sensors' native resolution
+HISTOGRAM_BINS_PER_DEGREE = 16
+
+def bucket_start(timestamp_ms, resolution):
+    """Return the start of the rollup bucket containing timestamp_ms."""
+    return timestamp_ms - timestamp_ms % ROLLUP_RESOLUTIONS[resolution]
+
+def histogram_bin(temperature):
+    """Return the index of the histogram bin containing temperature."""
+    return math.floor(temperature * HISTOGRAM_BINS_PER_DEGREE)
+
+def summarize(temperatures):
+    """Summarize temperatures as (count, min, max, sum, sum_squares, histogram).
+
+    histogram maps histogram_bin() indices to reading counts. This is the
+    shape StorageBackend.summary() returns.
+    """
+    histogram = {}
+    total = squares = 0.0
+    for temperature in temperatures:
+        total += temperature
+        squares += temperature * temperature
+        index = histogram_bin(temperature)
+        histogram[index] = histogram.get(index, 0) + 1
+    if not histogram:
+        return 0, None, None, 0.0, 0.0, {}
+    return len(temperatures), min(temperatures), max(temperatures), total, squares, histogram
+
+class StorageBackend:
+    """Interface implemented by every storage engine for temperature readings.
+
+    Timestamps are integer epoch milliseconds and rows are returned newest
+    first. Engines implement the core operations (append, range, latest and
+    prune); aggregate() and the remaining methods have generic implementations
+    built on range() that engines may override with something faster.
+    """
+
+    def initialize(self):
+        """Prepare the engine's storage (create files, run migrations)."""
+
+    def close(self):
+        """Release files, mappings or connections held by the engine."""
+
+    def append(self, readings):
+        """Store (timestamp_ms, temperature) readings in one atomic write."""
+        raise NotImplementedError
+
+    def import_readings(self, readings):
+        """Store a batch of (timestamp_ms, temperature) readings in any order, skipping known timestamps.
+
+        Used for backfills: a timestamp already stored, or repeated within the
+        batch (the first occurrence wins), is not stored again. This generic
+        version checks range() over the batch's span before one append().
+
+        Returns:
+            int: Number of readings stored
+        """
+        unique = {}
+        for timestamp_ms, temperature in readings:
+            unique.setdefault(timestamp_ms, temperature)
+        if not unique:
+            return 0
+        known = {timestamp_ms for timestamp_ms, _ in self.range(min(unique), max(unique))}
+        new = sorted(row for row in unique.items() if row[0] not in known)
+        if new:
+            self.append(new)
+        return len(new)
+
+    def range(self, start_ms, end_ms):
+        """Return (timestamp_ms, temperature) rows within [start_ms, end_ms], newest first."""
+        raise NotImplementedError
+
+    def latest(self):
+        """Return the newest (timestamp_ms, temperature) row, or None if empty."""
+        raise NotImplementedError
+
+    def prune(self, cutoff_ms, batch_size=None, vacuum_pages=0):
+        """Delete readings older than cutoff_ms.
+
+        batch_size and vacuum_pages are hints for engines that delete in
+        batches or can return space to the filesystem; others ignore them.
+
+        Returns:
+            dict: deleted_rows, archived_rows, batches, deleted_rollups,
+            deleted_blocks and vacuumed_pages
+        """
+        raise NotImplementedError
+
+    def append_channels(self, readings):
+        """Store (sensor, channel, timestamp_ms, value) readings from every attached sensor."""
+        raise NotImplementedError
+
+    def backup(self, path, pages_per_step, step_sleep_seconds):
+        """Write a consistent copy of the stored data to path while writes continue.
+
+        Returns:
+            dict: pages copied and steps taken
+
+        Raises:
+            NotImplementedError: If the engine cannot take snapshots
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support backups")
+
+    def usage(self):
+        """Return how much the engine stores, for monitoring.
+
+        This generic version counts the readings with range() and cannot tell
+        the size on disk.
+
+        Returns:
+            dict: bytes (on disk, or None if not applicable) and readings
+        """
+        return {"bytes": None, "readings": len(self.range(-2**63, 2**63 - 1))}
+
+    @contextmanager
+    def snapshot(self):
+        """Make the reads inside the block see one consistent state of the stored data.
+
+        This generic version does nothing; engines whose reads can interleave
+        with another process's writes pin a snapshot for the block.
+        """
+        yield
+
+    def data_version(self):
+        """Return a token that changes whenever stored readings change, or None if unknown.
+
+        Tokens are only compared for equality. They must also change for writes
+        made by other processes sharing the same storage, since read caches
+        rely on them to know when a cached result is stale.
+        """
+        return None
+
+    def validator(self):
+        """Return a token that changes whenever stored data changes and is equal in every process.
+
+        Unlike data_version(), tokens survive restarts and agree between
+        processes sharing the storage, so they can back HTTP validators.
+        They may cost a query; callers cache them per data_version(). This
+        generic version combines the newest reading with the reading count.
+        """
+        return self.latest(), self.usage()['readings']
+
+    def channel_range(self, sensor, channel, start_ms, end_ms):
+        """Return (timestamp_ms, value) rows for one sensor channel within [start_ms, end_ms], newest first.
+
+        Returns None if the sensor has never reported that channel.
+        """
+        raise NotImplementedError
+
+    def list_channels(self):
+        """Return every known (sensor, channel) pair, sorted."""
+        raise NotImplementedError
+
+    def aggregate(self, resolution, start_ms, end_ms):
+        """Return (bucket_ms, min, max, sum, count) rows for buckets overlapping the range.
+
+        Buckets are returned newest first and always cover their full width,
+        including readings before start_ms in the first bucket and after end_ms
+        in the last one.
+        """
+        last_ms = bucket_start(end_ms, resolution) + ROLLUP_RESOLUTIONS[resolution] - 1
+        buckets = {}
+        for timestamp_ms, temperature in self.range(bucket_start(start_ms, resolution), last_ms):
+            bucket = bucket_start(timestamp_ms, resolution)
+            stats = buckets.get(bucket)
+            if stats is None:
+                buckets[bucket] = [temperature, temperature, temperature, 1]
+            else:
+                stats[0] = min(stats[0], temperature)
+                stats[1] = max(stats[1], temperature)
+                stats[2] += temperature
+                stats[3] += 1
+        return [(bucket, *buckets[bucket]) for bucket in sorted(buckets, reverse=True)]
+
+    def summary(self, start_ms, end_ms):
+        """Return (count, min, max, sum, sum_squares, histogram) for readings within [start_ms, end_ms].
+
+        histogram maps histogram_bin() indices to reading counts. sum_squares
+        and histogram are None when some of the readings' spread is unknown
+        (rollups written before it was recorded). This generic version
+        summarizes range(); engines with rollups can answer from buckets.
+        """
+        return summarize([temperature for _, temperature in self.range(start_ms, end_ms)])
+
+    def iter_range(self, start_ms, end_ms, chunk_size):
+        """Yield range() rows in lists of at most chunk_size, newest first."""
+        rows = self.range(start_ms, end_ms)
+        for offset in range(0, len(rows), chunk_size):
+            yield rows[offset:offset + chunk_size]
+
+    def newest(self, start_ms, end_ms, limit):
+        """Return the newest limit range() rows, newest first.
+
+        This generic version slices range(); engines that can stop reading
+        after limit rows should.
+        """
+        return self.range(start_ms, end_ms)[:limit]
+
+    def columns(self, start_ms, end_ms):
+        """Return range() rows as (array('q') timestamps, array('d') temperatures), newest first."""
+        rows = self.range(start_ms, end_ms)
+        return array('q', [row[0] for row in rows]), array('d', [row[1] for row in rows])
+
+    def page(self, start_ms, end_ms, limit, before=None, after=None):
+        """Return one keyset page of rows, newest first.
+
+        Cursors are (timestamp_ms, key) tuples where key orders readings that
+        share a timestamp. This generic version keys ties by their insertion
+        order, which is stable because readings are only ever appended.
+
+        Returns:
+            tuple: (rows, next_key); next_key is the cursor continuing in the same
+            direction, or None once the range is exhausted
+        """
+        chronological = list(reversed(self.range(start_ms, end_ms)))
+        keyed = []
+        for timestamp_ms, temperature in chronological:
+            tie = keyed[-1][1] + 1 if keyed and keyed[-1][0] == timestamp_ms else 0
+            keyed.append((timestamp_ms, tie, temperature))
+
+        if after is not None:
+            selected = [row for row in keyed if (row[0], row[1]) > tuple(after)][:limit]
+            next_row = selected[-1] if len(selected) == limit else None
+            selected.reverse()
+        else:
+            keyed.reverse()
+            if before is not None:
+                keyed = [row for row in keyed if (row[0], row[1]) < tuple(before)]
+            selected = keyed[:limit]
+            next_row = selected[-1] if len(selected) == limit else None
+
+        next_key = (next_row[0], next_row[1]) if next_row else None
+        return [(timestamp_ms, temperature) for timestamp_ms, _, temperature in selected], next_key
+
+class MemoryBackend(StorageBackend):
+    """Keeps readings in process memory; nothing touches the disk.
+
+    Readings are held in parallel sorted lists, so appends are amortised O(1)
+    and range lookups binary search in O(log n). Intended for tests,
+    benchmarks and single-process deployments that do not need persistence.
+    """
+
+    def __init__(self):
+        self._timestamps = []
+        self._temperatures = []
+        self._lock = threading.Lock()
+        # One sorted series per (sensor, channel)
+        self._channels = {}
+        # Bumped on every write, for data_version()
+        self._version = 0
+
+    def append(self, readings):
+        with self._lock:
+            self._version += 1
+            for timestamp_ms, temperature in readings:
+                # Out-of-order readings (e.g. backfills) are inserted in place
+                if self._timestamps and timestamp_ms < self._timestamps[-1]:
+                    index = bisect.bisect_right(self._timestamps, timestamp_ms)
+                    self._timestamps.insert(index, timestamp_ms)
+                    self._temperatures.insert(index, temperature)
+                else:
+                    self._timestamps.append(timestamp_ms)
+                    self._temperatures.append(temperature)
+
+    def range(self, start_ms, end_ms):
+        with self._lock:
+            low = bisect.bisect_left(self._timestamps, start_ms)
+            high = bisect.bisect_right(self._timestamps, end_ms)
+            return [
+                (self._timestamps[i], self._temperatures[i])
+                for i in range(high - 1, low - 1, -1)
+            ]
+
+    def latest(self):
+        with self._lock:
+            if not self._timestamps:
+                return None
+            return self._timestamps[-1], self._temperatures[-1]
+
+    def page(self, start_ms, end_ms, limit, before=None, after=None):
+        """Keyset page in O(log n + limit), with the same tie keys as the generic version."""
+        with self._lock:
+            timestamps = self._timestamps
+            low = bisect.bisect_left(timestamps, start_ms)
+            high = bisect.bisect_right(timestamps, end_ms)
+            if after is not None:
+                first = min(bisect.bisect_left(timestamps, after[0]) + after[1] + 1,
+                            bisect.bisect_right(timestamps, after[0]))
+                first = max(low, first)
+                indices = list(range(first, min(first + limit, high)))
+                next_index = indices[-1] if len(indices) == limit else None
+                indices.reverse()
+            else:
+                if before is not None:
+                    cursor = min(bisect.bisect_left(timestamps, before[0]) + before[1],
+                                 bisect.bisect_right(timestamps, before[0]))
+                    high = max(low, min(high, cursor))
+                indices = list(range(high - 1, max(low, high - limit) - 1, -1))
+                next_index = indices[-1] if len(indices) == limit else None
+
+            rows = [(timestamps[i], self._temperatures[i]) for i in indices]
+            if next_index is None:
+                return rows, None
+            timestamp_ms = timestamps[next_index]
+            return rows, (timestamp_ms, next_index - bisect.bisect_left(timestamps, timestamp_ms))
+
+    def prune(self, cutoff_ms, batch_size=None, vacuum_pages=0):
+        with self._lock:
+            self._version += 1
+            deleted = bisect.bisect_left(self._timestamps, cutoff_ms)
+            del self._timestamps[:deleted]
+            del self._temperatures[:deleted]
+            series = list(self._channels.values())
+        for channel in series:
+            deleted += channel.prune(cutoff_ms)["deleted_rows"]
+        return {
+            "deleted_rows": deleted,
+            "archived_rows": 0,
+            "batches": 1,
+            "deleted_rollups": 0,
+            "deleted_blocks": 0,
+            "vacuumed_pages": 0
+        }
+
+    def append_channels(self, readings):
+        batches = {}
+        for sensor, channel, timestamp_ms, value in readings:
+            batches.setdefault((sensor, channel), []).append((timestamp_ms, value))
+        with self._lock:
+            self._version += 1
+            series = [(self._channels.setdefault(key, MemoryBackend()), rows) for key, rows in batches.items()]
+        for channel, rows in series:
+            channel.append(rows)
+
+    def channel_range(self, sensor, channel, start_ms, end_ms):
+        series = self._channels.get((sensor, channel))
+        return series.range(start_ms, end_ms) if series is not None else None
+
+    def list_channels(self):
+        with self._lock:
+            return sorted(self._channels)
+
+    def data_version(self):
+        with self._lock:
+            return self._version
+
+    def usage(self):
+        with self._lock:
+            return {"bytes": None, "readings": len(self._timestamps)}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def create_backend(name):
+    """Instantiate the storage engine called name ('sqlite', 'ringbuffer' or 'memory').
+
+    Raises:
+        ValueError: If name is not a known backend
+    """
+    if name == 'sqlite':
+        from app.database import SQLiteBackend
+        return SQLiteBackend()
+    if name == 'ringbuffer':
+        from app.ringbuffer import RingBufferBackend
+        return RingBufferBackend()
+    if name == 'memory':
+        return MemoryBackend()
+    raise ValueError(f"Unknown storage backend: {name}")
+
+def get_backend():
+    """Return the process-wide storage backend selected by STORAGE_BACKEND."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend(STORAGE_BACKEND)
+        return _backend
+
+def set_backend(backend):
+    """Replace the process-wide storage backend and return the previous one (or None).
+
+    Used by tests and benchmarks to run the app against a specific engine.
+    """
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    return previous
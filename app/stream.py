@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from app.database import data_version, fetch_readings_after, get_latest_temperature
+
+class ReadingBroadcaster:
+    """Fans newly stored readings out to every live stream client in this process.
+
+    The poller stores readings from another process, so nothing in the web
+    worker is told when one arrives. Instead a single watcher thread checks
+    the backend's data_version() every check_interval_seconds (a PRAGMA on
+    SQLite) and only queries for readings when it has changed. Clients block
+    on a condition variable until the watcher publishes something newer than
+    the last reading they sent, so open connections cost no queries of their
+    own. The watcher starts with the first subscriber and exits once the
+    last one has gone.
+    """
+
+    def __init__(self, check_interval_seconds, history_size=100):
+        """
+        Args:
+            check_interval_seconds: How often the watcher checks for new readings
+            history_size: Recent readings kept for clients that fall behind
+        """
+        self.check_interval_seconds = check_interval_seconds
+        self._condition = threading.Condition()
+        self.history_size = history_size
+        self._recent = deque()
+        # _recent holds every reading stamped after _complete_after_ms
+        self._complete_after_ms = 0
+        self._newest_ms = 0
+        self._subscribers = 0
+        self._thread = None
+
+    @property
+    def subscribers(self):
+        """Number of clients currently subscribed."""
+        with self._condition:
+            return self._subscribers
+
+    @property
+    def newest_ms(self):
+        """Epoch milliseconds of the newest reading seen, or 0 if there is none."""
+        with self._condition:
+            return self._newest_ms
+
+    @property
+    def running(self):
+        """Whether the watcher thread is running."""
+        with self._condition:
+            return self._thread is not None
+
+    def subscribe(self):
+        """Register a client, starting the watcher if it is not running.
+
+        The watcher's starting point is read before this returns, so a client
+        that then replays storage from its own last reading misses nothing.
+        """
+        with self._condition:
+            self._subscribers += 1
+            if self._thread is None:
+                latest = get_latest_temperature()
+                if latest is not None:
+                    latest_ms = round(datetime.fromisoformat(latest["collected_at"]).timestamp() * 1000)
+                    self._newest_ms = max(self._newest_ms, latest_ms)
+                # Readings stored while nobody was subscribed were never published
+                self._recent.clear()
+                self._complete_after_ms = self._newest_ms
+                self._thread = threading.Thread(target=self._watch, name='reading-broadcaster', daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self):
+        """Unregister a client; the watcher exits after its next check if none are left."""
+        with self._condition:
+            self._subscribers -= 1
+
+    def wait(self, after_ms, timeout):
+        """Block until readings newer than after_ms are published, or timeout seconds pass.
+
+        Args:
+            after_ms: Epoch milliseconds of the last reading the client has
+            timeout: Seconds to wait before returning empty-handed
+
+        Returns:
+            list: Reading dicts from fetch_readings_after() newer than after_ms, oldest first
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._newest_ms > after_ms, timeout):
+                return []
+        readings = self.readings_after(after_ms)
+        # The client is further behind than the recent history reaches
+        return fetch_readings_after(after_ms) if readings is None else readings
+
+    def readings_after(self, after_ms):
+        """Return the published readings newer than after_ms without blocking or querying storage.
+
+        Returns:
+            list: Reading dicts newer than after_ms, oldest first, or None if the
+                recent history does not reach back that far
+        """
+        with self._condition:
+            if after_ms < self._complete_after_ms:
+                return None
+            return [reading for reading in self._recent if reading["timestamp_ms"] > after_ms]
+
+    def _watch(self):
+        """Publish new readings until no subscribers are left."""
+        version = None
+        while True:
+            with self._condition:
+                if self._subscribers <= 0:
+                    self._thread = None
+                    return
+            try:
+                current = data_version()
+                # Backends that cannot report a version are queried on every check
+                if current is None or current != version:
+                    version = current
+                    self._publish(fetch_readings_after(self._newest_ms))
+            except Exception as e:
+                print(f"Error checking for new readings: {e}")
+            time.sleep(self.check_interval_seconds)
+
+    def _publish(self, readings):
+        """Append readings to the recent history and wake every waiting client."""
+        if not readings:
+            return
+        with self._condition:
+            self._recent.extend(readings)
+            while len(self._recent) > self.history_size:
+                self._complete_after_ms = self._recent.popleft()["timestamp_ms"]
+            self._newest_ms = readings[-1]["timestamp_ms"]
+            self._condition.notify_all()
@@ -1,110 +1,845 @@
-from flask import Flask, jsonify, request, render_template
-from app.database import fetch_temperature_history, get_latest_temperature
+import functools
+import hashlib
+import hmac
+import json
+import math
+import threading
+import time
+from flask import Flask, Response, g, jsonify, make_response, request, render_template, url_for
+from werkzeug.http import is_resource_modified
+from app.database import (
+    fetch_temperature_history,
+    fetch_readings_after,
+    fetch_temperature_rollups,
+    fetch_temperature_page,
+    iter_temperature_history,
+    fetch_temperature_columns,
+    fetch_temperature_stats,
+    fetch_dashboard_snapshot,
+    get_latest_temperature,
+    list_sensor_channels,
+    fetch_sensor_history,
+    read_cache_stats,
+    data_validator,
+    import_readings,
+    ROLLUP_RESOLUTIONS,
+    DEFAULT_PERCENTILES
+)
+from app.export import encode_columnar, COLUMNAR_MIMETYPE
+from app.importer import parse_text
+from app.stream import ReadingBroadcaster
+from app.compression import compress_response, compression_cache_stats
+from app import analytics, metrics, profiling
 from datetime import datetime, timezone, timedelta
-from config import TEMPERATURE_THRESHOLD, TEMPERATURE_NORMAL_MARGIN, POLL_INTERVAL_MINUTES
+from config import (
+    ARCHIVE_RETENTION_PERIOD,
+    DATA_RETENTION_PERIOD,
+    TEMPERATURE_THRESHOLD,
+    TEMPERATURE_NORMAL_MARGIN,
+    POLL_INTERVAL_MINUTES,
+    HISTORY_MAX_PAGE_SIZE,
+    IMPORT_API_TOKEN,
+    STREAM_CHECK_INTERVAL_SECONDS,
+    STREAM_HEARTBEAT_SECONDS,
+    STREAM_MAX_CLIENTS,
+    STREAM_MAX_SECONDS,
+    STREAM_REPLAY_LIMIT
+)
 
 app = Flask(__name__)
 
+def _next_poll(now):
+    """Return when the poller next runs (its cron fires every POLL_INTERVAL_MINUTES from minute 0)."""
+    minute = now.minute - now.minute % POLL_INTERVAL_MINUTES + POLL_INTERVAL_MINUTES
+    start_of_hour = now.replace(minute=0, second=0, microsecond=0)
+    if minute >= 60:
+        return start_of_hour + timedelta(hours=1)
+    return start_of_hour + timedelta(minutes=minute)
+
+def conditional(view=None, *, negotiate=None):
+    """Add validators and freshness to a GET endpoint, and answer 304 without running it when nothing changed.
+
+    The ETag is derived from the storage backend's data_validator(), which
+    changes with every committed write and is the same in every worker and
+    across restarts, the request URL, the negotiated format, and the current
+    poll slot (ranges relative to now move with the clock even when no
+    reading arrives). Last-Modified is the latest reading's timestamp, for
+    information only: sensor channels, backfills and pruning change responses
+    without moving it, so If-Modified-Since is not used to answer 304.
+    Cache-Control lets clients reuse the response until the next poll could
+    have added a reading. The check costs a version check, so a 304 never
+    runs the view's range query. Backends that cannot report a version are
+    served unconditionally.
+
+    Args:
+        negotiate: For endpoints that pick their format from the Accept header,
+            a function returning the request's mimetype; it is part of the
+            ETag and responses carry Vary: Accept
+    """
+    if view is None:
+        return functools.partial(conditional, negotiate=negotiate)
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        validator = data_validator()
+        if validator is None:
+            return view(*args, **kwargs)
+        now = datetime.now(timezone.utc)
+        next_poll = _next_poll(now)
+        mimetype = negotiate() if negotiate is not None else None
+        key = repr((validator, request.full_path, mimetype, next_poll.timestamp()))
+        etag = hashlib.sha1(key.encode()).hexdigest()[:24]
+        latest = get_latest_temperature()
+        last_modified = datetime.fromisoformat(latest['collected_at']) if latest else None
+
+        if not is_resource_modified(request.environ, etag=etag):
+            response = Response(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag, weak=True)
+        if last_modified is not None:
+            response.last_modified = last_modified
+        if negotiate is not None:
+            response.vary.add('Accept')
+        response.cache_control.max_age = math.ceil((next_poll - now).total_seconds())
+        return response
+    return wrapper
+
+@app.before_request
+def start_request_timer():
+    """Note when the request started, for record_request(), and start profiling it if enabled."""
+    g.request_started = time.perf_counter()
+    g.profile = profiling.start()
+
+@app.after_request
+def compress(response):
+    """Compress responses for clients that accept it (see app.compression)."""
+    return compress_response(response, request.accept_encodings)
+
+@app.after_request
+def record_request(response):
+    """Count the request and its latency by route in the /metrics histograms."""
+    rule = request.url_rule.rule if request.url_rule is not None else None
+    metrics.observe_request(
+        rule, request.method, response.status_code, time.perf_counter() - g.request_started
+    )
+    return response
+
+@app.teardown_request
+def finish_request_profile(exc):
+    """Save the request's profile if it was slow (see app.profiling)."""
+    rule = request.url_rule.rule if request.url_rule is not None else request.path
+    profiling.finish(g.pop('profile', None), f"{request.method} {rule}")
+
+@app.route('/metrics')
+def get_metrics():
+    """Expose counters and latency histograms for Prometheus.
+
+    With PROMETHEUS_MULTIPROC_DIR set, the values are summed over every web
+    worker and the poller; OpenMetrics is served when the Accept header asks
+    for it.
+    """
+    body, content_type = metrics.render(request.headers.get('Accept'))
+    response = Response(body, content_type=content_type)
+    response.vary.add('Accept')
+    return response
+
 @app.route('/health')
 def health_check():
-    """Health check endpoint for Docker container monitoring."""
+    """Health check endpoint for Docker container monitoring.
+
+    Also reports this worker's read cache and compression cache counters.
+    """
     return jsonify({
         'status': 'healthy',
-        'timestamp': datetime.now(timezone.utc).isoformat()
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'cache': read_cache_stats(),
+        'compression_cache': compression_cache_stats()
     }), 200
 
+def _parse_time_param(name, default):
+    """Parse an ISO-8601 query parameter as an aware UTC datetime.
+
+    Accepts both 'Z' and explicit offsets; timestamps without an offset are
+    taken to be UTC.
+
+    Raises:
+        ValueError: If the parameter is present but not a valid ISO timestamp
+    """
+    value = request.args.get(name)
+    if not value:
+        return default
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"Invalid {name} format. Use ISO format (e.g., 2024-03-14T12:00:00Z)")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+# Response formats for /temperature/history, keyed by ?format= value
+HISTORY_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'columnar': COLUMNAR_MIMETYPE,
+}
+
+def _history_format():
+    """Pick the history response format from ?format= or, failing that, the Accept header."""
+    requested = request.args.get('format')
+    if requested:
+        return requested.lower()
+    best = request.accept_mimetypes.best_match(list(HISTORY_FORMATS.values()), default='application/json')
+    return next(name for name, mimetype in HISTORY_FORMATS.items() if mimetype == best)
+
+def _history_mimetype():
+    """Return the mimetype of the history format picked for this request (None if unknown)."""
+    return HISTORY_FORMATS.get(_history_format())
+
 @app.route('/temperature/history')
+@conditional(negotiate=_history_mimetype)
 def get_temperature_history():
     """Return temperature readings within a specified time range.
     
     Query Parameters:
         start_time: ISO format timestamp (default: 14 days ago)
         end_time: ISO format timestamp (default: now)
+        resolution: 'raw' (default) for individual readings, or 'minute', 'hour' or
+            'day' for aggregated buckets with min/max/count
+        limit: Page size for raw readings (capped at HISTORY_MAX_PAGE_SIZE); enables pagination
+        before: Cursor from a previous page; continue with older readings
+        after: Cursor from a previous page; continue with newer readings
+        stream: 'true' to stream the JSON array in chunks instead of building it in memory
+        format: 'json' (default), 'ndjson' for one streamed reading per line, or
+            'columnar' for packed binary columns (see app/export.py); the matching
+            Accept header selects a format when the parameter is absent
+        delta: 'true' to delta-encode timestamps in the columnar format
+        max_points: Downsample raw readings to at most this many (at least 3) with
+            Largest-Triangle-Three-Buckets, for charts
+
+    When paginating, the response carries a Link header (rel="next") and an
+    X-Next-Cursor header until the range is exhausted.
     
     Example: /temperature/history?start_time=2024-03-01T00:00:00Z&end_time=2024-03-14T23:59:59Z
     """
     # Get current time in UTC
     now = datetime.now(timezone.utc)
-    
-    # Parse start_time parameter or default to 14 days ago
-    start_time = request.args.get('start_time')
-    if start_time:
-        try:
-            start_time = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-        except ValueError:
-            return jsonify({"error": "Invalid start_time format. Use ISO format (e.g., 2024-03-14T12:00:00Z)"}), 400
-    else:
-        start_time = now - timedelta(days=14)
-    
-    # Parse end_time parameter or default to now
-    end_time = request.args.get('end_time')
-    if end_time:
-        try:
-            end_time = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-        except ValueError:
-            return jsonify({"error": "Invalid end_time format. Use ISO format (e.g., 2024-03-14T12:00:00Z)"}), 400
-    else:
-        end_time = now
-    
+
+    try:
+        start_time = _parse_time_param('start_time', now - timedelta(days=14))
+        end_time = _parse_time_param('end_time', now)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     # Validate time range
     if start_time > end_time:
         return jsonify({"error": "start_time must be before end_time"}), 400
-    
-    readings = fetch_temperature_history(start_time, end_time)
-    return jsonify(readings)
+
+    resolution = request.args.get('resolution', 'raw')
+    paginated = any(name in request.args for name in ('limit', 'before', 'after'))
+    response_format = _history_format()
+    if response_format not in HISTORY_FORMATS:
+        return jsonify({"error": f"Invalid format. Use one of: {', '.join(HISTORY_FORMATS)}"}), 400
+    ndjson = response_format == 'ndjson'
+    streamed = ndjson or request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+    try:
+        max_points = _parse_max_points()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if max_points is not None and (paginated or streamed or resolution != 'raw' or response_format != 'json'):
+        return jsonify({"error": "max_points is only supported for unpaginated raw JSON readings"}), 400
+    if streamed and (paginated or resolution != 'raw'):
+        return jsonify({"error": "Streaming is only supported for unpaginated raw readings"}), 400
+    if response_format == 'columnar' and (paginated or resolution != 'raw'):
+        return jsonify({"error": "The columnar format is only supported for unpaginated raw readings"}), 400
+    if resolution == 'raw':
+        if response_format == 'columnar':
+            return _columnar_history(start_time, end_time)
+        if streamed:
+            return _streamed_history(start_time, end_time, ndjson)
+        if paginated:
+            return _paginated_history(start_time, end_time)
+        if max_points is not None:
+            return _downsampled_history(start_time, end_time, max_points)
+        return jsonify(fetch_temperature_history(start_time, end_time))
+    if paginated:
+        return jsonify({"error": "Pagination is only supported for raw readings"}), 400
+    if resolution not in ROLLUP_RESOLUTIONS:
+        return jsonify({"error": f"Invalid resolution. Use one of: raw, {', '.join(ROLLUP_RESOLUTIONS)}"}), 400
+    return jsonify(fetch_temperature_rollups(resolution, start_time, end_time))
+
+def _parse_max_points():
+    """Parse the optional max_points query parameter.
+
+    Raises:
+        ValueError: If the parameter is present but not an integer of at least 3
+    """
+    value = request.args.get('max_points')
+    if value is None:
+        return None
+    try:
+        max_points = int(value)
+    except ValueError:
+        max_points = 0
+    if max_points < 3:
+        raise ValueError("max_points must be an integer of at least 3")
+    return max_points
+
+def _downsampled_history(start_time, end_time, max_points):
+    """Serve raw history reduced to at most max_points readings with LTTB.
+
+    The readings are loaded as arrays rather than dicts, so the cost of a
+    long range is one columnar read plus a loop over max_points buckets, and
+    the response never holds more than max_points readings.
+    """
+    timestamps, temperatures = analytics.load_history(start_time, end_time)
+    kept = analytics.lttb(timestamps, temperatures, max_points)
+    response = _series_response(timestamps[kept], temperatures[kept], 'temperature')
+    response.headers['X-Downsampled-From'] = str(len(timestamps))
+    return response
+
+def _streamed_history(start_time, end_time, ndjson):
+    """Stream raw history as a chunked JSON array or as NDJSON lines.
+
+    Rows are read from SQLite a chunk at a time, so memory stays flat and the
+    first byte is sent before the query has finished.
+    """
+    batches = iter_temperature_history(start_time, end_time)
+
+    def generate_ndjson():
+        for batch in batches:
+            yield ''.join(json.dumps(reading, separators=(',', ':')) + '\n' for reading in batch)
+
+    def generate_json():
+        yield '['
+        separator = ''
+        for batch in batches:
+            yield separator + json.dumps(batch, separators=(',', ':'))[1:-1]
+            separator = ','
+        yield ']'
+
+    if ndjson:
+        return Response(generate_ndjson(), mimetype=HISTORY_FORMATS['ndjson'])
+    return Response(generate_json(), mimetype=HISTORY_FORMATS['json'])
+
+def _columnar_history(start_time, end_time):
+    """Serve raw history as packed little-endian int64 timestamp and float32 value columns."""
+    timestamps, temperatures = fetch_temperature_columns(start_time, end_time)
+    delta = request.args.get('delta', '').lower() in ('1', 'true', 'yes')
+    response = Response(encode_columnar(timestamps, temperatures, delta), mimetype=COLUMNAR_MIMETYPE)
+    response.headers['X-Reading-Count'] = str(len(timestamps))
+    return response
+
+def _paginated_history(start_time, end_time):
+    """Serve one keyset-paginated page of /temperature/history."""
+    try:
+        limit = int(request.args.get('limit', HISTORY_MAX_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if limit < 1:
+        return jsonify({"error": "limit must be at least 1"}), 400
+    limit = min(limit, HISTORY_MAX_PAGE_SIZE)
+
+    before = request.args.get('before')
+    after = request.args.get('after')
+    try:
+        readings, next_cursor = fetch_temperature_page(start_time, end_time, limit, before, after)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = jsonify(readings)
+    if next_cursor is not None:
+        params = {
+            key: value for key, value in request.args.items()
+            if key not in ('before', 'after')
+        }
+        params['limit'] = limit
+        params['after' if after is not None else 'before'] = next_cursor
+        response.headers['Link'] = f'<{url_for("get_temperature_history", **params)}>; rel="next"'
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+def _reading_payload(reading):
+    """Return a reading as /temperature/latest reports it, with its alert state."""
+    temperature = reading['temperature']
+    return {
+        "temperature": temperature,
+        "collected_at": reading['collected_at'],
+        # Check if temperature is above threshold
+        "is_alert": temperature > TEMPERATURE_THRESHOLD,
+        "is_normal": temperature < (TEMPERATURE_THRESHOLD - TEMPERATURE_NORMAL_MARGIN)
+    }
 
 @app.route('/temperature/latest')
+@conditional
 def get_latest():
     """Return the most recent temperature reading."""
     latest = get_latest_temperature()
     if latest is None:
         return jsonify({"error": "No temperature readings available"}), 404
-        
-    temperature = latest['temperature']
-    
-    # Check if temperature is above threshold
-    is_alert = temperature > TEMPERATURE_THRESHOLD
-    is_normal = temperature < (TEMPERATURE_THRESHOLD - TEMPERATURE_NORMAL_MARGIN)
-    
-    return jsonify({
-        "temperature": temperature,
-        "collected_at": latest['collected_at'],
-        "is_alert": is_alert,
-        "is_normal": is_normal
-    })
+    return jsonify(_reading_payload(latest))
+
+# Shared by every /temperature/stream connection this worker serves
+_broadcaster = ReadingBroadcaster(STREAM_CHECK_INTERVAL_SECONDS)
+
+# How long EventSource clients wait before reconnecting after the stream closes or drops
+STREAM_RETRY_MS = 5000
+
+# Each WSGI stream holds a server thread until it closes; past STREAM_MAX_CLIENTS
+# they would starve every other request, so new streams are refused instead
+_stream_slots = threading.BoundedSemaphore(STREAM_MAX_CLIENTS)
+
+def _reading_event(reading):
+    """Format a reading as a Server-Sent Event whose id is its epoch-millisecond timestamp."""
+    return f"id: {reading['timestamp_ms']}\nevent: reading\ndata: {json.dumps(_reading_payload(reading))}\n\n"
+
+def _parse_event_id(value):
+    """Parse a Last-Event-ID as epoch milliseconds, or None if it is empty.
+
+    Raises:
+        ValueError: If it is not an integer SQLite can compare, from 0 to 2**63 - 1
+    """
+    if not value:
+        return None
+    after_ms = int(value)
+    if not 0 <= after_ms <= 2**63 - 1:
+        raise ValueError("Last-Event-ID out of range")
+    return after_ms
+
+def _stream_start(after_ms):
+    """Return (after_ms, readings) to open a stream with, for a client resuming after after_ms (None if new).
+
+    Call after subscribing to _broadcaster, so no reading falls between the
+    replay and the first published one.
+    """
+    if after_ms is not None:
+        return after_ms, fetch_readings_after(after_ms, limit=STREAM_REPLAY_LIMIT)
+    after_ms = _broadcaster.newest_ms
+    return after_ms, fetch_readings_after(after_ms - 1, limit=1) if after_ms else []
+
+@app.route('/temperature/stream')
+def stream_temperature():
+    """Push every new reading to the client as a Server-Sent Event.
+
+    A new connection starts with the latest reading. A reconnecting client's
+    Last-Event-ID header (or a last_event_id query parameter) resumes after
+    that reading instead, replaying up to STREAM_REPLAY_LIMIT it missed.
+    Comments are sent after STREAM_HEARTBEAT_SECONDS without a reading to
+    keep proxies from timing the connection out, and the stream ends after
+    STREAM_MAX_SECONDS so clients reconnect and long-lived connections are
+    spread over restarted workers.
+
+    At most STREAM_MAX_CLIENTS streams are served at once; beyond that the
+    response is a 503 with Retry-After, which closes an EventSource so the
+    dashboard polls instead.
+    """
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    try:
+        after_ms = _parse_event_id(last_event_id)
+    except ValueError:
+        return jsonify({"error": "Invalid Last-Event-ID, expected epoch milliseconds"}), 400
+    if not _stream_slots.acquire(blocking=False):
+        response = jsonify({"error": "Too many live streams, poll instead"})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(STREAM_RETRY_MS // 1000)
+        return response
+
+    def events(after_ms):
+        _broadcaster.subscribe()
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            after_ms, replay = _stream_start(after_ms)
+            for reading in replay:
+                yield _reading_event(reading)
+                after_ms = reading['timestamp_ms']
+
+            deadline = time.monotonic() + STREAM_MAX_SECONDS
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                readings = _broadcaster.wait(after_ms, min(STREAM_HEARTBEAT_SECONDS, remaining))
+                if not readings:
+                    yield ": keep-alive\n\n"
+                for reading in readings:
+                    yield _reading_event(reading)
+                    after_ms = reading['timestamp_ms']
+        finally:
+            _broadcaster.unsubscribe()
+
+    response = Response(events(after_ms), mimetype='text/event-stream')
+    # Run by the server when the connection ends, even if the body was never iterated
+    response.call_on_close(_stream_slots.release)
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop reverse proxies such as nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @app.route('/temperature/hourly')
+@conditional
 def get_hourly_temperatures():
-    """Return temperature readings from the past hour."""
+    """Return temperature readings from the past hour.
+
+    Query Parameters:
+        max_points: Downsample to at most this many readings, as for /temperature/history
+    """
     end_time = datetime.now(timezone.utc)
     start_time = end_time - timedelta(hours=1)
-    
+
+    try:
+        max_points = _parse_max_points()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if max_points is not None:
+        return _downsampled_history(start_time, end_time, max_points)
+
     readings = fetch_temperature_history(start_time, end_time)
     return jsonify(readings)
 
+@app.route('/temperature/stats')
+@conditional
+def get_temperature_stats():
+    """Return summary statistics for the readings within a time range.
+
+    Query Parameters:
+        start_time: ISO format timestamp (default: 14 days ago)
+        end_time: ISO format timestamp (default: now)
+        percentiles: Comma-separated percentiles between 0 and 100 (default: 5,25,50,75,95)
+
+    Example: /temperature/stats?start_time=2024-03-01T00:00:00Z&percentiles=50,99
+    """
+    now = datetime.now(timezone.utc)
+
+    try:
+        start_time = _parse_time_param('start_time', now - timedelta(days=14))
+        end_time = _parse_time_param('end_time', now)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if start_time > end_time:
+        return jsonify({"error": "start_time must be before end_time"}), 400
+
+    percentiles = DEFAULT_PERCENTILES
+    if request.args.get('percentiles'):
+        try:
+            percentiles = [float(value) for value in request.args['percentiles'].split(',')]
+        except ValueError:
+            return jsonify({"error": "percentiles must be a comma-separated list of numbers"}), 400
+
+    try:
+        stats = fetch_temperature_stats(start_time, end_time, percentiles)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    stats["start_time"] = start_time.isoformat()
+    stats["end_time"] = end_time.isoformat()
+    return jsonify(stats)
+
+# Request Content-Types accepted by /temperature/import
+IMPORT_MIMETYPES = {
+    'text/csv': 'csv',
+    'application/json': 'json',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson'
+}
+
+@app.route('/temperature/import', methods=['POST'])
+def import_temperature_readings():
+    """Bulk-import readings with explicit timestamps (backfills).
+
+    Disabled unless IMPORT_API_TOKEN is set; requests must then send it as
+    "Authorization: Bearer <token>". The body is CSV, a JSON list or NDJSON,
+    chosen by Content-Type, with collected_at (ISO-8601 or epoch milliseconds)
+    and temperature fields. Readings whose timestamp is already stored are
+    skipped and invalid ones are counted, as in database.import_readings().
+
+    Example: curl -X POST -H "Authorization: Bearer $TOKEN" -H "Content-Type: text/csv" \
+        --data-binary @readings.csv http://localhost:5000/temperature/import
+    """
+    if not IMPORT_API_TOKEN:
+        return jsonify({"error": "Import is disabled; set IMPORT_API_TOKEN to enable it"}), 403
+    supplied = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(supplied.encode(), f'Bearer {IMPORT_API_TOKEN}'.encode()):
+        return jsonify({"error": "Invalid or missing import token"}), 401
+
+    fmt = IMPORT_MIMETYPES.get(request.mimetype)
+    if fmt is None:
+        return jsonify({"error": f"Unsupported Content-Type. Use one of: {', '.join(IMPORT_MIMETYPES)}"}), 415
+    try:
+        readings = parse_text(request.get_data(as_text=True), fmt)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    report = import_readings(readings)
+    return jsonify(report), 200
+
+# Longest duration a query parameter may ask for: as far back as any reading is kept
+_MAX_MINUTES = max(DATA_RETENTION_PERIOD, ARCHIVE_RETENTION_PERIOD) / timedelta(minutes=1)
+
+def _parse_minutes_param(name, default):
+    """Parse a positive duration in minutes from the query string, returned in milliseconds.
+
+    Raises:
+        ValueError: If the parameter is present but not a positive number no
+            longer than the retention period
+    """
+    value = request.args.get(name)
+    if value is None:
+        return default * 60 * 1000
+    try:
+        minutes = float(value)
+    except ValueError:
+        minutes = 0
+    if not 0 < minutes <= _MAX_MINUTES:
+        raise ValueError(f"{name} must be a positive number of minutes, at most {_MAX_MINUTES:g}")
+    return int(minutes * 60 * 1000)
+
+def _analytics_range():
+    """Parse start_time/end_time for an analytics endpoint and load the readings as arrays.
+
+    Raises:
+        ValueError: If either time is invalid or they are out of order
+    """
+    now = datetime.now(timezone.utc)
+    start_time = _parse_time_param('start_time', now - timedelta(days=14))
+    end_time = _parse_time_param('end_time', now)
+    if start_time > end_time:
+        raise ValueError("start_time must be before end_time")
+    return analytics.load_history(start_time, end_time)
+
+def _series_response(timestamps, values, key):
+    """Serve a derived series like /temperature/history: newest first, NaN as null."""
+    collected_at = analytics.format_timestamps(timestamps[::-1]).tolist()
+    values = values[::-1].tolist()
+    return jsonify([
+        {"collected_at": at, key: None if value != value else value}
+        for at, value in zip(collected_at, values)
+    ])
+
+# Readings further apart than this count as a gap when the request does not say
+DEFAULT_MAX_GAP_MINUTES = 2 * POLL_INTERVAL_MINUTES
+
+@app.route('/analytics/moving-average')
+@conditional
+def get_moving_average():
+    """Return the trailing moving average of the readings in a time range.
+
+    Query Parameters:
+        start_time: ISO format timestamp (default: 14 days ago)
+        end_time: ISO format timestamp (default: now)
+        window: Averaging window in minutes (default: 60)
+    """
+    try:
+        window_ms = _parse_minutes_param('window', 60)
+        timestamps, temperatures = _analytics_range()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return _series_response(timestamps, analytics.moving_average(timestamps, temperatures, window_ms), 'temperature')
+
+@app.route('/analytics/smoothed')
+@conditional
+def get_smoothed():
+    """Return the exponentially smoothed readings in a time range.
+
+    Query Parameters:
+        start_time: ISO format timestamp (default: 14 days ago)
+        end_time: ISO format timestamp (default: now)
+        half_life: Minutes for a reading's weight to halve (default: 30)
+    """
+    try:
+        half_life_ms = _parse_minutes_param('half_life', 30)
+        timestamps, temperatures = _analytics_range()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    smoothed = analytics.exponential_smoothing(timestamps, temperatures, half_life_ms)
+    return _series_response(timestamps, smoothed, 'temperature')
+
+@app.route('/analytics/rate')
+@conditional
+def get_rate_of_change():
+    """Return the rate of change in °C/hour at each reading in a time range.
+
+    Query Parameters:
+        start_time: ISO format timestamp (default: 14 days ago)
+        end_time: ISO format timestamp (default: now)
+        window: Look-back window in minutes (default: 60)
+    """
+    try:
+        window_ms = _parse_minutes_param('window', 60)
+        timestamps, temperatures = _analytics_range()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return _series_response(timestamps, analytics.rate_of_change(timestamps, temperatures, window_ms), 'rate')
+
+@app.route('/analytics/time-above')
+@conditional
+def get_time_above_threshold():
+    """Return how long the temperature spent above a threshold in a time range.
+
+    Query Parameters:
+        start_time: ISO format timestamp (default: 14 days ago)
+        end_time: ISO format timestamp (default: now)
+        threshold: Temperature in °C (default: TEMPERATURE_THRESHOLD)
+        max_gap: Minutes between readings beyond which time is not counted
+            (default: twice the poll interval)
+    """
+    try:
+        threshold = float(request.args.get('threshold', TEMPERATURE_THRESHOLD))
+    except ValueError:
+        return jsonify({"error": "threshold must be a number"}), 400
+    try:
+        max_gap_ms = _parse_minutes_param('max_gap', DEFAULT_MAX_GAP_MINUTES)
+        timestamps, temperatures = _analytics_range()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    totals = analytics.time_above_threshold(timestamps, temperatures, threshold, max_gap_ms)
+    return jsonify({
+        "threshold": threshold,
+        "above_seconds": totals["above_ms"] / 1000,
+        "observed_seconds": totals["observed_ms"] / 1000,
+        "fraction": totals["above_ms"] / totals["observed_ms"] if totals["observed_ms"] else None,
+        "episodes": totals["episodes"]
+    })
+
+@app.route('/analytics/gaps')
+@conditional
+def get_gaps():
+    """Return the stretches in a time range with no readings, newest first.
+
+    Query Parameters:
+        start_time: ISO format timestamp (default: 14 days ago)
+        end_time: ISO format timestamp (default: now)
+        max_gap: Minutes between readings beyond which it is a gap
+            (default: twice the poll interval)
+    """
+    try:
+        max_gap_ms = _parse_minutes_param('max_gap', DEFAULT_MAX_GAP_MINUTES)
+        timestamps, _ = _analytics_range()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    starts, ends = analytics.find_gaps(timestamps, max_gap_ms)
+    durations = ((ends - starts) / 1000)[::-1].tolist()
+    return jsonify([
+        {"start": start, "end": end, "duration_seconds": duration}
+        for start, end, duration in zip(
+            analytics.format_timestamps(starts[::-1]).tolist(),
+            analytics.format_timestamps(ends[::-1]).tolist(),
+            durations
+        )
+    ])
+
+@app.route('/sensors')
+@conditional
+def get_sensors():
+    """Return every sensor that has reported readings and the channels it provides."""
+    return jsonify(list_sensor_channels())
+
+@app.route('/sensors/<sensor>/<channel>/history')
+@conditional
+def get_sensor_history(sensor, channel):
+    """Return one sensor channel's readings within a specified time range.
+
+    Query Parameters:
+        start_time: ISO format timestamp (default: 14 days ago)
+        end_time: ISO format timestamp (default: now)
+
+    Example: /sensors/1-1.2/internal_humidity/history?start_time=2024-03-14T00:00:00Z
+    """
+    now = datetime.now(timezone.utc)
+
+    try:
+        start_time = _parse_time_param('start_time', now - timedelta(days=14))
+        end_time = _parse_time_param('end_time', now)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if start_time > end_time:
+        return jsonify({"error": "start_time must be before end_time"}), 400
+
+    readings = fetch_sensor_history(sensor, channel, start_time, end_time)
+    if readings is None:
+        return jsonify({"error": f"Unknown sensor channel: {sensor}/{channel}"}), 404
+    return jsonify(readings)
+
+# How far back the dashboard chart reaches by default
+DASHBOARD_WINDOW_MINUTES = 60
+
+def _dashboard_payload(window_ms, after_ms=None):
+    """Return the dashboard's latest reading and chart window, read from one storage snapshot.
+
+    Args:
+        window_ms: How far back from now the chart window reaches
+        after_ms: Only include chart readings after this epoch-millisecond cursor
+
+    Returns:
+        dict: latest (as /temperature/latest reports it, or None), readings
+            (newest first), cursor (epoch ms of the newest reading the client
+            then holds, to pass back as after), window_start and threshold
+    """
+    window_start = datetime.now(timezone.utc) - timedelta(milliseconds=window_ms)
+    latest, readings = fetch_dashboard_snapshot(window_start, after_ms)
+    cursor = after_ms
+    if latest is not None:
+        cursor = latest['timestamp_ms'] if after_ms is None else max(after_ms, latest['timestamp_ms'])
+    return {
+        "latest": _reading_payload(latest) if latest is not None else None,
+        "readings": [
+            {"temperature": reading['temperature'], "collected_at": reading['collected_at']}
+            for reading in readings
+        ],
+        "cursor": cursor,
+        "window_start": window_start.isoformat(),
+        "threshold": TEMPERATURE_THRESHOLD,
+    }
+
+@app.route('/dashboard/data')
+@conditional
+def get_dashboard_data():
+    """Return everything the dashboard shows: the latest reading with its alert state and the chart window.
+
+    Query Parameters:
+        minutes: How far back the chart window reaches (default: DASHBOARD_WINDOW_MINUTES)
+        after: Cursor from a previous response; only readings newer than it are returned
+    """
+    try:
+        window_ms = _parse_minutes_param('minutes', DASHBOARD_WINDOW_MINUTES)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    after = request.args.get('after')
+    try:
+        after_ms = int(after) if after is not None else None
+    except ValueError:
+        return jsonify({"error": "Invalid after, expected epoch milliseconds"}), 400
+    return jsonify(_dashboard_payload(window_ms, after_ms))
+
 @app.route('/')
 def temperature_display():
-    """Display the latest temperature in a simple HTML page."""
-    latest = get_latest_temperature()
+    """Display the latest temperature in a simple HTML page.
+
+    The page embeds the /dashboard/data payload, so it draws the chart
+    without requesting anything else.
+    """
+    dashboard = _dashboard_payload(DASHBOARD_WINDOW_MINUTES * 60 * 1000)
+    latest = dashboard['latest']
     if not latest:
         return "No temperature readings available", 404
-        
-    temperature = latest['temperature']
-    timestamp = latest['collected_at']
-    
-    # Check if temperature is above threshold
-    is_alert = temperature > TEMPERATURE_THRESHOLD
-    is_normal = temperature < (TEMPERATURE_THRESHOLD - TEMPERATURE_NORMAL_MARGIN)
     
     # Calculate refresh interval in milliseconds (poll interval + 10 seconds)
     refresh_interval = (POLL_INTERVAL_MINUTES * 60 + 2) * 1000
     
     return render_template(
         'temperature.html',
-        temperature=temperature,
-        timestamp=timestamp,
-        is_alert=is_alert,
-        is_normal=is_normal,
+        temperature=latest['temperature'],
+        timestamp=latest['collected_at'],
+        is_alert=latest['is_alert'],
+        is_normal=latest['is_normal'],
         refresh_interval=refresh_interval,
-        temperature_threshold=TEMPERATURE_THRESHOLD
-    ) 
\ No newline at end of file
+        temperature_threshold=TEMPERATURE_THRESHOLD,
+        dashboard=dashboard
+    )
@@ -0,0 +1,40 @@
+import argparse
+import sys
+from app.database import init_db, backup_database
+from config import (
+    BACKUP_DIR,
+    BACKUP_KEEP,
+    BACKUP_PAGES_PER_STEP,
+    BACKUP_STEP_SLEEP_MS,
+    BACKUP_COMPRESS
+)
+
+def main(argv=None):
+    """Take an online snapshot of the database from the command line."""
+    parser = argparse.ArgumentParser(description="Snapshot the temperature database while the app keeps running.")
+    parser.add_argument('--dir', default=BACKUP_DIR, help="Directory to write the snapshot to (default: BACKUP_DIR)")
+    parser.add_argument('--keep', type=int, default=BACKUP_KEEP, help="Snapshots to keep, 0 for all (default: BACKUP_KEEP)")
+    parser.add_argument('--pages-per-step', type=int, default=BACKUP_PAGES_PER_STEP, help="Pages copied per step")
+    parser.add_argument('--step-sleep-ms', type=int, default=BACKUP_STEP_SLEEP_MS, help="Pause between steps")
+    parser.add_argument('--compress', action=argparse.BooleanOptionalAction, default=BACKUP_COMPRESS,
+                        help="Gzip the snapshot (default: BACKUP_COMPRESS)")
+    args = parser.parse_args(argv)
+
+    init_db()
+    try:
+        report = backup_database(
+            args.dir, compress=args.compress, keep=args.keep,
+            pages_per_step=args.pages_per_step, step_sleep_ms=args.step_sleep_ms
+        )
+    except (OSError, NotImplementedError) as e:
+        print(f"Backup failed: {e}")
+        return 1
+    print(
+        f"Wrote {report['path']}: {report['bytes']} bytes ({report['database_bytes']} uncompressed), "
+        f"{report['pages']} pages in {report['steps']} steps, {report['duration_seconds']:.2f}s; "
+        f"deleted {report['deleted_backups']} old backups"
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Compare the on-disk size and read speed of raw readings and compressed archive blocks.
+
+Seeds one reading per minute with realistic jitter and 1/16 °C steps, seals
+everything into the archive, and compares the database size and history
+query time before and after.
+
+Usage:
+    python benchmarks/bench_archive.py [--days 30] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import database
+from app.database import SQLiteBackend
+
+MINUTE_MS = 60 * 1000
+
+def readings(days):
+    """Return one (timestamp_ms, temperature) reading per minute for the given number of days."""
+    random.seed(0)
+    # End before now so the readings stay inside ARCHIVE_RETENTION_PERIOD once sealed
+    timestamp_ms, temperature = int(time.time() * 1000) - (days + 1) * 24 * 60 * MINUTE_MS, 21.0
+    rows = []
+    for _ in range(days * 24 * 60):
+        rows.append((timestamp_ms + random.randint(0, 500), temperature))
+        timestamp_ms += MINUTE_MS
+        temperature = min(30.0, max(15.0, temperature + random.choice((-0.0625, 0.0, 0.0, 0.0625))))
+    return rows
+
+def database_bytes(conn):
+    """Vacuum and return the database size in bytes."""
+    conn.execute('VACUUM')
+    page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+    return page_count * conn.execute('PRAGMA page_size').fetchone()[0]
+
+def best_time(func, repeat):
+    """Return the best wall time of func in milliseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=30, help='days of one-minute readings to seed')
+    parser.add_argument('--repeat', type=int, default=3, help='history queries per measurement; the best is reported')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DB_PATH'] = os.path.join(tmp, 'archive.db')
+        backend = SQLiteBackend()
+        backend.initialize()
+        rows = readings(args.days)
+        backend.append(rows)
+        conn = database.get_connection()
+        start_ms, end_ms = rows[0][0], rows[-1][0]
+
+        # Rollups are the same either way, so measure without them
+        with conn:
+            conn.execute('DELETE FROM temperature_rollups')
+        raw_bytes = database_bytes(conn)
+        raw_ms = best_time(lambda: backend.range(start_ms, end_ms), args.repeat)
+
+        started = time.perf_counter()
+        report = backend.prune(end_ms + 1, vacuum_pages=0)
+        seal_seconds = time.perf_counter() - started
+        with conn:
+            conn.execute('DELETE FROM temperature_rollups')
+        archive_bytes = database_bytes(conn)
+        block_bytes = conn.execute('SELECT SUM(length(data)) FROM archive_blocks').fetchone()[0]
+        archive_ms = best_time(lambda: backend.range(start_ms, end_ms), args.repeat)
+        assert backend.range(start_ms, end_ms) == sorted(rows, reverse=True)
+        backend.close()
+
+    count = len(rows)
+    print(f"{count} readings over {args.days} days, {report['archived_rows']} archived in {seal_seconds:.2f}s")
+    print(f"{'storage':<16}{'db bytes':>12}{'bytes/reading':>15}{'full range ms':>15}")
+    print(f"{'raw rows':<16}{raw_bytes:>12}{raw_bytes / count:>15.2f}{raw_ms:>15.1f}")
+    print(f"{'archive':<16}{archive_bytes:>12}{archive_bytes / count:>15.2f}{archive_ms:>15.1f}")
+    print(f"block payloads: {block_bytes} bytes ({block_bytes / count:.2f} bytes/reading), "
+          f"{archive_bytes / raw_bytes:.1%} of the raw database")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Compare compressed /temperature/history sizes and the cost of compressing them.
+
+For each installed encoding, reports the compressed size and compression
+time of the JSON history at a few levels, then the request time without
+compression, with compression, and with the body already in the
+compression cache (a repeated dashboard load).
+
+Usage:
+    python benchmarks/bench_compression.py [--rows 20160] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_database import seed
+from app import compression, database
+from app.views import app
+
+LEVELS = {'gzip': (1, 6, 9), 'br': (1, 5, 11), 'zstd': (1, 3, 19)}
+
+def best_time(action, repeat):
+    """Return the best of repeat timings of action() in ms."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        action()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20160, help='readings to seed (default: 14 days at 1/min)')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per measurement; the best time is reported')
+    args = parser.parse_args()
+
+    encodings = compression.available_encodings(['gzip', 'br', 'zstd'])
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DB_PATH'] = os.path.join(tmp, 'compression.db')
+        seed(args.rows)
+        client = app.test_client()
+        body = client.get('/temperature/history').get_data()
+
+        print(f"{args.rows} readings, {len(body)} bytes of JSON")
+        print(f"{'encoding':<10}{'level':>6}{'bytes':>10}{'ratio':>8}{'compress ms':>13}")
+        for encoding in encodings:
+            for level in LEVELS[encoding]:
+                size = len(compression.compress(body, encoding, level))
+                elapsed_ms = best_time(lambda: compression.compress(body, encoding, level), args.repeat)
+                print(f"{encoding:<10}{level:>6}{size:>10}{len(body) / size:>7.1f}x{elapsed_ms:>13.1f}")
+
+        def request(accept_encoding):
+            client.get('/temperature/history', headers={'Accept-Encoding': accept_encoding}).get_data()
+
+        print(f"\n{'request':<24}{'time ms':>10}")
+        print(f"{'identity':<24}{best_time(lambda: request('identity'), args.repeat):>10.1f}")
+        for encoding in encodings:
+            def uncached():
+                compression._cache.clear()
+                request(encoding)
+            print(f"{encoding + ' (compressing)':<24}{best_time(uncached, args.repeat):>10.1f}")
+            print(f"{encoding + ' (cached)':<24}{best_time(lambda: request(encoding), args.repeat):>10.1f}")
+        database.close_connections()
+
+if __name__ == '__main__':
+    main()
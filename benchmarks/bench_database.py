@@ -0,0 +1,124 @@
+"""Benchmark the database layer and the API routes that sit on top of it.
+
+Compares the legacy connect-per-call access pattern (rollback journal, a fresh
+sqlite3.connect() for every query) against the shared WAL connection manager.
+
+Usage:
+    python benchmarks/bench_database.py [--rows 20160] [--seconds 2]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import database
+from app.views import app
+
+@contextmanager
+def legacy_connections():
+    """Make the database module open a fresh rollback-journal connection per call."""
+    def connect():
+        conn = sqlite3.connect(database.get_db_path())
+        conn.execute('PRAGMA journal_mode=DELETE')
+        return conn
+    with patch.object(database, 'get_connection', connect):
+        yield
+
+def seed(rows):
+    """Fill the database with one reading per minute ending now."""
+    database.init_db()
+    now = datetime.now(timezone.utc)
+    readings = [
+        (20.0 + (i % 60) / 10, int((now - timedelta(minutes=i)).timestamp() * 1000))
+        for i in range(rows)
+    ]
+    conn = database.get_connection()
+    with conn:
+        conn.executemany(
+            'INSERT INTO temperature_readings (temperature, timestamp_ms) VALUES (?, ?)',
+            readings
+        )
+
+def rate(func, seconds):
+    """Call func repeatedly for the given duration and return calls per second."""
+    calls = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        func()
+        calls += 1
+    return calls / seconds
+
+def mixed_rate(seconds, readers=4):
+    """Run reader threads against /temperature/latest while a writer stores readings.
+
+    Returns (reader requests per second, writer inserts per second).
+    """
+    stop = threading.Event()
+    counts = [0] * (readers + 1)
+
+    def reader(slot):
+        client = app.test_client()
+        while not stop.is_set():
+            client.get('/temperature/latest')
+            counts[slot] += 1
+
+    def writer():
+        while not stop.is_set():
+            database.store_temperature(21.5)
+            counts[readers] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts[:readers]) / seconds, counts[readers] / seconds
+
+def run(label, rows, seconds):
+    """Seed a fresh database and measure each workload."""
+    seed(rows)
+    client = app.test_client()
+    results = {
+        'store_temperature': rate(lambda: database.store_temperature(21.5), seconds),
+        'GET /temperature/latest': rate(lambda: client.get('/temperature/latest'), seconds),
+        'GET /temperature/hourly': rate(lambda: client.get('/temperature/hourly'), seconds),
+    }
+    reads, writes = mixed_rate(seconds)
+    results['mixed: readers'] = reads
+    results['mixed: writer'] = writes
+    database.close_connections()
+    return label, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20160, help='readings to seed (default: 14 days at 1/min)')
+    parser.add_argument('--seconds', type=float, default=2.0, help='duration of each measurement')
+    args = parser.parse_args()
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DB_PATH'] = os.path.join(tmp, 'legacy.db')
+        with legacy_connections():
+            runs.append(run('before', args.rows, args.seconds))
+        os.environ['DB_PATH'] = os.path.join(tmp, 'pooled.db')
+        runs.append(run('after', args.rows, args.seconds))
+
+    (_, before), (_, after) = runs
+    print(f"{'workload':<28}{'before/s':>12}{'after/s':>12}{'speedup':>10}")
+    for name in before:
+        speedup = after[name] / before[name] if before[name] else float('inf')
+        print(f"{name:<28}{before[name]:>12.1f}{after[name]:>12.1f}{speedup:>9.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Compare /temperature/history payload size and serialization time across formats.
+
+Usage:
+    python benchmarks/bench_export.py [--rows 20160] [--repeat 5]
+"""
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_database import seed
+from app import database
+from app.views import app
+
+FORMATS = [
+    ('json', '/temperature/history'),
+    ('ndjson', '/temperature/history?format=ndjson'),
+    ('columnar', '/temperature/history?format=columnar'),
+    ('columnar+delta', '/temperature/history?format=columnar&delta=true'),
+]
+
+def measure(client, url, repeat):
+    """Return (best request time in ms, body) for a URL."""
+    best = float('inf')
+    body = b''
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = client.get(url).get_data()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20160, help='readings to seed (default: 14 days at 1/min)')
+    parser.add_argument('--repeat', type=int, default=5, help='requests per format; the best time is reported')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DB_PATH'] = os.path.join(tmp, 'export.db')
+        seed(args.rows)
+        client = app.test_client()
+        results = [(name, *measure(client, url, args.repeat)) for name, url in FORMATS]
+        database.close_connections()
+
+    json_ms, json_body = results[0][1], results[0][2]
+    print(f"{args.rows} readings")
+    print(f"{'format':<16}{'time ms':>10}{'bytes':>12}{'gzip bytes':>12}{'size vs json':>14}{'time vs json':>14}")
+    for name, elapsed_ms, body in results:
+        print(
+            f"{name:<16}{elapsed_ms:>10.1f}{len(body):>12}{len(gzip.compress(body)):>12}"
+            f"{len(body) / len(json_body):>13.2%}{elapsed_ms / json_ms:>13.2f}x"
+        )
+
+if __name__ == '__main__':
+    main()
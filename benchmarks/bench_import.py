@@ -0,0 +1,72 @@
+"""Measure bulk-import throughput against row-at-a-time inserts.
+
+Writes a CSV of one reading per second (with a tenth of them repeated, as
+in an overlapping backfill) and imports it with import_readings(), then
+times the same readings stored through append() in small transactions,
+the way a naive loader calling the poller's write path would.
+
+Usage:
+    python benchmarks/bench_import.py [--rows 1000000] [--batch-size 50000] [--baseline-rows 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import SQLiteBackend, import_readings
+from app.importer import read_csv
+
+def write_csv(path, rows):
+    """Write rows one-second readings ending before now, repeating every tenth."""
+    random.seed(0)
+    start_ms = int(time.time() * 1000) - (rows + 1) * 1000
+    temperature = 21.0
+    with open(path, 'w') as stream:
+        stream.write('collected_at,temperature\n')
+        for i in range(rows):
+            temperature = min(30.0, max(15.0, temperature + random.choice((-0.0625, 0.0, 0.0625))))
+            timestamp_ms = start_ms + (i - 1 if i % 10 == 9 else i) * 1000
+            stream.write(f'{timestamp_ms},{temperature}\n')
+    return start_ms
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000, help='readings in the imported file')
+    parser.add_argument('--batch-size', type=int, default=50000, help='readings per import transaction')
+    parser.add_argument('--baseline-rows', type=int, default=20000, help='readings stored one per transaction')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'readings.csv')
+        write_csv(csv_path, args.rows)
+
+        os.environ['DB_PATH'] = os.path.join(tmp, 'import.db')
+        backend = SQLiteBackend()
+        backend.initialize()
+        with open(csv_path, newline='') as stream:
+            report = import_readings(read_csv(stream), batch_size=args.batch_size)
+        backend.close()
+
+        os.environ['DB_PATH'] = os.path.join(tmp, 'baseline.db')
+        backend = SQLiteBackend()
+        backend.initialize()
+        start_ms = int(time.time() * 1000)
+        started = time.perf_counter()
+        for i in range(args.baseline_rows):
+            backend.append([(start_ms + i * 1000, 21.0)])
+        baseline_seconds = time.perf_counter() - started
+        backend.close()
+
+    import_rate = report['inserted'] / report['duration_seconds']
+    baseline_rate = args.baseline_rows / baseline_seconds
+    print(f"import: {report['inserted']} inserted, {report['skipped']} duplicates skipped, "
+          f"{report['batches']} batches in {report['duration_seconds']:.2f}s ({import_rate:,.0f} readings/s)")
+    print(f"one transaction per reading: {args.baseline_rows} in {baseline_seconds:.2f}s "
+          f"({baseline_rate:,.0f} readings/s), {import_rate / baseline_rate:.0f}x slower")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""Load-test the API under gunicorn (sync and gthread workers) and under the ASGI server.
+
+Each server is started on a throwaway database. The test then:
+1. Opens --streams idle /temperature/stream connections.
+2. While they are open, sends --requests API requests, --concurrency at a time.
+3. Stores a reading and times how long the open streams take to receive it.
+
+Requests that get no answer within --timeout seconds count as failed.
+
+Usage:
+    python benchmarks/bench_serving.py [--streams 1000] [--requests 200] [--concurrency 20]
+        [--servers gunicorn-sync,gunicorn-gthread,uvicorn]
+"""
+import argparse
+import asyncio
+import os
+import resource
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from bench_database import seed
+from app import database
+
+SERVERS = {
+    # The original deployment: one sync worker
+    'gunicorn-sync': ['gunicorn', '--bind', '127.0.0.1:{port}', 'run:app'],
+    # The supervisord deployment
+    'gunicorn-gthread': ['gunicorn', '--worker-class', 'gthread', '--threads', '32', '--bind', '127.0.0.1:{port}', 'run:app'],
+    'uvicorn': ['uvicorn', '--host', '127.0.0.1', '--port', '{port}', '--log-level', 'warning', 'run_asgi:app'],
+}
+
+PATHS = ['/temperature/latest', '/temperature/hourly', '/temperature/stats', '/temperature/history']
+
+async def get(port, path, timeout):
+    """Send one GET and return its status, or None if it failed or timed out."""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+        try:
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode())
+            response = await asyncio.wait_for(reader.read(), timeout)
+            return int(response.split(b' ', 2)[1])
+        finally:
+            writer.close()
+    except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+        return None
+
+async def open_stream(port, timeout):
+    """Open a /temperature/stream connection; returns (reader, writer) once its first event arrives, or None."""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+        writer.write(b'GET /temperature/stream HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        await asyncio.wait_for(reader.readuntil(b'event: reading'), timeout)
+        await asyncio.wait_for(reader.readuntil(b'\n\n'), timeout)
+        return reader, writer
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        return None
+
+async def wait_for_event(reader, timeout):
+    """Return the time the next reading event arrives on a stream, or None."""
+    try:
+        await asyncio.wait_for(reader.readuntil(b'event: reading'), timeout)
+        return time.perf_counter()
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        return None
+
+async def load(port, args):
+    """Run the three phases against a server and return the measurements."""
+    started = time.perf_counter()
+    streams = [s for s in await asyncio.gather(*(open_stream(port, args.timeout) for _ in range(args.streams))) if s]
+    open_seconds = time.perf_counter() - started
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, failures = [], 0
+
+    async def timed(path):
+        nonlocal failures
+        async with semaphore:
+            request_started = time.perf_counter()
+            status = await get(port, path, args.timeout)
+            if status == 200:
+                latencies.append((time.perf_counter() - request_started) * 1000)
+            else:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(PATHS[i % len(PATHS)]) for i in range(args.requests)))
+    request_seconds = time.perf_counter() - started
+
+    waiters = [asyncio.ensure_future(wait_for_event(reader, args.timeout)) for reader, _ in streams]
+    stored = time.perf_counter()
+    await asyncio.get_running_loop().run_in_executor(None, database.store_temperature, 21.5)
+    arrivals = [t for t in await asyncio.gather(*waiters) if t is not None]
+    fanout_ms = sorted((t - stored) * 1000 for t in arrivals)
+
+    for _, writer in streams:
+        writer.close()
+    return {
+        'streams': len(streams),
+        'open_seconds': open_seconds,
+        'latencies': sorted(latencies),
+        'failures': failures,
+        'request_seconds': request_seconds,
+        'fanout_ms': fanout_ms,
+    }
+
+def wait_until_up(port, timeout=20):
+    """Poll /health until the server answers."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if asyncio.run(get(port, '/health', 1)) == 200:
+            return
+        time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+def percentile(values, fraction):
+    """Return the value at fraction of a sorted list (nan if empty)."""
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else float('nan')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, default=1000, help='idle live-stream connections to hold open')
+    parser.add_argument('--requests', type=int, default=200, help='API requests sent while the streams are open')
+    parser.add_argument('--concurrency', type=int, default=20, help='API requests in flight at once')
+    parser.add_argument('--timeout', type=float, default=10.0, help='seconds before a request counts as failed')
+    parser.add_argument('--rows', type=int, default=20160, help='readings to seed (default: 14 days at 1/min)')
+    parser.add_argument('--servers', default=','.join(SERVERS), help='comma-separated servers to test')
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    # Every stream is a socket on both ends
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, 4 * args.streams + 256)), hard))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DB_PATH'] = os.path.join(tmp, 'serving.db')
+        seed(args.rows)
+        env = dict(os.environ, STREAM_CHECK_INTERVAL_SECONDS='0.5')
+
+        print(f"{args.streams} streams, {args.requests} requests at concurrency {args.concurrency}, {args.rows} readings")
+        print(f"{'server':<18}{'streams':>9}{'open s':>8}{'ok':>6}{'failed':>8}{'req/s':>8}"
+              f"{'p50 ms':>9}{'p95 ms':>9}{'fan-out p50':>13}{'max ms':>9}")
+        for name in args.servers.split(','):
+            command = [part.format(port=args.port) for part in SERVERS[name]]
+            # A session of its own lets workers stuck serving streams be killed with their master
+            server = subprocess.Popen(
+                command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+            )
+            try:
+                wait_until_up(args.port)
+                result = asyncio.run(load(args.port, args))
+            finally:
+                os.killpg(server.pid, signal.SIGKILL)
+                server.wait()
+            latencies, fanout = result['latencies'], result['fanout_ms']
+            print(
+                f"{name:<18}{result['streams']:>9}{result['open_seconds']:>8.1f}{len(latencies):>6}"
+                f"{result['failures']:>8}{len(latencies) / result['request_seconds']:>8.1f}"
+                f"{percentile(latencies, 0.5):>9.1f}{percentile(latencies, 0.95):>9.1f}"
+                f"{percentile(fanout, 0.5):>13.1f}{(fanout[-1] if fanout else float('nan')):>9.1f}"
+            )
+        database.close_connections()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Compare the storage backends on the operations behind the poller and the API.
+
+Each backend is seeded with the same readings, one per POLL_INTERVAL_MINUTES
+covering DATA_RETENTION_DAYS (what the ring buffer is sized to hold), and
+driven through the StorageBackend interface, so the numbers exclude HTTP and
+JSON overhead.
+
+Usage:
+    python benchmarks/bench_storage.py [--seconds 1]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_database import rate
+from app.storage import create_backend
+from app.ringbuffer import capacity_for
+from config import DATA_RETENTION_PERIOD, POLL_INTERVAL_MINUTES
+
+BACKENDS = ['sqlite', 'ringbuffer', 'memory']
+INTERVAL_MS = POLL_INTERVAL_MINUTES * 60 * 1000
+DAY_MS = 24 * 60 * 60 * 1000
+
+def run(name, rows, seconds):
+    """Seed a fresh backend and measure each operation."""
+    backend = create_backend(name)
+    backend.initialize()
+    backend.append([(i * INTERVAL_MS, 20.0 + (i % 60) / 10) for i in range(rows)])
+    end_ms = (rows - 1) * INTERVAL_MS
+    clock = [end_ms]
+
+    def append():
+        clock[0] += INTERVAL_MS
+        backend.append([(clock[0], 21.5)])
+
+    results = {
+        'latest': rate(backend.latest, seconds),
+        'range (last day)': rate(lambda: backend.range(end_ms - DAY_MS, end_ms), seconds),
+        'range (all)': rate(lambda: backend.range(0, end_ms), seconds),
+        'aggregate hour (all)': rate(lambda: backend.aggregate('hour', 0, end_ms), seconds),
+        'page of 100': rate(lambda: backend.page(0, end_ms, 100), seconds),
+        # Last, since it grows the data set the other operations read
+        'append': rate(append, seconds),
+    }
+    backend.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=1.0, help='duration of each measurement')
+    args = parser.parse_args()
+    rows = capacity_for(DATA_RETENTION_PERIOD, POLL_INTERVAL_MINUTES, headroom=1.0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DB_PATH'] = os.path.join(tmp, 'storage.db')
+        os.environ['RINGBUFFER_PATH'] = os.path.join(tmp, 'storage.ring')
+        results = {name: run(name, rows, args.seconds) for name in BACKENDS}
+
+    print(f"{rows} readings, operations per second")
+    print(f"{'operation':<24}" + ''.join(f"{name:>14}" for name in BACKENDS))
+    for operation in results[BACKENDS[0]]:
+        print(f"{operation:<24}" + ''.join(f"{results[name][operation]:>14.1f}" for name in BACKENDS))
+
+if __name__ == '__main__':
+    main()
@@ -22,12 +22,114 @@ load_dotenv()
 # Database configuration
 DB_PATH = os.getenv('DB_PATH', '/tmp/temperature.db')
 
+# Storage engine for readings: 'sqlite' or 'ringbuffer' (a fixed-size memory-mapped
+# file sized from the retention period and poll interval)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite').lower()
+RINGBUFFER_PATH = os.getenv('RINGBUFFER_PATH', '/tmp/temperature.ring')
+RINGBUFFER_HEADROOM = safe_float(os.getenv('RINGBUFFER_HEADROOM'), 1.25)
+
+# SQLite connection tuning (shared by every connection the app opens)
+DB_BUSY_TIMEOUT_MS = safe_int(os.getenv('DB_BUSY_TIMEOUT_MS'), 5000)
+DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL').upper()  # 'OFF', 'NORMAL', 'FULL' or 'EXTRA'
+DB_CACHE_SIZE_KB = safe_int(os.getenv('DB_CACHE_SIZE_KB'), 8192)
+DB_MMAP_SIZE_MB = safe_int(os.getenv('DB_MMAP_SIZE_MB'), 64)
+
 # Data retention
 DATA_RETENTION_PERIOD = timedelta(days=safe_int(os.getenv('DATA_RETENTION_DAYS'), 14))
 
+# Hourly and daily rollups outlive the raw readings (minute rollups share the raw retention)
+ROLLUP_RETENTION_PERIOD = timedelta(days=safe_int(os.getenv('ROLLUP_RETENTION_DAYS'), 365))
+
+# Readings past DATA_RETENTION_PERIOD are sealed into compressed per-day archive blocks
+# and kept this long (0 deletes them outright instead)
+ARCHIVE_RETENTION_PERIOD = timedelta(days=safe_int(os.getenv('ARCHIVE_RETENTION_DAYS'), 365))
+
+# Retention compaction: how often expired readings are pruned, rows deleted per
+# transaction, and free pages returned to the filesystem per run (0 disables vacuum)
+COMPACTION_INTERVAL_MINUTES = safe_int(os.getenv('COMPACTION_INTERVAL_MINUTES'), 60)
+COMPACTION_BATCH_SIZE = safe_int(os.getenv('COMPACTION_BATCH_SIZE'), 1000)
+COMPACTION_VACUUM_PAGES = safe_int(os.getenv('COMPACTION_VACUUM_PAGES'), 1000)
+
+# Online snapshots of the SQLite database (backup.py, and a poller job every
+# BACKUP_INTERVAL_HOURS; 0 disables it). Pages are copied BACKUP_PAGES_PER_STEP at a time
+# with a BACKUP_STEP_SLEEP_MS pause between steps so writers are never held up for long.
+# Only the newest BACKUP_KEEP snapshots are kept (0 keeps all).
+BACKUP_DIR = os.getenv('BACKUP_DIR', '/tmp/backups')
+BACKUP_INTERVAL_HOURS = safe_int(os.getenv('BACKUP_INTERVAL_HOURS'), 0)
+BACKUP_KEEP = safe_int(os.getenv('BACKUP_KEEP'), 7)
+BACKUP_PAGES_PER_STEP = safe_int(os.getenv('BACKUP_PAGES_PER_STEP'), 256)
+BACKUP_STEP_SLEEP_MS = safe_int(os.getenv('BACKUP_STEP_SLEEP_MS'), 10)
+BACKUP_COMPRESS = os.getenv('BACKUP_COMPRESS', 'true').lower() in ('1', 'true', 'yes')
+
 # Polling interval
 POLL_INTERVAL_MINUTES = safe_int(os.getenv('POLL_INTERVAL_MINUTES'), 1)
 
+# Group-commit write buffer for the poller: readings are written in one transaction
+# once this many polls are pending (1 writes every poll immediately) or the oldest has
+# waited WRITE_BUFFER_MAX_AGE_SECONDS, which bounds how much data a crash can lose
+WRITE_BUFFER_SIZE = safe_int(os.getenv('WRITE_BUFFER_SIZE'), 1)
+WRITE_BUFFER_MAX_AGE_SECONDS = safe_int(os.getenv('WRITE_BUFFER_MAX_AGE_SECONDS'), 300)
+
+# Largest page of readings /temperature/history returns when paginating
+HISTORY_MAX_PAGE_SIZE = safe_int(os.getenv('HISTORY_MAX_PAGE_SIZE'), 1000)
+
+# Rows fetched from SQLite per chunk when streaming history responses
+HISTORY_STREAM_CHUNK_SIZE = safe_int(os.getenv('HISTORY_STREAM_CHUNK_SIZE'), 500)
+
+# In-process read cache for the latest reading and history windows starting within this
+# many minutes of now; invalidated whenever new data is committed (0 disables the cache)
+READ_CACHE_WINDOW_MINUTES = safe_int(os.getenv('READ_CACHE_WINDOW_MINUTES'), 60)
+
+# Response compression: encodings offered in order of preference ('br' and 'zstd' need the
+# optional brotli and zstandard packages and are skipped without them; empty disables
+# compression). Bodies under COMPRESSION_MIN_BYTES are sent as is, and compressed bodies
+# are kept in a COMPRESSION_CACHE_MB cache so identical responses are compressed once.
+COMPRESSION_ENCODINGS = [
+    encoding.strip() for encoding in os.getenv('COMPRESSION_ENCODINGS', 'zstd,br,gzip').lower().split(',')
+    if encoding.strip()
+]
+COMPRESSION_MIN_BYTES = safe_int(os.getenv('COMPRESSION_MIN_BYTES'), 1024)
+COMPRESSION_GZIP_LEVEL = safe_int(os.getenv('COMPRESSION_GZIP_LEVEL'), 6)
+COMPRESSION_BROTLI_LEVEL = safe_int(os.getenv('COMPRESSION_BROTLI_LEVEL'), 5)
+COMPRESSION_ZSTD_LEVEL = safe_int(os.getenv('COMPRESSION_ZSTD_LEVEL'), 3)
+COMPRESSION_CACHE_MB = safe_int(os.getenv('COMPRESSION_CACHE_MB'), 16)
+
+# Live stream (/temperature/stream): each web worker checks for new readings every
+# STREAM_CHECK_INTERVAL_SECONDS, sends a keep-alive comment after STREAM_HEARTBEAT_SECONDS
+# without one, and closes connections after STREAM_MAX_SECONDS so clients reconnect
+# (resuming from Last-Event-ID, with at most STREAM_REPLAY_LIMIT missed readings replayed)
+STREAM_CHECK_INTERVAL_SECONDS = safe_float(os.getenv('STREAM_CHECK_INTERVAL_SECONDS'), 1.0)
+STREAM_HEARTBEAT_SECONDS = safe_float(os.getenv('STREAM_HEARTBEAT_SECONDS'), 15.0)
+STREAM_MAX_SECONDS = safe_int(os.getenv('STREAM_MAX_SECONDS'), 3600)
+STREAM_REPLAY_LIMIT = safe_int(os.getenv('STREAM_REPLAY_LIMIT'), 1000)
+# Most streams one WSGI worker serves at once. Each holds a thread, so keep it below
+# gunicorn's --threads (32 in supervisord.conf); clients beyond it get a 503 and poll
+STREAM_MAX_CLIENTS = safe_int(os.getenv('STREAM_MAX_CLIENTS'), 24)
+
+# Threads the ASGI server (run_asgi.py) runs WSGI requests and database queries on; open
+# live streams take no thread of their own, so this bounds concurrent queries, not clients
+ASGI_THREADS = safe_int(os.getenv('ASGI_THREADS'), 8)
+
+# Prometheus metrics (/metrics): with PROMETHEUS_MULTIPROC_DIR set, every process (each web
+# worker and the poller) records into files in that directory and /metrics reports their
+# sum; without it, /metrics reports only the process that serves it. The directory must be
+# emptied before the processes start (the Docker image does this)
+PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR', '')
+
+# Profiling: with PROFILE_DIR set, API requests and poll cycles are run under cProfile (a
+# PROFILE_SAMPLE_RATE fraction of them, one at a time per process) and those taking at
+# least PROFILE_SLOW_MS are saved to PROFILE_DIR; only the newest PROFILE_KEEP are kept
+# (0 keeps all). Profiling is off when PROFILE_DIR is empty
+PROFILE_DIR = os.getenv('PROFILE_DIR', '')
+PROFILE_SLOW_MS = safe_float(os.getenv('PROFILE_SLOW_MS'), 1000.0)
+PROFILE_SAMPLE_RATE = safe_float(os.getenv('PROFILE_SAMPLE_RATE'), 1.0)
+PROFILE_KEEP = safe_int(os.getenv('PROFILE_KEEP'), 100)
+
+# Bulk imports (import_readings.py, POST /temperature/import) commit this many readings
+# per transaction; the endpoint is disabled unless IMPORT_API_TOKEN is set
+IMPORT_BATCH_SIZE = safe_int(os.getenv('IMPORT_BATCH_SIZE'), 50000)
+IMPORT_API_TOKEN = os.getenv('IMPORT_API_TOKEN', '')
+
 # Temperature alert configuration
 TEMPERATURE_THRESHOLD = safe_float(os.getenv('TEMPERATURE_THRESHOLD'), 23.5)
 TEMPERATURE_NORMAL_MARGIN = safe_float(os.getenv('TEMPERATURE_NORMAL_MARGIN'), 1.0)
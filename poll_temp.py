@@ -1,7 +1,14 @@
-from app.scheduler import poll_temperature, start_scheduler
+import signal
+from app.scheduler import poll_temperature, start_scheduler, write_buffer
 from app.database import init_db
 
+def handle_sigterm(signum, frame):
+    """Treat SIGTERM (sent by supervisord and docker stop) like Ctrl+C."""
+    raise SystemExit(0)
+
 if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
     print("Initializing database...")
     init_db()
     
@@ -13,4 +20,5 @@ if __name__ == "__main__":
         scheduler._event.wait()
     except (KeyboardInterrupt, SystemExit):
         print("Shutting down scheduler...")
-        scheduler.shutdown() 
\ No newline at end of file
+        scheduler.shutdown()
+        print(f"Flushed {write_buffer.flush()} buffered readings") 
\ No newline at end of file
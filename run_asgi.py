@@ -0,0 +1,15 @@
+from app.asgi import AsgiApp
+from app.views import app as flask_app
+from app.database import init_db
+
+# Initialize the database
+print("Initializing database...")
+init_db()
+
+# Same routes as run.py, served from an event loop (see app/asgi.py)
+app = AsgiApp(flask_app)
+
+if __name__ == "__main__":
+    import uvicorn
+    print("Starting ASGI app...")
+    uvicorn.run(app, host="0.0.0.0", port=5000)
@@ -0,0 +1,110 @@
+import unittest
+import time
+import os
+from datetime import datetime, timezone, timedelta
+import numpy as np
+from app import analytics
+from app.database import init_db, close_connections, store_temperature, fetch_temperature_history
+
+MINUTE_MS = 60 * 1000
+
+class TestAnalytics(unittest.TestCase):
+    def setUp(self):
+        """Build a minute series with a three-minute gap after the fifth reading."""
+        self.timestamps = np.array([0, 1, 2, 3, 4, 8, 9, 10], dtype=np.int64) * MINUTE_MS
+        self.values = np.array([20.0, 21.0, 22.0, 23.0, 24.0, 25.0, 26.0, 27.0])
+
+    def test_moving_average(self):
+        """Test that the trailing window is measured in time, not readings."""
+        averages = analytics.moving_average(self.timestamps, self.values, 3 * MINUTE_MS)
+        self.assertEqual(averages[:3].tolist(), [20.0, 20.5, 21.0])
+        self.assertEqual(averages[4], 23.0)
+        # After the gap only the reading itself is within three minutes
+        self.assertEqual(averages[5], 25.0)
+        self.assertEqual(averages[7], 26.0)
+
+    def test_exponential_smoothing_matches_recurrence(self):
+        """Test the vectorized smoothing against the step-by-step recurrence, across long gaps."""
+        rng = np.random.default_rng(0)
+        timestamps = np.cumsum(rng.integers(30, 90, 5000)) * 1000
+        timestamps[2500:] += 365 * 24 * 60 * MINUTE_MS
+        values = 20 + np.cumsum(rng.normal(0, 0.1, 5000))
+        for half_life_ms in (MINUTE_MS, 30 * MINUTE_MS, 24 * 60 * MINUTE_MS):
+            expected = [values[0]]
+            for i in range(1, len(values)):
+                decay = 0.5 ** ((timestamps[i] - timestamps[i - 1]) / half_life_ms)
+                expected.append(decay * expected[-1] + (1 - decay) * values[i])
+            smoothed = analytics.exponential_smoothing(timestamps, values, half_life_ms)
+            np.testing.assert_allclose(smoothed, expected, rtol=0, atol=1e-9)
+        self.assertEqual(len(analytics.exponential_smoothing(timestamps[:0], values[:0], MINUTE_MS)), 0)
+
+    def test_rate_of_change(self):
+        """Test that rates are in degrees per hour and undefined without an earlier reading."""
+        rates = analytics.rate_of_change(self.timestamps, self.values, 2 * MINUTE_MS)
+        self.assertTrue(np.isnan(rates[0]))
+        self.assertEqual(rates[1], 60.0)
+        self.assertEqual(rates[4], 60.0)
+        self.assertTrue(np.isnan(rates[5]))
+
+    def test_find_gaps(self):
+        """Test that gaps are reported by the readings on either side."""
+        starts, ends = analytics.find_gaps(self.timestamps, 2 * MINUTE_MS)
+        self.assertEqual(starts.tolist(), [4 * MINUTE_MS])
+        self.assertEqual(ends.tolist(), [8 * MINUTE_MS])
+
+    def test_time_above_threshold(self):
+        """Test that time above the threshold excludes gaps and counts separate episodes."""
+        values = np.array([20.0, 25.0, 25.0, 20.0, 25.0, 25.0, 20.0, 20.0])
+        totals = analytics.time_above_threshold(self.timestamps, values, 23.0, 2 * MINUTE_MS)
+        # Readings at minutes 1, 2 and 8 hold for a minute each; the one at 4 runs into the gap,
+        # which also separates it from the episode at 8
+        self.assertEqual(totals, {"above_ms": 3 * MINUTE_MS, "observed_ms": 6 * MINUTE_MS, "episodes": 3})
+        self.assertEqual(
+            analytics.time_above_threshold(self.timestamps[:0], values[:0], 23.0, MINUTE_MS)["episodes"], 0
+        )
+
+    def test_lttb(self):
+        """Test that downsampling keeps the end points and the extremes, within the point budget."""
+        rng = np.random.default_rng(0)
+        timestamps = np.arange(10000, dtype=np.int64) * MINUTE_MS
+        values = 20 + rng.normal(0, 0.1, 10000)
+        values[1234], values[7777] = 35.0, 5.0
+        kept = analytics.lttb(timestamps, values, 200)
+        self.assertEqual(len(kept), 200)
+        self.assertEqual((kept[0], kept[-1]), (0, 9999))
+        self.assertTrue(np.all(np.diff(kept) > 0))
+        self.assertIn(1234, kept)
+        self.assertIn(7777, kept)
+
+        self.assertEqual(analytics.lttb(self.timestamps, self.values, 100).tolist(), list(range(8)))
+        with self.assertRaises(ValueError):
+            analytics.lttb(self.timestamps, self.values, 2)
+
+class TestLoadHistory(unittest.TestCase):
+    def setUp(self):
+        """Set up a test database."""
+        self.test_db_path = '/tmp/test_temperature.db'
+        os.environ['DB_PATH'] = self.test_db_path
+        init_db()
+
+    def tearDown(self):
+        """Clean up the test database."""
+        close_connections()
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+    def test_load_history(self):
+        """Test that stored readings load as chronological arrays with API-formatted timestamps."""
+        for temperature in (21.0, 22.0, 23.0):
+            # Keep the readings a millisecond apart so their order is well defined
+            time.sleep(0.002)
+            store_temperature(temperature)
+        start = datetime.now(timezone.utc) - timedelta(minutes=5)
+        timestamps, temperatures = analytics.load_history(start)
+        self.assertEqual(timestamps.dtype, np.int64)
+        self.assertEqual(temperatures.tolist(), [21.0, 22.0, 23.0])
+        history = fetch_temperature_history(start)
+        self.assertEqual(analytics.format_timestamps(timestamps[::-1]).tolist(), [r['collected_at'] for r in history])
+
+if __name__ == '__main__':
+    unittest.main()
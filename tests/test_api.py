@@ -1,11 +1,16 @@
 import unittest
 import json
 import os
+import threading
+import time
 from datetime import datetime, timezone, timedelta
 from unittest.mock import patch, MagicMock
-from app.views import app
-from app.database import store_temperature, init_db
-from config import TEMPERATURE_THRESHOLD, TEMPERATURE_NORMAL_MARGIN
+from app.views import app, _next_poll, _broadcaster
+from app.database import store_temperature, init_db, close_connections, BufferedWriter, fetch_readings_after
+from app.database import SQLiteBackend, import_readings
+from app.export import COLUMNAR_MIMETYPE
+from app.storage import set_backend
+from config import TEMPERATURE_THRESHOLD, TEMPERATURE_NORMAL_MARGIN, POLL_INTERVAL_MINUTES
 
 class TestAPI(unittest.TestCase):
     def setUp(self):
@@ -24,6 +29,7 @@ class TestAPI(unittest.TestCase):
         
     def tearDown(self):
         """Clean up test database after each test."""
+        close_connections()
         if os.path.exists(self.test_db_path):
             os.remove(self.test_db_path)
             
@@ -61,6 +67,313 @@ class TestAPI(unittest.TestCase):
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]['temperature'], 23.0)
         
+    def test_get_temperature_history_mixed_offsets(self):
+        """Test that 'Z', explicit offsets and naive timestamps select the same range."""
+        now = datetime.now(timezone.utc)
+        start = now - timedelta(minutes=5)
+        end = now + timedelta(minutes=5)
+        queries = [
+            (start.strftime('%Y-%m-%dT%H:%M:%SZ'), end.strftime('%Y-%m-%dT%H:%M:%SZ')),
+            (start.strftime('%Y-%m-%dT%H:%M:%S'), end.strftime('%Y-%m-%dT%H:%M:%S')),
+            (
+                start.astimezone(timezone(timedelta(hours=-5))).isoformat(),
+                end.astimezone(timezone(timedelta(hours=2))).isoformat()
+            ),
+        ]
+        for start_time, end_time in queries:
+            response = self.app.get(
+                '/temperature/history',
+                query_string={'start_time': start_time, 'end_time': end_time}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(json.loads(response.data)), 1)
+
+    def test_get_temperature_history_resolution(self):
+        """Test that the history endpoint serves aggregated buckets from rollups."""
+        store_temperature(24.5)
+        response = self.app.get('/temperature/history?resolution=day')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(sum(bucket['count'] for bucket in data), 2)
+        for key in ('temperature', 'collected_at', 'min_temperature', 'max_temperature'):
+            self.assertIn(key, data[0])
+
+        response = self.app.get('/temperature/history?resolution=week')
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_temperature_stats(self):
+        """Test the summary statistics endpoint and its parameter validation."""
+        store_temperature(24.5)
+        response = self.app.get('/temperature/stats?percentiles=0,50,100')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['count'], 2)
+        self.assertEqual((data['min'], data['max'], data['mean']), (22.5, 24.5, 23.5))
+        self.assertAlmostEqual(data['stddev'], 1.0)
+        self.assertEqual(data['percentiles']['p0'], 22.5)
+        self.assertEqual(data['percentiles']['p100'], 24.5)
+        self.assertIn('p50', data['percentiles'])
+
+        for query in ('percentiles=abc', 'percentiles=101', 'start_time=invalid'):
+            response = self.app.get(f'/temperature/stats?{query}')
+            self.assertEqual(response.status_code, 400)
+
+    def test_history_max_points(self):
+        """Test that max_points bounds the raw history returned, and is validated."""
+        writer = BufferedWriter(max_size=100)
+        start = datetime.now(timezone.utc) - timedelta(minutes=50)
+        with patch('app.database.datetime') as mock_datetime:
+            for minute in range(50):
+                mock_datetime.now.return_value = start + timedelta(minutes=minute)
+                writer.add(20.0 + (minute == 25) * 10)
+            writer.flush()
+
+        response = self.app.get('/temperature/history?max_points=10')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(len(data), 10)
+        self.assertEqual(response.headers['X-Downsampled-From'], '51')
+        full = json.loads(self.app.get('/temperature/history').data)
+        self.assertEqual((data[0], data[-1]), (full[0], full[-1]))
+        self.assertIn(30.0, [r['temperature'] for r in data])
+        self.assertEqual(len(json.loads(self.app.get('/temperature/hourly?max_points=5').data)), 5)
+        self.assertEqual(json.loads(self.app.get('/temperature/history?max_points=1000').data), full)
+
+        for query in ('max_points=2', 'max_points=abc', 'max_points=10&resolution=hour',
+                      'max_points=10&limit=5', 'max_points=10&format=ndjson'):
+            response = self.app.get(f'/temperature/history?{query}')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.app.get('/temperature/hourly?max_points=0').status_code, 400)
+
+    def test_conditional_get(self):
+        """Test that unchanged data is answered with 304 before any range query runs."""
+        response = self.app.get('/temperature/hourly')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        last_modified = response.headers['Last-Modified']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertGreater(response.cache_control.max_age, 0)
+        self.assertLessEqual(response.cache_control.max_age, POLL_INTERVAL_MINUTES * 60)
+
+        with patch('app.views.fetch_temperature_history') as mock_fetch:
+            response = self.app.get('/temperature/hourly', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
+            self.assertEqual(response.headers['ETag'], etag)
+            mock_fetch.assert_not_called()
+        # Last-Modified cannot tell every change apart, so only the ETag answers 304
+        response = self.app.get('/temperature/hourly', headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 200)
+
+        # Other URLs have their own validators
+        self.assertEqual(self.app.get('/temperature/latest', headers={'If-None-Match': etag}).status_code, 200)
+
+        store_temperature(23.5)
+        response = self.app.get('/temperature/hourly', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(len(json.loads(response.data)), 2)
+
+        # Errors carry no validators
+        response = self.app.get('/temperature/history?resolution=week')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('ETag', response.headers)
+
+    def test_conditional_get_changes_without_new_latest_reading(self):
+        """Test that channel readings and backfills, which leave the latest reading alone, are never answered 304."""
+        writer = BufferedWriter(max_size=1)
+        writer.add(None, [('1-1.2', 'internal_humidity', 38.5)])
+        url = '/sensors/1-1.2/internal_humidity/history'
+        response = self.app.get(url)
+        etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+
+        writer.add(None, [('1-1.2', 'internal_humidity', 39.0)])
+        for headers in ({'If-None-Match': etag}, {'If-Modified-Since': last_modified}):
+            response = self.app.get(url, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(json.loads(response.data)), 2)
+        self.assertEqual(response.headers['Last-Modified'], last_modified)
+
+        response = self.app.get('/temperature/history')
+        etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+        import_readings([(datetime.now(timezone.utc) - timedelta(hours=1), 19.0)])
+        for headers in ({'If-None-Match': etag}, {'If-Modified-Since': last_modified}):
+            response = self.app.get('/temperature/history', headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(19.0, [r['temperature'] for r in json.loads(response.data)])
+
+    def test_conditional_get_negotiated_format(self):
+        """Test that history ETags differ per Accept-negotiated format and responses vary on Accept."""
+        columnar = self.app.get('/temperature/history', headers={'Accept': COLUMNAR_MIMETYPE})
+        self.assertEqual(columnar.mimetype, COLUMNAR_MIMETYPE)
+        self.assertIn('Accept', columnar.headers['Vary'])
+
+        response = self.app.get('/temperature/history', headers={
+            'Accept': 'application/json', 'If-None-Match': columnar.headers['ETag']
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertNotEqual(response.headers['ETag'], columnar.headers['ETag'])
+        self.assertIn('Accept', response.headers['Vary'])
+
+        response = self.app.get('/temperature/history', headers={
+            'Accept': COLUMNAR_MIMETYPE, 'If-None-Match': columnar.headers['ETag']
+        })
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('Accept', response.headers['Vary'])
+
+    def test_etag_same_in_every_process(self):
+        """Test that ETags come from the stored data, not from per-process state."""
+        etag = self.app.get('/temperature/hourly').headers['ETag']
+        # A fresh backend has its own write counters, as another worker or a restarted server would
+        previous = set_backend(SQLiteBackend())
+        try:
+            self.assertEqual(self.app.get('/temperature/hourly').headers['ETag'], etag)
+        finally:
+            set_backend(previous)
+
+    def test_next_poll(self):
+        """Test that freshness runs to the poller's next cron slot, wrapping at the hour."""
+        with patch('app.views.POLL_INTERVAL_MINUTES', 7):
+            now = datetime(2024, 3, 1, 10, 15, 30, tzinfo=timezone.utc)
+            self.assertEqual(_next_poll(now), datetime(2024, 3, 1, 10, 21, tzinfo=timezone.utc))
+            now = datetime(2024, 3, 1, 10, 57, 0, tzinfo=timezone.utc)
+            self.assertEqual(_next_poll(now), datetime(2024, 3, 1, 11, 0, tzinfo=timezone.utc))
+
+    def test_import_readings(self):
+        """Test bulk import through the API, including its token check and input validation."""
+        start = datetime.now(timezone.utc) - timedelta(hours=2)
+        body = "collected_at,temperature\n" + "".join(
+            f"{(start + timedelta(minutes=i)).isoformat()},{20 + i / 10}\n" for i in range(30)
+        ) + "not a time,21.0\n"
+        headers = {'Authorization': 'Bearer secret'}
+
+        with patch('app.views.IMPORT_API_TOKEN', ''):
+            response = self.app.post('/temperature/import', data=body, content_type='text/csv', headers=headers)
+            self.assertEqual(response.status_code, 403)
+
+        with patch('app.views.IMPORT_API_TOKEN', 'secret'):
+            response = self.app.post('/temperature/import', data=body, content_type='text/csv')
+            self.assertEqual(response.status_code, 401)
+            response = self.app.post('/temperature/import', data=body, content_type='text/plain', headers=headers)
+            self.assertEqual(response.status_code, 415)
+            response = self.app.post('/temperature/import', data='{', content_type='application/json', headers=headers)
+            self.assertEqual(response.status_code, 400)
+
+            response = self.app.post('/temperature/import', data=body, content_type='text/csv', headers=headers)
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.data)
+            self.assertEqual((data['inserted'], data['skipped'], data['invalid']), (30, 0, 1))
+
+            response = self.app.post('/temperature/import', data=body, content_type='text/csv', headers=headers)
+            self.assertEqual(json.loads(response.data)['skipped'], 30)
+
+        history = json.loads(self.app.get('/temperature/history').data)
+        self.assertEqual(len(history), 31)
+
+    def test_analytics_endpoints(self):
+        """Test the analytics endpoints' response shapes and parameter validation."""
+        store_temperature(24.5)
+        history = json.loads(self.app.get('/temperature/history').data)
+
+        for path, key in (('moving-average', 'temperature'), ('smoothed', 'temperature'), ('rate', 'rate')):
+            response = self.app.get(f'/analytics/{path}?window=5&half_life=5')
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.data)
+            self.assertEqual([r['collected_at'] for r in data], [r['collected_at'] for r in history])
+            self.assertIn(key, data[0])
+        self.assertIsNone(json.loads(self.app.get('/analytics/rate').data)[-1]['rate'])
+
+        data = json.loads(self.app.get('/analytics/time-above?threshold=23').data)
+        self.assertEqual(data['episodes'], 1)
+        self.assertEqual(json.loads(self.app.get('/analytics/gaps').data), [])
+
+        for query in ('moving-average?window=0', 'rate?window=abc', 'time-above?threshold=x',
+                      'gaps?start_time=invalid', 'moving-average?window=1e300', 'smoothed?half_life=1e300',
+                      'gaps?max_gap=1e300'):
+            self.assertEqual(self.app.get(f'/analytics/{query}').status_code, 400)
+
+    def test_get_temperature_history_pagination(self):
+        """Test that paginated history pages link to the next page until exhausted."""
+        store_temperature(23.0)
+        store_temperature(23.5)
+
+        response = self.app.get('/temperature/history?limit=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.data)), 2)
+        self.assertIn('rel="next"', response.headers['Link'])
+        next_url = response.headers['Link'].split(';')[0].strip('<>')
+
+        response = self.app.get(next_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['temperature'] for r in json.loads(response.data)], [self.test_temp])
+        self.assertNotIn('Link', response.headers)
+
+    def test_get_temperature_history_page_size_cap(self):
+        """Test that the server caps the page size and rejects bad pagination parameters."""
+        with patch('app.views.HISTORY_MAX_PAGE_SIZE', 1):
+            store_temperature(23.0)
+            response = self.app.get('/temperature/history?limit=500')
+            self.assertEqual(len(json.loads(response.data)), 1)
+            self.assertIn('limit=1', response.headers['Link'])
+
+        self.assertEqual(self.app.get('/temperature/history?limit=0').status_code, 400)
+        self.assertEqual(self.app.get('/temperature/history?limit=abc').status_code, 400)
+        self.assertEqual(self.app.get('/temperature/history?before=garbage').status_code, 400)
+        self.assertEqual(self.app.get('/temperature/history?before=99999999999999999999_1').status_code, 400)
+        self.assertEqual(self.app.get('/temperature/history?after=1_99999999999999999999').status_code, 400)
+        self.assertEqual(self.app.get('/temperature/history?resolution=hour&limit=5').status_code, 400)
+
+    def test_get_temperature_history_streamed_json(self):
+        """Test that the streamed JSON array matches the buffered response."""
+        store_temperature(23.0)
+        buffered = json.loads(self.app.get('/temperature/history').data)
+
+        response = self.app.get('/temperature/history?stream=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(json.loads(response.data), buffered)
+
+    def test_get_temperature_history_ndjson(self):
+        """Test NDJSON output selected by format parameter or Accept header."""
+        store_temperature(23.0)
+        buffered = json.loads(self.app.get('/temperature/history').data)
+
+        for response in (
+            self.app.get('/temperature/history?format=ndjson'),
+            self.app.get('/temperature/history', headers={'Accept': 'application/x-ndjson'}),
+        ):
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            lines = response.data.decode().splitlines()
+            self.assertEqual([json.loads(line) for line in lines], buffered)
+
+        self.assertEqual(self.app.get('/temperature/history?format=xml').status_code, 400)
+        self.assertEqual(self.app.get('/temperature/history?format=ndjson&limit=5').status_code, 400)
+
+    def test_get_temperature_history_columnar(self):
+        """Test the packed binary export selected by format parameter or Accept header."""
+        from app.export import decode_columnar, COLUMNAR_MIMETYPE
+        store_temperature(23.0)
+        buffered = json.loads(self.app.get('/temperature/history').data)
+
+        for response in (
+            self.app.get('/temperature/history?format=columnar&delta=true'),
+            self.app.get('/temperature/history', headers={'Accept': COLUMNAR_MIMETYPE}),
+        ):
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, COLUMNAR_MIMETYPE)
+            self.assertEqual(response.headers['X-Reading-Count'], '2')
+            timestamps, temperatures = decode_columnar(response.data)
+            self.assertEqual(list(temperatures), [r['temperature'] for r in buffered])
+            self.assertEqual(
+                list(timestamps),
+                [int(datetime.fromisoformat(r['collected_at']).timestamp() * 1000) for r in buffered]
+            )
+
+        response = self.app.get('/temperature/history?format=columnar&resolution=hour')
+        self.assertEqual(response.status_code, 400)
+
     def test_get_temperature_history_invalid_dates(self):
         """Test temperature history endpoint with invalid date parameters."""
         # Test with invalid start_time
@@ -78,6 +391,95 @@ class TestAPI(unittest.TestCase):
         response = self.app.get(f'/temperature/history?start_time={start_time}&end_time={end_time}')
         self.assertEqual(response.status_code, 400)
         
+    def test_get_sensors_and_channel_history(self):
+        """Test listing sensors and fetching one sensor channel's history."""
+        writer = BufferedWriter(max_size=1)
+        writer.add(None, [('1-1.2', 'internal_temperature', 24.0), ('1-1.2', 'internal_humidity', 38.5)])
+
+        response = self.app.get('/sensors')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data), [
+            {'sensor': '1-1.2', 'channels': ['internal_humidity', 'internal_temperature']}
+        ])
+
+        response = self.app.get('/sensors/1-1.2/internal_humidity/history')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual([r['value'] for r in data], [38.5])
+        self.assertIn('collected_at', data[0])
+
+        past = (datetime.now(timezone.utc) - timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        response = self.app.get(f'/sensors/1-1.2/internal_humidity/history?end_time={past}')
+        self.assertEqual(json.loads(response.data), [])
+
+    def test_get_sensor_history_errors(self):
+        """Test unknown sensor channels and invalid dates on the sensor history endpoint."""
+        self.assertEqual(self.app.get('/sensors/9-9/internal_temperature/history').status_code, 404)
+        self.assertEqual(self.app.get('/sensors/9-9/internal_temperature/history?start_time=bogus').status_code, 400)
+
+    def _read_events(self, response):
+        """Split a finished event stream into its events' fields, skipping comments."""
+        events = []
+        for block in b''.join(response.response).decode().split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+            if fields:
+                events.append(fields)
+        # The watcher thread stops once its last subscriber has gone
+        while _broadcaster.running:
+            time.sleep(0.01)
+        return events
+
+    def test_stream_pushes_new_readings(self):
+        """Test that the stream starts with the latest reading and pushes readings as they are stored."""
+        with patch('app.views.STREAM_MAX_SECONDS', 1), patch('app.views.STREAM_HEARTBEAT_SECONDS', 0.2), \
+                patch.object(_broadcaster, 'check_interval_seconds', 0.02):
+            response = self.app.get('/temperature/stream', buffered=False)
+            self.assertEqual(response.mimetype, 'text/event-stream')
+            self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+            threading.Timer(0.3, store_temperature, (TEMPERATURE_THRESHOLD + 1,)).start()
+            events = self._read_events(response)
+
+        self.assertEqual(events[0], {'retry': '5000'})
+        readings = [json.loads(event['data']) for event in events[1:]]
+        self.assertEqual([r['temperature'] for r in readings], [self.test_temp, TEMPERATURE_THRESHOLD + 1])
+        self.assertTrue(readings[1]['is_alert'])
+        self.assertEqual(events[1]['event'], 'reading')
+        self.assertLess(int(events[1]['id']), int(events[2]['id']))
+
+    def test_stream_resumes_from_last_event_id(self):
+        """Test that a reconnecting client gets only the readings after its Last-Event-ID."""
+        # Event ids are millisecond timestamps, so keep the readings apart
+        for temperature in (23.0, 24.0):
+            time.sleep(0.002)
+            store_temperature(temperature)
+        first_ms = fetch_readings_after(0)[0]['timestamp_ms']
+        with patch('app.views.STREAM_MAX_SECONDS', 0.2):
+            response = self.app.get('/temperature/stream', headers={'Last-Event-ID': str(first_ms)}, buffered=False)
+            events = self._read_events(response)
+        self.assertEqual([json.loads(event['data'])['temperature'] for event in events[1:]], [23.0, 24.0])
+
+        self.assertEqual(self.app.get('/temperature/stream?last_event_id=yesterday').status_code, 400)
+        # Past SQLite's integers the first query would fail after the stream had started
+        self.assertEqual(self.app.get('/temperature/stream', headers={'Last-Event-ID': str(2**63)}).status_code, 400)
+        self.assertEqual(self.app.get('/temperature/stream?last_event_id=-1').status_code, 400)
+
+    def test_stream_refused_beyond_max_clients(self):
+        """Test that streams beyond STREAM_MAX_CLIENTS get a 503, and a closed stream frees its slot."""
+        with patch('app.views._stream_slots', threading.BoundedSemaphore(1)):
+            first = self.app.get('/temperature/stream', buffered=False)
+            self.assertEqual(first.status_code, 200)
+            refused = self.app.get('/temperature/stream', buffered=False)
+            self.assertEqual(refused.status_code, 503)
+            self.assertEqual(refused.headers['Retry-After'], '5')
+            self.assertIn('error', json.loads(refused.data))
+
+            # Never iterated, as when a client disconnects before the first event
+            first.close()
+            second = self.app.get('/temperature/stream', buffered=False)
+            self.assertEqual(second.status_code, 200)
+            second.close()
+        self.assertEqual(_broadcaster.subscribers, 0)
+
     def test_get_latest_temperature(self):
         """Test the latest temperature endpoint."""
         response = self.app.get('/temperature/latest')
@@ -102,12 +504,41 @@ class TestAPI(unittest.TestCase):
         self.assertIn('error', data)
         self.assertEqual(data['error'], 'No temperature readings available')
             
+    def test_dashboard_data(self):
+        """Test that the dashboard payload holds the latest reading and window, and that after returns only the delta."""
+        response = self.app.get('/dashboard/data')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['latest']['temperature'], self.test_temp)
+        self.assertIn('is_alert', data['latest'])
+        self.assertEqual(data['readings'], [{"temperature": self.test_temp, "collected_at": data['latest']['collected_at']}])
+        self.assertEqual(data['threshold'], TEMPERATURE_THRESHOLD)
+        self.assertEqual(data['cursor'], fetch_readings_after(0)[0]['timestamp_ms'])
+
+        time.sleep(0.002)
+        store_temperature(23.0)
+        delta = json.loads(self.app.get(f"/dashboard/data?after={data['cursor']}").data)
+        self.assertEqual([r['temperature'] for r in delta['readings']], [23.0])
+        self.assertEqual(delta['latest']['temperature'], 23.0)
+        self.assertGreater(delta['cursor'], data['cursor'])
+
+        unchanged = json.loads(self.app.get(f"/dashboard/data?after={delta['cursor']}").data)
+        self.assertEqual(unchanged['readings'], [])
+        self.assertEqual(unchanged['cursor'], delta['cursor'])
+
+        self.assertEqual(self.app.get('/dashboard/data?after=soon').status_code, 400)
+        self.assertEqual(self.app.get('/dashboard/data?minutes=0').status_code, 400)
+        # Too long for timedelta; the page polls this endpoint, so it must not 500
+        self.assertEqual(self.app.get('/dashboard/data?minutes=1e300').status_code, 400)
+
     def test_temperature_display_page(self):
         """Test the main temperature display page."""
         response = self.app.get('/')
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'TemperBot', response.data)
         self.assertIn(str(self.test_temp).encode(), response.data)
+        # The chart data is embedded rather than fetched
+        self.assertIn(b'<script id="dashboard-data" type="application/json">', response.data)
         
     def test_temperature_alert_states(self):
         """Test temperature alert states in latest temperature endpoint."""
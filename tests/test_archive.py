@@ -0,0 +1,56 @@
+import unittest
+import random
+from app.archive import encode_block, decode_block
+
+class TestArchiveBlocks(unittest.TestCase):
+    def setUp(self):
+        """Build a day of one-minute readings with jitter and 1/16 degree steps."""
+        rng = random.Random(0)
+        self.timestamps, self.values = [], []
+        temperature = 21.0
+        for i in range(1440):
+            self.timestamps.append(1710374400000 + i * 60000 + rng.randint(0, 500))
+            self.values.append(temperature)
+            temperature += rng.choice((-0.0625, 0.0, 0.0, 0.0625))
+
+    def test_round_trip(self):
+        """Test that a block decodes back to exactly the same readings."""
+        timestamps, values = decode_block(encode_block(self.timestamps, self.values))
+        self.assertEqual(timestamps, self.timestamps)
+        self.assertEqual(values, self.values)
+
+    def test_compression(self):
+        """Test that regular readings take a few bytes each instead of sixteen."""
+        block = encode_block(self.timestamps, self.values)
+        self.assertLess(len(block) / len(self.timestamps), 4)
+
+    def test_irregular_series(self):
+        """Test ties, large gaps and arbitrary floats including negatives and specials."""
+        timestamps = [0, 0, 1, 2**40, 2**40 + 5, 2**40 + 5, 2**62]
+        values = [-12.345, -12.345, 0.0, -0.0, 1e300, float('inf'), 3.14159]
+        self.assertEqual(decode_block(encode_block(timestamps, values)), (timestamps, values))
+
+    def test_single_and_empty(self):
+        """Test blocks holding one reading and none."""
+        self.assertEqual(decode_block(encode_block([5], [20.5])), ([5], [20.5]))
+        self.assertEqual(decode_block(encode_block([], [])), ([], []))
+
+    def test_encode_validation(self):
+        """Test that mismatched or unordered columns are rejected."""
+        with self.assertRaises(ValueError):
+            encode_block([1, 2], [1.0])
+        with self.assertRaises(ValueError):
+            encode_block([2, 1], [1.0, 2.0])
+
+    def test_decode_validation(self):
+        """Test that foreign, short and truncated payloads are rejected."""
+        block = encode_block(self.timestamps, self.values)
+        with self.assertRaises(ValueError):
+            decode_block(b'XXXX' + block[4:])
+        with self.assertRaises(ValueError):
+            decode_block(block[:10])
+        with self.assertRaises(ValueError):
+            decode_block(block[:len(block) // 2])
+
+if __name__ == '__main__':
+    unittest.main()
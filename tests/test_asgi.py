@@ -0,0 +1,114 @@
+import unittest
+import asyncio
+import gzip
+import json
+import os
+import time
+from unittest.mock import patch
+from app.asgi import AsgiApp
+from app.database import close_connections, fetch_readings_after, init_db, store_temperature
+from app.views import app, _broadcaster
+
+def request(asgi, path, method='GET', headers=(), body=b'', query=b'', disconnect_after=None):
+    """Run one HTTP request through an ASGI app and return (status, headers, body).
+
+    With disconnect_after, the client disconnects that many seconds after the request.
+    """
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'query_string': query, 'root_path': '',
+        'headers': [(name.lower().encode(), value.encode()) for name, value in headers],
+        'scheme': 'http', 'http_version': '1.1', 'server': ('testserver', 80), 'client': ('127.0.0.1', 1234),
+    }
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        if disconnect_after is not None:
+            await asyncio.sleep(disconnect_after)
+            return {'type': 'http.disconnect'}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi(scope, receive, send))
+    start = sent[0]
+    return start['status'], dict(start['headers']), b''.join(m.get('body', b'') for m in sent[1:])
+
+class TestAsgiApp(unittest.TestCase):
+    def setUp(self):
+        """Set up a test database with one reading and a fresh ASGI app."""
+        self.test_db_path = '/tmp/test_temperature.db'
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+        os.environ['DB_PATH'] = self.test_db_path
+        init_db()
+        store_temperature(22.5)
+        self.asgi = AsgiApp(app, threads=2)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """Wait for the broadcaster to stop and clean up the test database."""
+        while _broadcaster.running:
+            time.sleep(0.01)
+        self.asgi.executor.shutdown()
+        close_connections()
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+    def test_same_responses_as_wsgi(self):
+        """Test that routes served through the thread pool match the Flask app, including streamed bodies."""
+        for path, query in (('/temperature/latest', b''), ('/temperature/history', b'stream=true'),
+                            ('/temperature/hourly', b'max_points=10')):
+            status, headers, body = request(self.asgi, path, query=query)
+            expected = self.client.get(f'{path}?{query.decode()}')
+            self.assertEqual(status, expected.status_code)
+            self.assertEqual(headers[b'content-type'].decode(), expected.content_type)
+            self.assertEqual(json.loads(body), expected.get_json())
+
+        status, headers, body = request(
+            self.asgi, '/temperature/history', query=b'stream=true', headers=[('Accept-Encoding', 'gzip')]
+        )
+        self.assertEqual(headers[b'content-encoding'], b'gzip')
+        self.assertEqual(json.loads(gzip.decompress(body))[0]['temperature'], 22.5)
+
+        status, _, body = request(
+            self.asgi, '/temperature/import', method='POST', headers=[('Content-Type', 'text/csv')], body=b'1,2'
+        )
+        self.assertEqual(status, 403)
+        self.assertEqual(request(self.asgi, '/temperature/stream', query=b'last_event_id=x')[0], 400)
+        self.assertEqual(request(self.asgi, '/temperature/stream', headers=[('Last-Event-ID', str(2**63))])[0], 400)
+        self.assertEqual(request(self.asgi, '/temperature/stream', query=b'last_event_id=-1')[0], 400)
+
+    def test_stream(self):
+        """Test that the native stream replays from Last-Event-ID and pushes new readings."""
+        time.sleep(0.002)
+        store_temperature(23.0)
+        first_ms = fetch_readings_after(0)[0]['timestamp_ms']
+
+        def store_later():
+            time.sleep(0.3)
+            store_temperature(24.0)
+
+        with patch('app.asgi.STREAM_MAX_SECONDS', 1), patch('app.asgi.STREAM_HEARTBEAT_SECONDS', 0.2), \
+                patch.object(_broadcaster, 'check_interval_seconds', 0.02):
+            self.asgi.executor.submit(store_later)
+            status, headers, body = request(self.asgi, '/temperature/stream', headers=[('Last-Event-ID', str(first_ms))])
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'content-type'], b'text/event-stream; charset=utf-8')
+        events = [block for block in body.decode().split('\n\n') if block.startswith('id:')]
+        self.assertEqual([json.loads(e.split('data: ', 1)[1])['temperature'] for e in events], [23.0, 24.0])
+        self.assertIn(': keep-alive', body.decode())
+
+    def test_stream_ends_on_disconnect(self):
+        """Test that a client disconnecting ends its stream and the broadcaster's subscription."""
+        started = time.monotonic()
+        status, _, body = request(self.asgi, '/temperature/stream', disconnect_after=0.2)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertIn(b'event: reading', body)
+        self.assertEqual(self.asgi._streams, 0)
+
+if __name__ == '__main__':
+    unittest.main()
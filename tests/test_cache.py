@@ -0,0 +1,145 @@
+import unittest
+import os
+import sqlite3
+import threading
+import time
+from app.cache import ReadCache
+from app.database import (
+    SQLiteBackend,
+    close_connections,
+    get_latest_temperature,
+    store_temperature,
+    read_cache_stats,
+    init_db
+)
+from app.storage import MemoryBackend, set_backend
+
+HOUR_MS = 60 * 60 * 1000
+
+class TestReadCache(unittest.TestCase):
+    def setUp(self):
+        """Fill an in-memory backend with a reading a minute for the past two hours."""
+        self.now_ms = int(time.time() * 1000)
+        self.backend = MemoryBackend()
+        self.backend.append([(self.now_ms - i * 60 * 1000, 20.0 + i) for i in reversed(range(120))])
+        self.cache = ReadCache(HOUR_MS)
+
+    def test_latest_cached_until_write(self):
+        """Test that the latest reading is reused until the backend changes."""
+        self.assertEqual(self.cache.latest(self.backend), self.backend.latest())
+        self.assertEqual(self.cache.latest(self.backend), self.backend.latest())
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1})
+
+        self.backend.append([(self.now_ms + 1, 30.0)])
+        self.assertEqual(self.cache.latest(self.backend), (self.now_ms + 1, 30.0))
+        self.assertEqual(self.cache.stats()["misses"], 2)
+
+    def test_recent_ranges_served_from_window(self):
+        """Test that any range starting inside the window is sliced from one cached query."""
+        for start_ms, end_ms in [
+            (self.now_ms - HOUR_MS, self.now_ms),
+            (self.now_ms - 30 * 60 * 1000, self.now_ms - 10 * 60 * 1000),
+            (self.now_ms - 5 * 60 * 1000, self.now_ms + HOUR_MS),
+            (self.now_ms + 1, self.now_ms + HOUR_MS),
+        ]:
+            self.assertEqual(self.cache.range(self.backend, start_ms, end_ms), self.backend.range(start_ms, end_ms))
+        self.assertEqual(self.cache.stats(), {"hits": 3, "misses": 1})
+
+    def test_old_ranges_bypass_window(self):
+        """Test that ranges reaching back past the window go to storage."""
+        start_ms = self.now_ms - 2 * HOUR_MS
+        self.assertEqual(self.cache.range(self.backend, start_ms, self.now_ms), self.backend.range(start_ms, self.now_ms))
+        self.assertEqual(self.cache.stats(), {"hits": 0, "misses": 1})
+
+    def test_write_invalidates_window(self):
+        """Test that a new reading appears in the next cached range."""
+        start_ms = self.now_ms - HOUR_MS
+        self.cache.range(self.backend, start_ms, self.now_ms + 1)
+        self.backend.append([(self.now_ms + 1, 30.0)])
+        self.assertEqual(self.cache.range(self.backend, start_ms, self.now_ms + 1)[0], (self.now_ms + 1, 30.0))
+
+    def test_disabled(self):
+        """Test that a zero window turns the cache off."""
+        cache = ReadCache(0)
+        cache.latest(self.backend)
+        cache.latest(self.backend)
+        self.assertEqual(cache.stats(), {"hits": 0, "misses": 2})
+
+class TestSQLiteDataVersion(unittest.TestCase):
+    def setUp(self):
+        """Set up a SQLite backend on a fresh test database."""
+        self.test_db_path = '/tmp/test_temperature.db'
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+        os.environ['DB_PATH'] = self.test_db_path
+        self.backend = SQLiteBackend()
+        self.backend.initialize()
+
+    def tearDown(self):
+        """Clean up the test database."""
+        close_connections()
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+    def test_version_stable_without_writes(self):
+        """Test that reads leave the version unchanged."""
+        version = self.backend.data_version()
+        self.backend.range(0, 2**62)
+        self.assertEqual(self.backend.data_version(), version)
+
+    def test_version_changes_on_own_write(self):
+        """Test that a write through the backend changes the version."""
+        version = self.backend.data_version()
+        self.backend.append([(1000, 21.0)])
+        self.assertNotEqual(self.backend.data_version(), version)
+
+    def test_version_changes_on_other_connection_write(self):
+        """Test that a commit from another connection (e.g. the poller process) changes the version."""
+        version = self.backend.data_version()
+        with sqlite3.connect(self.test_db_path) as conn:
+            conn.execute('INSERT INTO temperature_readings (temperature, timestamp_ms) VALUES (21.0, 1000)')
+        conn.close()
+        self.assertNotEqual(self.backend.data_version(), version)
+
+    def test_version_shared_across_threads(self):
+        """Test that threads agree on the version once each has seen the latest commit."""
+        opened, checked = threading.Event(), threading.Event()
+        versions = []
+
+        def worker():
+            # Opening a connection counts as a change, as it may have missed earlier commits
+            self.backend.data_version()
+            opened.set()
+            checked.wait()
+            versions.append(self.backend.data_version())
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        opened.wait()
+        version = self.backend.data_version()
+        checked.set()
+        thread.join()
+        self.assertEqual(versions[0], version)
+
+class TestCachedQueries(unittest.TestCase):
+    def setUp(self):
+        """Run the query functions against an in-memory backend."""
+        self.previous = set_backend(MemoryBackend())
+        init_db()
+
+    def tearDown(self):
+        """Restore the previous backend."""
+        set_backend(self.previous)
+
+    def test_latest_temperature_hits(self):
+        """Test that repeated latest-reading lookups are counted as cache hits."""
+        store_temperature(22.0)
+        before = read_cache_stats()
+        self.assertEqual(get_latest_temperature()['temperature'], 22.0)
+        self.assertEqual(get_latest_temperature()['temperature'], 22.0)
+        after = read_cache_stats()
+        self.assertEqual(after["misses"] - before["misses"], 1)
+        self.assertEqual(after["hits"] - before["hits"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
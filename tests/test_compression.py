@@ -0,0 +1,99 @@
+import unittest
+import gzip
+import json
+import os
+import time
+from unittest.mock import patch
+from werkzeug.http import parse_accept_header
+from app import compression
+from app.compression import CompressionCache, compress, compressobj, negotiate
+from app.database import close_connections, import_readings, init_db
+from app.views import app
+
+class TestCodecs(unittest.TestCase):
+    def test_negotiate(self):
+        """Test that the client's qualities win, ties go to the server's order, and q=0 refuses."""
+        encodings = ['br', 'gzip']
+        if compression.brotli is not None:
+            self.assertEqual(negotiate(parse_accept_header('gzip, br'), encodings), 'br')
+        else:
+            # Encodings whose package is missing are never offered
+            self.assertEqual(negotiate(parse_accept_header('br, gzip'), encodings), 'gzip')
+        self.assertEqual(negotiate(parse_accept_header('br;q=0.5, gzip'), encodings), 'gzip')
+        self.assertEqual(negotiate(parse_accept_header('*'), ['gzip']), 'gzip')
+        self.assertIsNone(negotiate(parse_accept_header('gzip;q=0'), encodings))
+        self.assertIsNone(negotiate(parse_accept_header(''), encodings))
+        self.assertIsNone(negotiate(parse_accept_header('gzip'), []))
+
+    def test_round_trip(self):
+        """Test that one-shot and incremental compression decode to the input for every installed codec."""
+        data = json.dumps([{"temperature": 20 + i / 10, "collected_at": str(i)} for i in range(1000)]).encode()
+        for encoding in compression.available_encodings(['gzip', 'br', 'zstd']):
+            stream = compressobj(encoding)
+            chunked = b''.join(stream.compress(data[i:i + 4096]) for i in range(0, len(data), 4096)) + stream.flush()
+            for body in (compress(data, encoding), chunked):
+                if encoding == 'gzip':
+                    decoded = gzip.decompress(body)
+                elif encoding == 'br':
+                    decoded = compression.brotli.decompress(body)
+                else:
+                    decoded = compression.zstandard.ZstdDecompressor().decompressobj().decompress(body)
+                self.assertEqual(decoded, data)
+
+    def test_cache(self):
+        """Test that identical bodies are compressed once and the cache stays within its size."""
+        cache = CompressionCache(200)
+        first = b'a' * 5000
+        self.assertIs(cache.compress(first, 'gzip'), cache.compress(first, 'gzip'))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        cache.compress(first, 'gzip', level=1)
+        self.assertEqual(cache.misses, 2)
+
+        for i in range(20):
+            cache.compress(os.urandom(50), 'gzip')
+        self.assertLessEqual(cache.stats()['bytes'], 200)
+
+class TestCompressedResponses(unittest.TestCase):
+    def setUp(self):
+        """Set up a test database with a day of readings."""
+        self.test_db_path = '/tmp/test_temperature.db'
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+        os.environ['DB_PATH'] = self.test_db_path
+        init_db()
+        now_ms = int(time.time() * 1000)
+        import_readings([(now_ms - i * 60000, 20 + (i % 30) / 10) for i in range(1440)])
+        self.app = app.test_client()
+
+    def tearDown(self):
+        """Clean up the test database."""
+        close_connections()
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+    def test_buffered_and_streamed_history(self):
+        """Test that buffered and streamed history decode to the uncompressed body."""
+        for query in ('', '?stream=true', '?format=ndjson', '?format=columnar'):
+            plain = self.app.get('/temperature/history' + query)
+            self.assertNotIn('Content-Encoding', plain.headers)
+            self.assertIn('Accept-Encoding', plain.headers['Vary'])
+
+            response = self.app.get('/temperature/history' + query, headers={'Accept-Encoding': 'gzip'})
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            body = response.get_data()
+            self.assertLess(len(body), len(plain.data) / 3)
+            self.assertEqual(gzip.decompress(body), plain.data)
+
+    def test_small_and_uncompressible_responses(self):
+        """Test that small bodies and event streams are sent as is."""
+        response = self.app.get('/temperature/latest', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(json.loads(response.data)['temperature'], 20.0)
+
+        with patch('app.views.STREAM_MAX_SECONDS', 0):
+            response = self.app.get('/temperature/stream', headers={'Accept-Encoding': 'gzip'})
+            self.assertNotIn('Content-Encoding', response.headers)
+            self.assertIn(b'event: reading', response.data)
+
+if __name__ == '__main__':
+    unittest.main()
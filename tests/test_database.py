@@ -1,8 +1,38 @@
 import unittest
+import gzip
 import os
+import random
+import shutil
 import sqlite3
+import tempfile
+import threading
+import time
 from datetime import datetime, timezone, timedelta
-from app.database import init_db, store_temperature, fetch_temperature_history, get_latest_temperature
+from unittest.mock import patch
+from app.database import (
+    init_db,
+    store_temperature,
+    fetch_temperature_history,
+    fetch_temperature_rollups,
+    fetch_temperature_stats,
+    fetch_temperature_page,
+    iter_temperature_history,
+    fetch_readings_after,
+    get_latest_temperature,
+    get_connection,
+    close_connections,
+    compact_database,
+    backup_database,
+    list_backups,
+    list_sensor_channels,
+    fetch_sensor_history,
+    SCHEMA_VERSION,
+    BufferedWriter,
+    SQLiteBackend,
+    _MIGRATIONS
+)
+from app.archive import decode_block
+from app.storage import MemoryBackend
 from config import DATA_RETENTION_PERIOD
 
 class TestDatabase(unittest.TestCase):
@@ -20,6 +50,7 @@ class TestDatabase(unittest.TestCase):
         
     def tearDown(self):
         """Clean up test database after each test."""
+        close_connections()
         if os.path.exists(self.test_db_path):
             os.remove(self.test_db_path)
             
@@ -40,28 +71,60 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(readings[0]['temperature'], test_temp)
         
     def test_data_retention(self):
-        """Test that old data is automatically cleaned up."""
+        """Test that compaction removes readings older than the retention period."""
         # Store some old data
         old_time = datetime.now(timezone.utc) - DATA_RETENTION_PERIOD - timedelta(days=1)
         with sqlite3.connect(self.test_db_path) as conn:
             c = conn.cursor()
             c.execute(
-                'INSERT INTO temperature_readings (temperature, timestamp) VALUES (?, ?)',
-                (22.5, old_time.isoformat())
+                'INSERT INTO temperature_readings (temperature, timestamp_ms) VALUES (?, ?)',
+                (22.5, int(old_time.timestamp() * 1000))
             )
             conn.commit()
-            
-        # Store new data to trigger cleanup
+
         store_temperature(23.0)
-        
-        # Verify old data is gone
+        report = compact_database()
+        self.assertEqual(report['deleted_rows'], 1)
+        # The expired reading moves to the archive (see test_compaction_archives_readings)
+        self.assertEqual(report['archived_rows'], 1)
+        self.assertGreaterEqual(report['duration_seconds'], 0)
+
+        # Verify old data is gone from the retention window
         readings = fetch_temperature_history(
-            datetime.now(timezone.utc) - timedelta(days=15),
+            datetime.now(timezone.utc) - DATA_RETENTION_PERIOD,
             datetime.now(timezone.utc)
         )
         self.assertEqual(len(readings), 1)
         self.assertEqual(readings[0]['temperature'], 23.0)
-        
+
+    def test_store_temperature_does_not_prune(self):
+        """Test that inserting a reading leaves expired rows for the compactor."""
+        old_time = datetime.now(timezone.utc) - DATA_RETENTION_PERIOD - timedelta(days=1)
+        with sqlite3.connect(self.test_db_path) as conn:
+            conn.execute(
+                'INSERT INTO temperature_readings (temperature, timestamp_ms) VALUES (?, ?)',
+                (22.5, int(old_time.timestamp() * 1000))
+            )
+
+        store_temperature(23.0)
+        count = get_connection().execute('SELECT COUNT(*) FROM temperature_readings').fetchone()[0]
+        self.assertEqual(count, 2)
+
+    def test_compaction_batches(self):
+        """Test that compaction deletes in bounded batches and reports them."""
+        old_time = datetime.now(timezone.utc) - DATA_RETENTION_PERIOD - timedelta(days=1)
+        with sqlite3.connect(self.test_db_path) as conn:
+            conn.executemany(
+                'INSERT INTO temperature_readings (temperature, timestamp_ms) VALUES (?, ?)',
+                [(20.0, int((old_time - timedelta(minutes=i)).timestamp() * 1000)) for i in range(25)]
+            )
+
+        report = compact_database(batch_size=10)
+        self.assertEqual(report['deleted_rows'], 25)
+        self.assertEqual(report['batches'], 3)
+        count = get_connection().execute('SELECT COUNT(*) FROM temperature_readings').fetchone()[0]
+        self.assertEqual(count, 0)
+
     def test_fetch_temperature_history_time_range(self):
         """Test fetching temperature history within a specific time range."""
         # Store multiple readings at different times
@@ -76,8 +139,8 @@ class TestDatabase(unittest.TestCase):
             with sqlite3.connect(self.test_db_path) as conn:
                 c = conn.cursor()
                 c.execute(
-                    'INSERT INTO temperature_readings (temperature, timestamp) VALUES (?, ?)',
-                    (22.0 + i, time.isoformat())
+                    'INSERT INTO temperature_readings (temperature, timestamp_ms) VALUES (?, ?)',
+                    (22.0 + i, int(time.timestamp() * 1000))
                 )
                 conn.commit()
         
@@ -120,5 +183,564 @@ class TestDatabase(unittest.TestCase):
         self.assertIsNotNone(latest)
         self.assertEqual(latest['temperature'], test_temp)
 
+    def test_connection_reused_within_thread(self):
+        """Test that database calls on one thread share a single connection."""
+        self.assertIs(get_connection(), get_connection())
+
+    def test_connection_per_thread(self):
+        """Test that each thread gets its own connection."""
+        import threading
+        connections = []
+        thread = threading.Thread(target=lambda: connections.append(get_connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(connections[0], get_connection())
+
+    def test_connection_pragmas(self):
+        """Test that connections use WAL journaling and a busy timeout."""
+        conn = get_connection()
+        self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        self.assertGreater(conn.execute('PRAGMA busy_timeout').fetchone()[0], 0)
+
+    def test_init_db_reopens_connection(self):
+        """Test that init_db drops cached connections so a replaced file is picked up."""
+        conn = get_connection()
+        init_db()
+        self.assertIsNot(conn, get_connection())
+
+    def test_connection_reopened_after_close_from_another_thread(self):
+        """Test that a thread whose connection another thread closed opens a new one."""
+        ready, closed = threading.Event(), threading.Event()
+        results = []
+
+        def worker():
+            conn = get_connection()
+            ready.set()
+            closed.wait()
+            try:
+                results.append((conn, get_connection(), get_connection().execute('SELECT 1').fetchone()[0]))
+            except sqlite3.Error as e:
+                results.append(e)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        ready.wait()
+        init_db()
+        closed.set()
+        thread.join()
+        [(old, new, value)] = results
+        self.assertIsNot(old, new)
+        self.assertEqual(value, 1)
+
+    def test_rollups_updated_on_store(self):
+        """Test that each stored reading is folded into minute, hour and day rollups."""
+        for temperature in (20.0, 22.0, 24.0):
+            store_temperature(temperature)
+
+        now = datetime.now(timezone.utc)
+        for resolution in ('minute', 'hour', 'day'):
+            buckets = fetch_temperature_rollups(resolution, now - timedelta(minutes=5), now)
+            self.assertEqual(sum(b['count'] for b in buckets), 3)
+            self.assertEqual(min(b['min_temperature'] for b in buckets), 20.0)
+            self.assertEqual(max(b['max_temperature'] for b in buckets), 24.0)
+            mean = sum(b['temperature'] * b['count'] for b in buckets) / 3
+            self.assertAlmostEqual(mean, 22.0)
+
+    def test_rollups_invalid_resolution(self):
+        """Test that unknown rollup resolutions are rejected."""
+        with self.assertRaises(ValueError):
+            fetch_temperature_rollups('week')
+
+    def test_compaction_prunes_minute_rollups(self):
+        """Test that minute rollups expire with raw readings while hourly ones remain."""
+        old_time = datetime.now(timezone.utc) - DATA_RETENTION_PERIOD - timedelta(days=1)
+        with patch('app.database.datetime') as mock_datetime:
+            mock_datetime.now.return_value = old_time
+            store_temperature(21.0)
+
+        report = compact_database()
+        self.assertEqual(report['deleted_rollups'], 1)
+        window = (old_time - timedelta(hours=1), old_time + timedelta(hours=1))
+        self.assertEqual(fetch_temperature_rollups('minute', *window), [])
+        self.assertEqual(len(fetch_temperature_rollups('hour', *window)), 1)
+
+    def test_stats_match_readings(self):
+        """Test that rollup-based stats agree with a scan of the same readings across day and hour edges."""
+        rng = random.Random(0)
+        end_time = datetime.now(timezone.utc)
+        readings = [
+            (int((end_time - timedelta(minutes=7 * i, seconds=rng.randint(0, 59))).timestamp() * 1000),
+             round(rng.uniform(15.0, 30.0), 2))
+            for i in range(1000)
+        ]
+        readings.sort()
+        SQLiteBackend().append(readings)
+        memory = MemoryBackend()
+        memory.append(readings)
+
+        start_ms = readings[0][0] + 12345
+        end_ms = readings[-1][0] - 6789
+        expected = memory.summary(start_ms, end_ms)
+        count, minimum, maximum, total, squares, histogram = SQLiteBackend().summary(start_ms, end_ms)
+        self.assertEqual((count, minimum, maximum), expected[:3])
+        self.assertAlmostEqual(total, expected[3], places=6)
+        self.assertAlmostEqual(squares, expected[4], places=4)
+        self.assertEqual(histogram, expected[5])
+
+        stats = fetch_temperature_stats(end_time - timedelta(days=7), end_time, percentiles=(50,))
+        temperatures = sorted(temperature for _, temperature in readings)
+        self.assertEqual(stats['count'], len(readings))
+        self.assertAlmostEqual(stats['mean'], sum(temperatures) / len(temperatures))
+        # Percentiles are accurate to within one 1/16 degree bin
+        self.assertLess(abs(stats['percentiles']['p50'] - temperatures[len(temperatures) // 2]), 0.0625)
+
+    def test_stats_empty_range(self):
+        """Test that an empty range reports a zero count and no values."""
+        stats = fetch_temperature_stats()
+        self.assertEqual(stats['count'], 0)
+        self.assertIsNone(stats['mean'])
+        self.assertEqual(stats['percentiles'], {'p5': None, 'p25': None, 'p50': None, 'p75': None, 'p95': None})
+        with self.assertRaises(ValueError):
+            fetch_temperature_stats(percentiles=(150,))
+
+    def test_migrate_rollup_statistics(self):
+        """Test that upgrading backfills spread for buckets whose readings are all still stored."""
+        close_connections()
+        os.remove(self.test_db_path)
+        day_ms = 24 * 60 * 60 * 1000
+        today_ms = int(datetime.now(timezone.utc).timestamp() * 1000) // day_ms * day_ms
+        conn = sqlite3.connect(self.test_db_path)
+        _MIGRATIONS[0](conn)
+        _MIGRATIONS[1](conn)
+        conn.executemany(
+            'INSERT INTO temperature_readings (temperature, timestamp_ms) VALUES (?, ?)',
+            [(20.0, today_ms - day_ms + 1000), (21.0, today_ms - day_ms + 2000), (22.0, today_ms + 1000)]
+        )
+        for migration in _MIGRATIONS[2:5]:
+            migration(conn)
+        # Yesterday's first reading has since been pruned, so its buckets cannot be backfilled
+        conn.execute('DELETE FROM temperature_readings WHERE temperature = 20.0')
+        conn.execute('PRAGMA user_version=5')
+        conn.commit()
+        conn.close()
+
+        init_db()
+        yesterday = datetime.fromtimestamp((today_ms - day_ms) / 1000, timezone.utc)
+        today = datetime.fromtimestamp(today_ms / 1000, timezone.utc)
+        stats = fetch_temperature_stats(yesterday, today - timedelta(milliseconds=1))
+        self.assertEqual((stats['count'], stats['min']), (2, 20.0))
+        self.assertIsNone(stats['stddev'])
+        stats = fetch_temperature_stats(today, today + timedelta(hours=1))
+        self.assertEqual(stats['stddev'], 0.0)
+        self.assertEqual(stats['percentiles']['p50'], 22.0)
+
+    def test_buffered_writer_size_threshold(self):
+        """Test that buffered readings are committed together once the batch is full."""
+        writer = BufferedWriter(max_size=3, max_age_seconds=3600)
+        writer.add(21.0)
+        writer.add(22.0)
+        self.assertEqual(writer.pending, 2)
+        self.assertIsNone(get_latest_temperature())
+
+        writer.add(23.0)
+        self.assertEqual(writer.pending, 0)
+        readings = fetch_temperature_history(
+            datetime.now(timezone.utc) - timedelta(minutes=5),
+            datetime.now(timezone.utc)
+        )
+        self.assertEqual(sorted(r['temperature'] for r in readings), [21.0, 22.0, 23.0])
+
+    def test_buffered_writer_age_threshold(self):
+        """Test that a reading older than the data-loss window forces a flush."""
+        writer = BufferedWriter(max_size=100, max_age_seconds=60)
+        with patch('app.database.time.monotonic') as mock_monotonic:
+            mock_monotonic.return_value = 1000.0
+            writer.add(21.0)
+            self.assertEqual(writer.pending, 1)
+
+            mock_monotonic.return_value = 1061.0
+            writer.add(22.0)
+        self.assertEqual(writer.pending, 0)
+        self.assertEqual(get_latest_temperature()['temperature'], 22.0)
+
+    def test_buffered_writer_flush(self):
+        """Test that flush writes pending readings and reports how many."""
+        writer = BufferedWriter(max_size=100, max_age_seconds=3600)
+        self.assertEqual(writer.flush(), 0)
+        writer.add(21.0)
+        writer.add(22.0)
+        self.assertEqual(writer.flush(), 2)
+        self.assertEqual(writer.pending, 0)
+        self.assertEqual(get_latest_temperature()['temperature'], 22.0)
+
+    def test_buffered_writer_validation(self):
+        """Test that invalid readings are rejected before they are buffered."""
+        writer = BufferedWriter(max_size=100)
+        with self.assertRaises(ValueError):
+            writer.add(100)
+        self.assertEqual(writer.pending, 0)
+
+    def test_buffered_writer_keeps_readings_on_failure(self):
+        """Test that readings stay buffered if the batch cannot be committed."""
+        writer = BufferedWriter(max_size=100)
+        writer.add(21.0)
+        with patch('app.database._insert_readings', side_effect=sqlite3.OperationalError('locked')):
+            with self.assertRaises(sqlite3.OperationalError):
+                writer.flush()
+        self.assertEqual(writer.pending, 1)
+        self.assertEqual(writer.flush(), 1)
+
+    def test_buffered_writer_sensor_channels(self):
+        """Test that every sensor channel is written with the poll and invalid values are dropped."""
+        writer = BufferedWriter(max_size=1)
+        writer.add(None, [
+            ('1-1', 'internal_temperature', 21.0),
+            ('1-1', 'internal_humidity', 140.0),
+            ('1-2', 'external_temperature', 18.5),
+        ])
+        self.assertEqual(writer.pending, 0)
+        self.assertIsNone(get_latest_temperature())
+        self.assertEqual(list_sensor_channels(), [
+            {'sensor': '1-1', 'channels': ['internal_temperature']},
+            {'sensor': '1-2', 'channels': ['external_temperature']},
+        ])
+        self.assertEqual([r['value'] for r in fetch_sensor_history('1-2', 'external_temperature')], [18.5])
+        self.assertIsNone(fetch_sensor_history('1-2', 'internal_humidity'))
+
+    def test_sensor_history_uses_primary_key_range(self):
+        """Test that per-channel range queries seek the (channel, time) key instead of scanning."""
+        plan = get_connection().execute(
+            '''EXPLAIN QUERY PLAN SELECT timestamp_ms, value FROM sensor_readings
+               WHERE channel_id = ? AND timestamp_ms BETWEEN ? AND ?
+               ORDER BY timestamp_ms DESC''',
+            (1, 0, 1)
+        ).fetchall()
+        detail = ' '.join(row[-1] for row in plan)
+        self.assertIn('SEARCH sensor_readings USING PRIMARY KEY (channel_id=? AND timestamp_ms>? AND timestamp_ms<?)', detail)
+        self.assertNotIn('TEMP B-TREE', detail)
+
+    def test_compaction_prunes_sensor_readings(self):
+        """Test that expired sensor readings are deleted in batches with the primary series."""
+        old_time = datetime.now(timezone.utc) - DATA_RETENTION_PERIOD - timedelta(days=1)
+        writer = BufferedWriter(max_size=1)
+        with patch('app.database.datetime') as mock_datetime:
+            for minutes in range(5):
+                mock_datetime.now.return_value = old_time + timedelta(minutes=minutes)
+                writer.add(None, [('1-1', 'internal_temperature', 20.0)])
+        writer.add(None, [('1-1', 'internal_temperature', 21.0)])
+
+        report = compact_database(batch_size=2)
+        self.assertEqual(report['deleted_rows'], 5)
+        self.assertEqual([r['value'] for r in fetch_sensor_history('1-1', 'internal_temperature')], [21.0])
+
+    def _insert_expired(self, count, temperature=20.0):
+        """Insert one reading per minute starting a day past the retention period."""
+        old_time = datetime.now(timezone.utc) - DATA_RETENTION_PERIOD - timedelta(days=1)
+        with sqlite3.connect(self.test_db_path) as conn:
+            conn.executemany(
+                'INSERT INTO temperature_readings (temperature, timestamp_ms) VALUES (?, ?)',
+                [(temperature + i, int((old_time + timedelta(minutes=i)).timestamp() * 1000)) for i in range(count)]
+            )
+        return old_time
+
+    def test_compaction_archives_readings(self):
+        """Test that expired readings are sealed into archive blocks and still readable."""
+        old_time = self._insert_expired(25)
+        store_temperature(23.0)
+
+        report = compact_database(batch_size=10)
+        self.assertEqual(report['deleted_rows'], 25)
+        self.assertEqual(report['archived_rows'], 25)
+        self.assertEqual(report['batches'], 3)
+        conn = get_connection()
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM temperature_readings').fetchone()[0], 1)
+        self.assertGreaterEqual(conn.execute('SELECT COUNT(*) FROM archive_blocks').fetchone()[0], 1)
+
+        window = (old_time - timedelta(minutes=1), datetime.now(timezone.utc))
+        readings = fetch_temperature_history(*window)
+        self.assertEqual([r['temperature'] for r in readings], [23.0] + [20.0 + i for i in reversed(range(25))])
+        self.assertEqual([r for batch in iter_temperature_history(*window, chunk_size=7) for r in batch], readings)
+
+        # Readings arriving late for an archived day are merged into its block
+        self._insert_expired(3, temperature=-10.5)
+        compact_database()
+        readings = fetch_temperature_history(*window)
+        self.assertEqual(len(readings), 29)
+        self.assertEqual(sorted(r['temperature'] for r in readings)[:3], [-10.5, -9.5, -8.5])
+
+    def test_streamed_history_decodes_archive_lazily(self):
+        """Test that streaming archived history decodes one day block at a time."""
+        old_time = datetime.now(timezone.utc) - DATA_RETENTION_PERIOD - timedelta(days=5)
+        with sqlite3.connect(self.test_db_path) as conn:
+            conn.executemany(
+                'INSERT INTO temperature_readings (temperature, timestamp_ms) VALUES (?, ?)',
+                [(20.0 + i, int((old_time + timedelta(days=i)).timestamp() * 1000)) for i in range(4)]
+            )
+        compact_database()
+
+        with patch('app.database.decode_block', wraps=decode_block) as decode:
+            batches = iter_temperature_history(old_time - timedelta(minutes=1), datetime.now(timezone.utc), chunk_size=1)
+            self.assertEqual([r['temperature'] for r in next(batches)], [23.0])
+            self.assertEqual(decode.call_count, 1)
+            self.assertEqual([r['temperature'] for batch in batches for r in batch], [22.0, 21.0, 20.0])
+            self.assertEqual(decode.call_count, 4)
+
+    def test_limited_replay_stops_reading_archive(self):
+        """Test that fetch_readings_after() with a limit decodes no more archive blocks than it needs."""
+        old_time = datetime.now(timezone.utc) - DATA_RETENTION_PERIOD - timedelta(days=5)
+        with sqlite3.connect(self.test_db_path) as conn:
+            conn.executemany(
+                'INSERT INTO temperature_readings (temperature, timestamp_ms) VALUES (?, ?)',
+                [(20.0 + i, int((old_time + timedelta(days=i)).timestamp() * 1000)) for i in range(4)]
+            )
+        compact_database()
+        for temperature in (30.0, 31.0):
+            time.sleep(0.002)
+            store_temperature(temperature)
+
+        with patch('app.database.decode_block', wraps=decode_block) as decode:
+            # A stale Last-Event-ID: the newest readings are all raw
+            self.assertEqual([r['temperature'] for r in fetch_readings_after(0, limit=2)], [30.0, 31.0])
+            self.assertEqual(decode.call_count, 0)
+            self.assertEqual([r['temperature'] for r in fetch_readings_after(0, limit=4)], [22.0, 23.0, 30.0, 31.0])
+            self.assertEqual(decode.call_count, 2)
+        self.assertEqual(len(fetch_readings_after(0)), 6)
+
+    def test_incremental_vacuum_enabled_on_existing_database(self):
+        """Test that a database created without incremental auto_vacuum is converted, so compaction shrinks it."""
+        close_connections()
+        os.remove(self.test_db_path)
+        with sqlite3.connect(self.test_db_path) as conn:
+            # As created before auto_vacuum was set on new connections
+            conn.execute('CREATE TABLE padding (data BLOB)')
+            conn.executemany('INSERT INTO padding VALUES (?)', [(os.urandom(1000),)] * 200)
+        init_db()
+
+        conn = get_connection()
+        self.assertEqual(conn.execute('PRAGMA auto_vacuum').fetchone()[0], 2)
+        with conn:
+            conn.execute('DROP TABLE padding')
+        free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        self.assertGreater(free_pages, 10)
+        self.assertEqual(compact_database(vacuum_pages=10)['vacuumed_pages'], 10)
+        self.assertEqual(compact_database(vacuum_pages=1000)['vacuumed_pages'], free_pages - 10)
+
+    def test_compaction_archives_sensor_readings(self):
+        """Test that expired sensor channel readings are archived per channel."""
+        old_time = datetime.now(timezone.utc) - DATA_RETENTION_PERIOD - timedelta(days=1)
+        writer = BufferedWriter(max_size=1)
+        with patch('app.database.datetime') as mock_datetime:
+            for minutes in range(5):
+                mock_datetime.now.return_value = old_time + timedelta(minutes=minutes)
+                writer.add(None, [('1-1', 'internal_temperature', 20.0 + minutes)])
+
+        report = compact_database()
+        self.assertEqual(report['archived_rows'], 5)
+        history = fetch_sensor_history('1-1', 'internal_temperature', old_time - timedelta(minutes=1))
+        self.assertEqual([r['value'] for r in history], [24.0, 23.0, 22.0, 21.0, 20.0])
+
+    def test_compaction_expires_archive_blocks(self):
+        """Test that archive blocks are dropped once past the archive retention period."""
+        self._insert_expired(5)
+        with patch('app.database.ARCHIVE_RETENTION_PERIOD', DATA_RETENTION_PERIOD):
+            report = compact_database()
+        self.assertEqual(report['archived_rows'], 5)
+        self.assertEqual(report['deleted_blocks'], 1)
+        self.assertEqual(get_connection().execute('SELECT COUNT(*) FROM archive_blocks').fetchone()[0], 0)
+
+    def test_compaction_without_archive(self):
+        """Test that a zero archive retention deletes expired readings outright."""
+        self._insert_expired(5)
+        with patch('app.database.ARCHIVE_RETENTION_PERIOD', timedelta(0)):
+            report = compact_database()
+        self.assertEqual(report['deleted_rows'], 5)
+        self.assertEqual(report['archived_rows'], 0)
+        self.assertEqual(get_connection().execute('SELECT COUNT(*) FROM archive_blocks').fetchone()[0], 0)
+
+    def _snapshot_readings(self, path):
+        """Return the readings stored in a (possibly gzipped) snapshot."""
+        if path.endswith('.gz'):
+            with gzip.open(path) as source, open(path + '.db', 'wb') as target:
+                shutil.copyfileobj(source, target)
+            path += '.db'
+        with sqlite3.connect(path) as conn:
+            self.assertEqual(conn.execute('PRAGMA integrity_check').fetchone()[0], 'ok')
+            self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+            rows = conn.execute('SELECT temperature FROM temperature_readings ORDER BY id').fetchall()
+        conn.close()
+        return [row[0] for row in rows]
+
+    def test_backup_database(self):
+        """Test that snapshots are complete, optionally compressed, and rotated."""
+        store_temperature(21.0)
+        store_temperature(22.0)
+        with tempfile.TemporaryDirectory() as directory:
+            report = backup_database(directory, compress=False, keep=2, pages_per_step=1, step_sleep_ms=0)
+            self.assertTrue(report['path'].endswith('.db'))
+            self.assertEqual(report['bytes'], report['database_bytes'])
+            self.assertGreater(report['pages'], 1)
+            self.assertEqual(report['steps'], report['pages'])
+            self.assertEqual(self._snapshot_readings(report['path']), [21.0, 22.0])
+
+            with patch('app.database.datetime') as mock_datetime:
+                for hour in (1, 2):
+                    mock_datetime.now.return_value = datetime(2030, 1, 1, hour, tzinfo=timezone.utc)
+                    report = backup_database(directory, compress=True, keep=2)
+            self.assertTrue(report['path'].endswith('/test_temperature-20300101T020000Z.db.gz'))
+            self.assertLess(report['bytes'], report['database_bytes'])
+            self.assertEqual(report['deleted_backups'], 1)
+            self.assertEqual(list_backups(directory), [
+                os.path.join(directory, name)
+                for name in ('test_temperature-20300101T010000Z.db.gz', 'test_temperature-20300101T020000Z.db.gz')
+            ])
+            self.assertEqual(self._snapshot_readings(report['path']), [21.0, 22.0])
+
+    def test_backup_during_writes(self):
+        """Test that a throttled snapshot stays consistent while another connection keeps writing."""
+        store_temperature(20.0)
+        stop = threading.Event()
+
+        def writer():
+            with sqlite3.connect(self.test_db_path) as conn:
+                while not stop.is_set():
+                    with conn:
+                        conn.execute('INSERT INTO temperature_readings (temperature, timestamp_ms) VALUES (21.0, 0)')
+                    stop.wait(0.01)
+            conn.close()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                report = backup_database(directory, compress=False, pages_per_step=5, step_sleep_ms=1)
+                readings = self._snapshot_readings(report['path'])
+        finally:
+            stop.set()
+            thread.join()
+        self.assertEqual(readings[0], 20.0)
+        self.assertTrue(all(temperature == 21.0 for temperature in readings[1:]))
+
+    def _insert_minutes(self, count, base_time):
+        """Insert one reading per minute before base_time, newest temperature highest."""
+        with sqlite3.connect(self.test_db_path) as conn:
+            conn.executemany(
+                'INSERT INTO temperature_readings (temperature, timestamp_ms) VALUES (?, ?)',
+                [
+                    (float(count - i), int((base_time - timedelta(minutes=i)).timestamp() * 1000))
+                    for i in range(count)
+                ]
+            )
+
+    def test_fetch_temperature_page_walks_backwards(self):
+        """Test that before-cursors walk the whole range without gaps or repeats."""
+        base_time = datetime.now(timezone.utc) - timedelta(minutes=1)
+        self._insert_minutes(25, base_time)
+
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = fetch_temperature_page(limit=10, before=cursor)
+            seen.extend(r['temperature'] for r in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [float(t) for t in range(25, 0, -1)])
+
+    def test_fetch_temperature_page_walks_forwards(self):
+        """Test that after-cursors return the newer readings closest to the cursor."""
+        base_time = datetime.now(timezone.utc) - timedelta(minutes=1)
+        self._insert_minutes(25, base_time)
+
+        _, cursor = fetch_temperature_page(limit=10)
+        page, cursor = fetch_temperature_page(limit=5, after=cursor)
+        self.assertEqual([r['temperature'] for r in page], [21.0, 20.0, 19.0, 18.0, 17.0])
+
+        page, cursor = fetch_temperature_page(limit=5, after=cursor)
+        self.assertEqual([r['temperature'] for r in page], [25.0, 24.0, 23.0, 22.0])
+        self.assertIsNone(cursor)
+
+    def test_fetch_temperature_page_same_timestamp(self):
+        """Test that readings sharing a timestamp are split across pages by id."""
+        timestamp_ms = int((datetime.now(timezone.utc) - timedelta(minutes=1)).timestamp() * 1000)
+        with sqlite3.connect(self.test_db_path) as conn:
+            conn.executemany(
+                'INSERT INTO temperature_readings (temperature, timestamp_ms) VALUES (?, ?)',
+                [(float(t), timestamp_ms) for t in range(5)]
+            )
+
+        first, cursor = fetch_temperature_page(limit=3)
+        second, cursor = fetch_temperature_page(limit=3, before=cursor)
+        self.assertEqual([r['temperature'] for r in first + second], [4.0, 3.0, 2.0, 1.0, 0.0])
+        self.assertIsNone(cursor)
+
+    def test_fetch_temperature_page_invalid_cursor(self):
+        """Test that malformed cursors are rejected."""
+        with self.assertRaises(ValueError):
+            fetch_temperature_page(before='garbage')
+        with self.assertRaises(ValueError):
+            fetch_temperature_page(before='1_1', after='2_2')
+        # Beyond SQLite's 64-bit integers the query itself would fail
+        for cursor in (f'{2**63}_1', f'1_{2**63}', '-1_1'):
+            with self.assertRaises(ValueError):
+                fetch_temperature_page(after=cursor)
+
+    def test_iter_temperature_history(self):
+        """Test that streamed history arrives in bounded batches matching the list API."""
+        base_time = datetime.now(timezone.utc) - timedelta(minutes=1)
+        self._insert_minutes(25, base_time)
+
+        batches = list(iter_temperature_history(chunk_size=10))
+        self.assertEqual([len(batch) for batch in batches], [10, 10, 5])
+        self.assertEqual([r for batch in batches for r in batch], fetch_temperature_history())
+
+    def test_collected_at_format(self):
+        """Test that readings are returned with ISO-8601 UTC timestamps."""
+        store_temperature(22.5)
+        collected_at = get_latest_temperature()['collected_at']
+        parsed = datetime.fromisoformat(collected_at)
+        self.assertEqual(parsed.utcoffset(), timedelta(0))
+        self.assertLess(abs(datetime.now(timezone.utc) - parsed), timedelta(minutes=1))
+
+    def test_migrate_text_timestamps(self):
+        """Test that a database with ISO-8601 TEXT timestamps is migrated in place."""
+        close_connections()
+        os.remove(self.test_db_path)
+        base_time = datetime.now(timezone.utc).replace(microsecond=0)
+        with sqlite3.connect(self.test_db_path) as conn:
+            conn.execute('''
+                CREATE TABLE temperature_readings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    temperature REAL NOT NULL,
+                    timestamp TEXT NOT NULL
+                )
+            ''')
+            conn.executemany(
+                'INSERT INTO temperature_readings (temperature, timestamp) VALUES (?, ?)',
+                [
+                    (21.0, (base_time - timedelta(minutes=20)).isoformat()),
+                    (22.0, (base_time - timedelta(minutes=10)).strftime('%Y-%m-%dT%H:%M:%SZ')),
+                    (23.0, 'not a timestamp'),
+                ]
+            )
+        conn.close()
+
+        init_db()
+
+        conn = get_connection()
+        self.assertEqual(conn.execute('PRAGMA user_version').fetchone()[0], SCHEMA_VERSION)
+        readings = fetch_temperature_history(base_time - timedelta(hours=1), base_time)
+        self.assertEqual([r['temperature'] for r in readings], [22.0, 21.0])
+        self.assertEqual(
+            datetime.fromisoformat(readings[0]['collected_at']),
+            base_time - timedelta(minutes=10)
+        )
+
+        # Rollups are backfilled from the migrated readings
+        buckets = fetch_temperature_rollups('minute', base_time - timedelta(hours=1), base_time)
+        self.assertEqual([b['temperature'] for b in buckets], [22.0, 21.0])
+
+        # Running init_db again leaves the migrated data untouched
+        init_db()
+        self.assertEqual(len(fetch_temperature_history(base_time - timedelta(hours=1), base_time)), 2)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,63 @@
+import unittest
+import struct
+from app.export import encode_columnar, decode_columnar, FLAG_DELTA
+
+class TestColumnarExport(unittest.TestCase):
+    def setUp(self):
+        """Build a newest-first series at one-minute intervals."""
+        self.timestamps = [1710417600000 - i * 60000 for i in range(10)]
+        self.temperatures = [20.0 + i * 0.25 for i in range(10)]
+
+    def test_round_trip(self):
+        """Test that encoded columns decode back to the same values."""
+        timestamps, temperatures = decode_columnar(encode_columnar(self.timestamps, self.temperatures))
+        self.assertEqual(list(timestamps), self.timestamps)
+        self.assertEqual(list(temperatures), self.temperatures)
+
+    def test_delta_round_trip(self):
+        """Test that delta-encoded timestamps decode exactly and take less space."""
+        plain = encode_columnar(self.timestamps, self.temperatures)
+        packed = encode_columnar(self.timestamps, self.temperatures, delta=True)
+        self.assertLess(len(packed), len(plain))
+        self.assertTrue(packed[5] & FLAG_DELTA)
+
+        timestamps, _ = decode_columnar(packed)
+        self.assertEqual(list(timestamps), self.timestamps)
+
+    def test_delta_falls_back_for_large_gaps(self):
+        """Test that gaps too large for int32 are stored as plain int64 timestamps."""
+        timestamps = [0, 2**40]
+        payload = encode_columnar(timestamps, [1.0, 2.0], delta=True)
+        self.assertFalse(payload[5] & FLAG_DELTA)
+        self.assertEqual(list(decode_columnar(payload)[0]), timestamps)
+
+    def test_layout(self):
+        """Test the header and little-endian column layout."""
+        payload = encode_columnar([1, 2], [1.5, -2.5])
+        magic, version, flags, count = struct.unpack_from('<4sBBxxI', payload)
+        self.assertEqual((magic, version, flags, count), (b'TBCF', 1, 0, 2))
+        self.assertEqual(struct.unpack_from('<2q2f', payload, 12), (1, 2, 1.5, -2.5))
+
+    def test_float32_precision(self):
+        """Test that temperatures survive to float32 precision."""
+        _, temperatures = decode_columnar(encode_columnar([0], [21.37]))
+        self.assertAlmostEqual(temperatures[0], 21.37, places=5)
+
+    def test_empty(self):
+        """Test that an empty range encodes to just the header."""
+        for delta in (False, True):
+            timestamps, temperatures = decode_columnar(encode_columnar([], [], delta=delta))
+            self.assertEqual((len(timestamps), len(temperatures)), (0, 0))
+
+    def test_invalid_input(self):
+        """Test that mismatched columns and corrupt payloads are rejected."""
+        with self.assertRaises(ValueError):
+            encode_columnar([1, 2], [1.0])
+        with self.assertRaises(ValueError):
+            decode_columnar(b'nope')
+        payload = encode_columnar(self.timestamps, self.temperatures)
+        with self.assertRaises(ValueError):
+            decode_columnar(payload[:-1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from app.hardware import read_temperature
+from app.hardware import read_temperature, sensor_channels, sensor_id
 from config import TEMPERATURE_SOURCE
 
 class TestHardware(unittest.TestCase):
@@ -83,5 +83,32 @@ class TestHardware(unittest.TestCase):
         temp = read_temperature()
         self.assertEqual(temp, 22.5)
 
+    def test_read_temperature_uses_given_devices(self):
+        """Test that already-read device results are used without reading the sensors again."""
+        with patch('app.hardware.Temper') as mock_temper:
+            temp = read_temperature([{f'{TEMPERATURE_SOURCE} temperature': 21.5}])
+            mock_temper.assert_not_called()
+        self.assertEqual(temp, 21.5)
+
+    def test_sensor_id(self):
+        """Test that sensors are identified by port, then bus/device number, then position."""
+        self.assertEqual(sensor_id({'port': '1-1.2', 'busnum': 1, 'devnum': 5}, 0), '1-1.2')
+        self.assertEqual(sensor_id({'busnum': 1, 'devnum': 5}, 0), '1-5')
+        self.assertEqual(sensor_id({}, 2), '2')
+
+    def test_sensor_channels(self):
+        """Test that every channel of every working device is returned."""
+        devices = [
+            {'port': '1-1', 'internal temperature': 24.0, 'external temperature': 22.5, 'external humidity': 55.0},
+            {'port': '1-2', 'error': 'Sensor error'},
+            {'port': '1-3', 'internal temperature': 19.0, 'firmware': 'TEMPerGold_V3.1'},
+        ]
+        self.assertEqual(sensor_channels(devices), [
+            ('1-1', 'internal_temperature', 24.0),
+            ('1-1', 'external_temperature', 22.5),
+            ('1-1', 'external_humidity', 55.0),
+            ('1-3', 'internal_temperature', 19.0),
+        ])
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,170 @@
+import unittest
+import io
+import os
+import random
+import sqlite3
+import tempfile
+from datetime import datetime, timezone, timedelta
+from contextlib import redirect_stdout
+from app import importer
+from app.database import (
+    init_db,
+    close_connections,
+    compact_database,
+    fetch_temperature_history,
+    import_readings,
+    SQLiteBackend
+)
+from app.storage import MemoryBackend
+from config import DATA_RETENTION_PERIOD
+
+class TestParsers(unittest.TestCase):
+    def test_csv_with_header(self):
+        """Test that CSV columns are found by name in any order."""
+        rows = list(importer.read_csv(io.StringIO(
+            "sensor,Temperature,collected_at\n"
+            "a,21.5,2024-03-01T00:00:00Z\n"
+            "\n"
+            "b,22.0\n"
+        )))
+        self.assertEqual(rows, [('2024-03-01T00:00:00Z', '21.5'), (None, None)])
+
+    def test_csv_without_header(self):
+        """Test that headerless CSV is read as timestamp, temperature."""
+        rows = list(importer.read_csv(io.StringIO("1709251200000,21.5\n1709251260000,21.6\n")))
+        self.assertEqual(rows, [('1709251200000', '21.5'), ('1709251260000', '21.6')])
+
+    def test_csv_header_without_temperature(self):
+        """Test that a header naming no temperature column is rejected."""
+        with self.assertRaises(ValueError):
+            list(importer.read_csv(io.StringIO("timestamp,humidity\n1,2\n")))
+
+    def test_json_and_ndjson(self):
+        """Test that JSON lists and NDJSON lines yield the same pairs, with bad records kept as invalid."""
+        expected = [('2024-03-01T00:00:00+00:00', 21.5), (1709251260000, 21.6), (None, None)]
+        self.assertEqual(importer.parse_text(
+            '[{"collected_at": "2024-03-01T00:00:00+00:00", "temperature": 21.5},'
+            ' {"timestamp_ms": 1709251260000, "temperature": 21.6}, 7]', 'json'
+        ), expected)
+        self.assertEqual(importer.parse_text(
+            '{"collected_at": "2024-03-01T00:00:00+00:00", "temperature": 21.5}\n'
+            '{"timestamp_ms": 1709251260000, "temperature": 21.6}\n'
+            'not json\n', 'ndjson'
+        ), expected)
+        with self.assertRaises(ValueError):
+            importer.parse_text('{"temperature": 21.5}', 'json')
+
+class TestImportReadings(unittest.TestCase):
+    def setUp(self):
+        """Set up a fresh test database."""
+        self.test_db_path = '/tmp/test_temperature.db'
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+        os.environ['DB_PATH'] = self.test_db_path
+        init_db()
+
+    def tearDown(self):
+        """Clean up the test database."""
+        close_connections()
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+    def test_timestamp_formats_and_validation(self):
+        """Test that every timestamp form is accepted, and invalid or repeated readings are not stored."""
+        base = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=1)
+        base_ms = int(base.timestamp() * 1000)
+        report = import_readings([
+            (base.isoformat().replace('+00:00', 'Z'), '20.0'),
+            ((base + timedelta(minutes=1)).astimezone(timezone(timedelta(hours=2))).isoformat(), 21.0),
+            ((base + timedelta(minutes=2)).replace(tzinfo=None).isoformat(), 22.0),
+            (base_ms + 3 * 60000, 23.0),
+            (str(base_ms + 4 * 60000), 24.0),
+            (base + timedelta(minutes=5), 25.0),
+            (base_ms, 30.0),
+            (base_ms + 6 * 60000, 51.0),
+            ('yesterday', 20.0),
+            (None, None),
+        ], batch_size=3)
+        self.assertEqual(report['inserted'], 6)
+        self.assertEqual(report['skipped'], 1)
+        self.assertEqual(report['invalid'], 3)
+        # The last slice held only invalid readings, so it needed no transaction
+        self.assertEqual(report['batches'], 3)
+
+        readings = fetch_temperature_history(base - timedelta(minutes=1), base + timedelta(minutes=10))
+        self.assertEqual([r['temperature'] for r in readings], [25.0, 24.0, 23.0, 22.0, 21.0, 20.0])
+        self.assertEqual(readings[-1]['collected_at'], base.isoformat(timespec='milliseconds'))
+
+    def test_reimport_is_idempotent(self):
+        """Test that importing the same readings again stores nothing."""
+        start_ms = int(datetime.now(timezone.utc).timestamp() * 1000) - 10 * 60000
+        readings = [(start_ms + i * 60000, 20.0 + i) for i in range(10)]
+        self.assertEqual(import_readings(readings)['inserted'], 10)
+        report = import_readings(reversed(readings))
+        self.assertEqual((report['inserted'], report['skipped']), (0, 10))
+
+    def test_skips_archived_readings(self):
+        """Test that readings already sealed into archive blocks are not imported twice."""
+        old_time = datetime.now(timezone.utc) - DATA_RETENTION_PERIOD - timedelta(days=1)
+        old_ms = int(old_time.timestamp() * 1000)
+        with sqlite3.connect(self.test_db_path) as conn:
+            conn.executemany(
+                'INSERT INTO temperature_readings (temperature, timestamp_ms) VALUES (?, ?)',
+                [(20.0, old_ms + i * 60000) for i in range(5)]
+            )
+        conn.close()
+        compact_database()
+
+        report = import_readings([(old_ms + i * 60000, 30.0) for i in range(3, 8)])
+        self.assertEqual((report['inserted'], report['skipped']), (3, 2))
+        readings = fetch_temperature_history(old_time - timedelta(minutes=1), old_time + timedelta(minutes=10))
+        self.assertEqual([r['temperature'] for r in readings], [30.0] * 3 + [20.0] * 5)
+
+    def test_rollups_match_readings(self):
+        """Test that set-based rollup updates agree with a scan, including buckets that already had readings."""
+        rng = random.Random(0)
+        end_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        readings = [(end_ms - rng.randint(0, 3 * 86400000), round(rng.uniform(-5.0, 35.0), 2)) for _ in range(3000)]
+        memory = MemoryBackend()
+        memory.import_readings(readings)
+
+        backend = SQLiteBackend()
+        backend.append(sorted(dict(readings[:500]).items()))
+        import_readings(readings, batch_size=1000)
+
+        start_ms = end_ms - 3 * 86400000
+        expected = memory.summary(start_ms, end_ms)
+        count, minimum, maximum, total, squares, histogram = backend.summary(start_ms, end_ms)
+        self.assertEqual((count, minimum, maximum), expected[:3])
+        self.assertAlmostEqual(total, expected[3], places=6)
+        self.assertAlmostEqual(squares, expected[4], places=3)
+        self.assertEqual(histogram, expected[5])
+        buckets = backend.aggregate('hour', start_ms, end_ms)
+        expected_buckets = memory.aggregate('hour', start_ms, end_ms)
+        self.assertEqual([(b[0], b[1], b[2], b[4]) for b in buckets], [(b[0], b[1], b[2], b[4]) for b in expected_buckets])
+        for bucket, expected_bucket in zip(buckets, expected_buckets):
+            self.assertAlmostEqual(bucket[3], expected_bucket[3], places=6)
+
+    def test_generic_backend_import(self):
+        """Test the generic import used by backends without their own."""
+        backend = MemoryBackend()
+        backend.append([(2000, 20.0)])
+        self.assertEqual(backend.import_readings([(3000, 21.0), (1000, 19.0), (2000, 25.0), (1000, 18.0)]), 2)
+        self.assertEqual(backend.range(0, 5000), [(3000, 21.0), (2000, 20.0), (1000, 19.0)])
+
+    def test_command_line(self):
+        """Test importing a CSV file with the command-line tool."""
+        start_ms = int(datetime.now(timezone.utc).timestamp() * 1000) - 60 * 60000
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as stream:
+            stream.write("collected_at,temperature\n")
+            stream.writelines(f"{start_ms + i * 60000},{20 + i / 10}\n" for i in range(50))
+        try:
+            with redirect_stdout(io.StringIO()) as output:
+                self.assertEqual(importer.main([stream.name, '--batch-size', '20']), 0)
+        finally:
+            os.remove(stream.name)
+        self.assertIn('inserted 50', output.getvalue())
+        self.assertEqual(len(SQLiteBackend().range(start_ms, start_ms + 60 * 60000)), 50)
+
+if __name__ == '__main__':
+    unittest.main()
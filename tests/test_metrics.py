@@ -0,0 +1,82 @@
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+from prometheus_client.parser import text_string_to_metric_families
+from app.database import close_connections, init_db, store_temperature
+from app.views import app
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def sample(body, name, **labels):
+    """Return the value of the sample called name with the given labels in a text exposition, or None."""
+    for family in text_string_to_metric_families(body):
+        for s in family.samples:
+            if s.name == name and all(s.labels.get(k) == v for k, v in labels.items()):
+                return s.value
+    return None
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        """Set up a test database with one reading."""
+        self.test_db_path = '/tmp/test_temperature.db'
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+        os.environ['DB_PATH'] = self.test_db_path
+        init_db()
+        store_temperature(22.5)
+        self.app = app.test_client()
+
+    def tearDown(self):
+        """Clean up the test database."""
+        close_connections()
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+    def test_records_requests_and_operations(self):
+        """Test that routes, instrumented operations and storage gauges are exposed."""
+        before = self.app.get('/metrics').get_data(as_text=True)
+        self.app.get('/temperature/latest')
+        self.app.get('/temperature/hourly')
+        store_temperature(23.0)
+        response = self.app.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        body = response.get_data(as_text=True)
+
+        def increase(name, **labels):
+            return sample(body, name, **labels) - (sample(before, name, **labels) or 0)
+
+        self.assertEqual(increase('temperbot_http_requests_total',
+                                  endpoint='/temperature/latest', method='GET', status='200'), 1)
+        self.assertEqual(increase('temperbot_http_request_duration_seconds_count',
+                                  endpoint='/temperature/hourly', method='GET'), 1)
+        self.assertEqual(increase('temperbot_operation_duration_seconds_count', operation='store_temperature'), 1)
+        self.assertEqual(increase('temperbot_operation_duration_seconds_count',
+                                  operation='fetch_temperature_history'), 1)
+        self.assertEqual(sample(body, 'temperbot_storage_readings'), 2)
+        self.assertEqual(sample(body, 'temperbot_storage_bytes'), os.path.getsize(self.test_db_path)
+                         + os.path.getsize(self.test_db_path + '-wal'))
+
+        openmetrics = self.app.get('/metrics', headers={'Accept': 'application/openmetrics-text'})
+        self.assertTrue(openmetrics.content_type.startswith('application/openmetrics-text'))
+        self.assertTrue(openmetrics.get_data(as_text=True).endswith('# EOF\n'))
+
+    def test_aggregates_across_processes(self):
+        """Test that with PROMETHEUS_MULTIPROC_DIR, /metrics sums what every process recorded."""
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=metrics_dir, DB_PATH=self.test_db_path)
+            store = 'from app.database import store_temperature; store_temperature(21.0)'
+            for _ in range(2):
+                subprocess.run([sys.executable, '-c', store], cwd=ROOT, env=env, check=True)
+            scrape = ('from app.views import app; '
+                      'print(app.test_client().get("/metrics").get_data(as_text=True))')
+            body = subprocess.run(
+                [sys.executable, '-c', scrape], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+            ).stdout
+        self.assertEqual(sample(body, 'temperbot_operation_duration_seconds_count', operation='store_temperature'), 2)
+        self.assertEqual(sample(body, 'temperbot_storage_readings'), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import os
+import pstats
+import tempfile
+import time
+from unittest.mock import patch
+from app import profiling
+from app.database import close_connections, init_db, store_temperature
+from app.views import app
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        """Set up a test database and an empty profile directory."""
+        self.test_db_path = '/tmp/test_temperature.db'
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+        os.environ['DB_PATH'] = self.test_db_path
+        init_db()
+        store_temperature(22.5)
+        self.app = app.test_client()
+        self.profile_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Clean up the test database and profiles."""
+        self.profile_dir.cleanup()
+        close_connections()
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+    def profiles(self):
+        return sorted(os.listdir(self.profile_dir.name))
+
+    def test_slow_requests_are_saved(self):
+        """Test that requests over the threshold leave a loadable profile and faster ones do not."""
+        with patch('app.profiling.PROFILE_DIR', self.profile_dir.name), patch('app.profiling.PROFILE_SLOW_MS', 0):
+            self.assertEqual(self.app.get('/temperature/latest').status_code, 200)
+        [name] = self.profiles()
+        self.assertTrue(name.startswith('GET_temperature_latest-'))
+        stats = pstats.Stats(os.path.join(self.profile_dir.name, name))
+        self.assertTrue(any(func[2] == 'get_latest' for func in stats.stats))
+
+        with patch('app.profiling.PROFILE_DIR', self.profile_dir.name), patch('app.profiling.PROFILE_SLOW_MS', 60000):
+            self.app.get('/temperature/latest')
+        self.assertEqual(len(self.profiles()), 1)
+
+    def test_disabled_and_unsampled(self):
+        """Test that nothing is profiled without PROFILE_DIR or when the invocation is not sampled."""
+        self.assertIsNone(profiling.start())
+        with patch('app.profiling.PROFILE_DIR', self.profile_dir.name), patch('app.profiling.PROFILE_SAMPLE_RATE', 0):
+            self.assertIsNone(profiling.start())
+
+    def test_one_at_a_time_and_keep(self):
+        """Test that nested invocations are not profiled and only the newest PROFILE_KEEP are kept."""
+        @profiling.profiled('slow job')
+        def job():
+            # Profiled already by the outer call, so this one runs unprofiled
+            self.assertIsNone(profiling.start())
+            time.sleep(0.01)
+
+        with patch('app.profiling.PROFILE_DIR', self.profile_dir.name), patch('app.profiling.PROFILE_SLOW_MS', 5), \
+                patch('app.profiling.PROFILE_KEEP', 2):
+            for _ in range(3):
+                job()
+        profiles = self.profiles()
+        self.assertEqual(len(profiles), 2)
+        self.assertTrue(all(name.startswith('slow_job-') for name in profiles))
+        self.assertFalse(profiling._lock.locked())
+
+if __name__ == '__main__':
+    unittest.main()
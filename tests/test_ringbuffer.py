@@ -0,0 +1,194 @@
+import unittest
+import fcntl
+import os
+import threading
+from datetime import datetime, timezone, timedelta
+from unittest.mock import patch
+from app.ringbuffer import RingBuffer, RingBufferBackend, capacity_for
+from app.storage import set_backend
+from app import database
+from config import DATA_RETENTION_PERIOD, POLL_INTERVAL_MINUTES, RINGBUFFER_HEADROOM
+
+class TestRingBuffer(unittest.TestCase):
+    def setUp(self):
+        """Create a small ring buffer file for each test."""
+        self.path = '/tmp/test_temperature.ring'
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.ring = RingBuffer(self.path, capacity=5)
+
+    def tearDown(self):
+        """Close and remove the ring buffer file."""
+        self.ring.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_capacity_for(self):
+        """Test that capacity covers the retention period at the poll interval plus headroom."""
+        self.assertEqual(capacity_for(timedelta(days=14), 1, headroom=1.0), 20160)
+        self.assertEqual(capacity_for(timedelta(days=14), 5, headroom=1.25), 5040)
+
+    def test_append_and_latest(self):
+        """Test appending readings and reading back the newest one."""
+        self.assertIsNone(self.ring.latest())
+        self.ring.append(1000, 21.5)
+        self.ring.append(2000, 22.5)
+        self.assertEqual(self.ring.latest(), (2000, 22.5))
+        self.assertEqual(len(self.ring), 2)
+
+    def test_wraparound_retention(self):
+        """Test that the oldest readings are overwritten once the buffer is full."""
+        for i in range(8):
+            self.ring.append(i * 1000, float(i))
+        self.assertEqual(len(self.ring), 5)
+        self.assertEqual(self.ring.range(0, 10000), [(i * 1000, float(i)) for i in range(7, 2, -1)])
+
+    def test_range_lookup(self):
+        """Test inclusive range lookups across the wrap point, newest first."""
+        for i in range(7):
+            self.ring.append(i * 1000, float(i))
+        self.assertEqual(self.ring.range(3000, 5000), [(5000, 5.0), (4000, 4.0), (3000, 3.0)])
+        self.assertEqual(self.ring.range(3500, 4500), [(4000, 4.0)])
+        self.assertEqual(self.ring.range(8000, 9000), [])
+        self.assertEqual(self.ring.range(3000, 5000, limit=2), [(5000, 5.0), (4000, 4.0)])
+
+    def test_chronological_order_enforced(self):
+        """Test that out-of-order appends are rejected."""
+        self.ring.append(2000, 21.0)
+        with self.assertRaises(ValueError):
+            self.ring.append(1000, 21.0)
+        self.ring.append(2000, 22.0)
+
+    def test_shared_between_mappings(self):
+        """Test that a second mapping of the file sees appends and keeps the file's capacity."""
+        reader = RingBuffer(self.path, capacity=100)
+        try:
+            self.assertEqual(reader.capacity, 5)
+            self.ring.append(1000, 21.5)
+            self.assertEqual(reader.latest(), (1000, 21.5))
+            # The append count doubles as a write sequence other processes can watch
+            self.assertEqual(reader.appended(), 1)
+        finally:
+            reader.close()
+
+    def test_column_views(self):
+        """Test zero-copy column views, split into runs where the range wraps."""
+        for i in range(7):
+            self.ring.append(i * 1000, float(i))
+        with self.ring._locked(fcntl.LOCK_SH):
+            runs = self.ring.column_views(2000, 6000)
+            timestamps = [t for run, _ in runs for t in run]
+            values = [v for _, run in runs for v in run]
+            for run_timestamps, run_values in runs:
+                run_timestamps.release()
+                run_values.release()
+        self.assertEqual(len(runs), 2)
+        self.assertEqual(timestamps, [2000, 3000, 4000, 5000, 6000])
+        self.assertEqual(values, [2.0, 3.0, 4.0, 5.0, 6.0])
+
+    def test_copy_columns_blocks_appends(self):
+        """Test that an append to a full ring waits until the columns being copied are read."""
+        for i in range(7):
+            self.ring.append(i * 1000, float(i))
+        writer = RingBuffer(self.path, capacity=5)
+        column_views = self.ring.column_views
+        appended = threading.Event()
+
+        def views_then_append(start_ms, end_ms):
+            runs = column_views(start_ms, end_ms)
+            # Another process appends, overwriting the oldest slot once it gets the lock
+            threading.Thread(target=lambda: (writer.append(7000, 7.0), appended.set())).start()
+            self.assertFalse(appended.wait(0.1))
+            return runs
+
+        try:
+            with patch.object(self.ring, 'column_views', views_then_append):
+                timestamps, values = self.ring.copy_columns(0, 10000)
+            self.assertTrue(appended.wait(5))
+        finally:
+            writer.close()
+        self.assertEqual(list(timestamps), [2000, 3000, 4000, 5000, 6000])
+        self.assertEqual(list(values), [2.0, 3.0, 4.0, 5.0, 6.0])
+
+    def test_rejects_foreign_file(self):
+        """Test that a file that is not a ring buffer is refused."""
+        other = '/tmp/test_not_a.ring'
+        with open(other, 'wb') as f:
+            f.write(b'\0' * 128)
+        try:
+            with self.assertRaises(ValueError):
+                RingBuffer(other, capacity=5)
+        finally:
+            os.remove(other)
+
+class TestRingBufferStorage(unittest.TestCase):
+    def setUp(self):
+        """Route the database functions to a ring buffer file."""
+        self.path = '/tmp/test_temperature.ring'
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        os.environ['RINGBUFFER_PATH'] = self.path
+        self.backend = RingBufferBackend()
+        self.previous = set_backend(self.backend)
+        database.init_db()
+
+    def tearDown(self):
+        """Restore the previous backend and remove the ring buffer file."""
+        set_backend(self.previous)
+        self.backend.close()
+        del os.environ['RINGBUFFER_PATH']
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_store_and_fetch(self):
+        """Test that the public database functions read and write the ring buffer."""
+        self.assertIsNone(database.get_latest_temperature())
+        database.store_temperature(21.0)
+        database.store_temperature(22.0)
+
+        self.assertEqual(database.get_latest_temperature()['temperature'], 22.0)
+        now = datetime.now(timezone.utc)
+        readings = database.fetch_temperature_history(now - timedelta(minutes=5), now)
+        self.assertEqual([r['temperature'] for r in readings], [22.0, 21.0])
+        self.assertEqual(self.backend.ring.capacity, capacity_for(
+            DATA_RETENTION_PERIOD, POLL_INTERVAL_MINUTES, RINGBUFFER_HEADROOM
+        ))
+
+    def test_columns(self):
+        """Test that the columnar fetch reads the ring buffer newest first."""
+        database.store_temperature(21.0)
+        database.store_temperature(22.0)
+        timestamps, temperatures = database.fetch_temperature_columns()
+        self.assertEqual(list(temperatures), [22.0, 21.0])
+        self.assertGreaterEqual(timestamps[0], timestamps[1])
+
+    def test_rollups_and_compaction(self):
+        """Test that rollups are computed from the ring and compaction leaves it untouched."""
+        database.store_temperature(21.0)
+        database.store_temperature(23.0)
+        bucket = database.fetch_temperature_rollups('day')[0]
+        self.assertEqual((bucket['count'], bucket['temperature'], bucket['max_temperature']), (2, 22.0, 23.0))
+        self.assertEqual(database.compact_database()['deleted_rows'], 0)
+        self.assertEqual(len(self.backend.ring), 2)
+
+    def test_import_appends_only_newer_readings(self):
+        """Test that imports skip readings the append-only ring cannot place."""
+        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        self.backend.append([(now_ms - 60000, 21.0)])
+        report = database.import_readings([(now_ms, 23.0), (now_ms - 120000, 20.0), (now_ms - 1000, 22.0)])
+        self.assertEqual((report['inserted'], report['skipped']), (2, 1))
+        self.assertEqual(self.backend.range(0, now_ms), [(now_ms, 23.0), (now_ms - 1000, 22.0), (now_ms - 60000, 21.0)])
+
+    def test_out_of_order_reading_skipped(self):
+        """Test that a reading older than the newest one is skipped without blocking buffered writes."""
+        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        self.backend.append([(now_ms, 21.0)])
+        writer = database.BufferedWriter(max_size=2)
+        with patch('app.database._to_epoch_ms', side_effect=[now_ms - 60000, now_ms + 60000]):
+            writer.add(20.0)
+            writer.add(22.0)
+        self.assertEqual(writer.pending, 0)
+        self.assertEqual(self.backend.range(0, now_ms + 60000), [(now_ms + 60000, 22.0), (now_ms, 21.0)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,22 @@
 import unittest
 import os
+import tempfile
 from datetime import datetime, timezone, timedelta
 from unittest.mock import patch, MagicMock
-from app.scheduler import poll_temperature, start_scheduler
-from app.database import init_db, store_temperature, get_latest_temperature
+from app.scheduler import poll_temperature, start_scheduler, compact_readings, flush_write_buffer, snapshot_database
+from app.database import (
+    init_db,
+    backup_database,
+    store_temperature,
+    get_latest_temperature,
+    close_connections,
+    list_sensor_channels,
+    fetch_sensor_history,
+    BufferedWriter
+)
 from app.alert_checker import check_temperature_alert, AlertState
 from app.notifications import send_temperature_alert
-from config import TEMPERATURE_THRESHOLD, TEMPERATURE_NORMAL_MARGIN
+from config import TEMPERATURE_THRESHOLD, TEMPERATURE_NORMAL_MARGIN, TEMPERATURE_SOURCE
 
 class TestScheduler(unittest.TestCase):
     def setUp(self):
@@ -15,6 +25,10 @@ class TestScheduler(unittest.TestCase):
         self.test_db_path = '/tmp/test_temperature.db'
         os.environ['DB_PATH'] = self.test_db_path
         init_db()
+
+        # Never touch real USB devices; tests patch read_temperature or read_devices as needed
+        self.devices = patch('app.scheduler.read_devices', return_value=[])
+        self.devices.start()
         
         # Reset alert checker state
         import app.alert_checker
@@ -23,6 +37,8 @@ class TestScheduler(unittest.TestCase):
         
     def tearDown(self):
         """Clean up test environment."""
+        self.devices.stop()
+        close_connections()
         if os.path.exists(self.test_db_path):
             os.remove(self.test_db_path)
             
@@ -140,5 +156,60 @@ class TestScheduler(unittest.TestCase):
             # Verify no notification was sent
             mock_notify.assert_not_called()
 
+    def test_buffered_polling(self):
+        """Test that buffered readings are committed by the flush job."""
+        with patch('app.scheduler.read_temperature') as mock_read, \
+             patch('app.scheduler.send_temperature_alert'), \
+             patch('app.scheduler.write_buffer', BufferedWriter(max_size=10)):
+            mock_read.return_value = 22.5
+            poll_temperature()
+            self.assertIsNone(get_latest_temperature())
+
+            self.assertEqual(flush_write_buffer(), 1)
+            self.assertEqual(get_latest_temperature()['temperature'], 22.5)
+
+    def test_polls_every_sensor_channel(self):
+        """Test that one poll stores every device and channel alongside the primary reading."""
+        devices = [
+            {'port': '1-1', 'internal temperature': 24.0, 'external temperature': 22.5, 'internal humidity': 41.0},
+            {'port': '1-2', 'internal temperature': 19.5},
+            {'port': '1-3', 'error': 'no hid/tty devices available'},
+        ]
+        with patch('app.scheduler.read_devices', return_value=devices), \
+             patch('app.scheduler.send_temperature_alert'):
+            poll_temperature()
+
+        self.assertEqual(get_latest_temperature()['temperature'], devices[0][f'{TEMPERATURE_SOURCE} temperature'])
+        self.assertEqual(list_sensor_channels(), [
+            {'sensor': '1-1', 'channels': ['external_temperature', 'internal_humidity', 'internal_temperature']},
+            {'sensor': '1-2', 'channels': ['internal_temperature']},
+        ])
+        self.assertEqual(fetch_sensor_history('1-1', 'internal_humidity')[0]['value'], 41.0)
+        self.assertEqual(fetch_sensor_history('1-2', 'internal_temperature')[0]['value'], 19.5)
+
+    def test_compact_readings(self):
+        """Test that the compaction job returns the compactor's report."""
+        store_temperature(22.5)
+        report = compact_readings()
+        self.assertIsNotNone(report)
+        self.assertEqual(report['deleted_rows'], 0)
+        self.assertIsNotNone(get_latest_temperature())
+
+    def test_compact_readings_error_handling(self):
+        """Test that compaction errors are handled gracefully."""
+        with patch('app.scheduler.compact_database') as mock_compact:
+            mock_compact.side_effect = Exception("Database error")
+            self.assertIsNone(compact_readings())
+
+    def test_snapshot_database(self):
+        """Test that the backup job reports the snapshot and handles failures."""
+        store_temperature(22.5)
+        with tempfile.TemporaryDirectory() as directory, patch('app.database.BACKUP_DIR', directory):
+            with patch('app.scheduler.backup_database', lambda: backup_database(directory)):
+                report = snapshot_database()
+            self.assertTrue(os.path.exists(report['path']))
+        with patch('app.scheduler.backup_database', side_effect=OSError("Disk full")):
+            self.assertIsNone(snapshot_database())
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,166 @@
+import unittest
+import json
+import os
+from unittest.mock import patch
+from app.storage import StorageBackend, MemoryBackend, create_backend, get_backend, set_backend
+from app.database import SQLiteBackend, close_connections
+from app.scheduler import poll_temperature
+from app.views import app
+
+MINUTE_MS = 60 * 1000
+
+class TestMemoryBackend(unittest.TestCase):
+    def setUp(self):
+        """Create an empty in-memory backend."""
+        self.backend = MemoryBackend()
+
+    def test_append_range_latest(self):
+        """Test inclusive range lookups newest first and the latest reading."""
+        self.assertIsNone(self.backend.latest())
+        self.backend.append([(i * MINUTE_MS, float(i)) for i in range(5)])
+        self.assertEqual(self.backend.latest(), (4 * MINUTE_MS, 4.0))
+        self.assertEqual(
+            self.backend.range(MINUTE_MS, 3 * MINUTE_MS),
+            [(3 * MINUTE_MS, 3.0), (2 * MINUTE_MS, 2.0), (MINUTE_MS, 1.0)]
+        )
+
+    def test_out_of_order_append(self):
+        """Test that backfilled readings are kept in timestamp order."""
+        self.backend.append([(3000, 3.0), (1000, 1.0), (2000, 2.0)])
+        self.assertEqual(self.backend.range(0, 5000), [(3000, 3.0), (2000, 2.0), (1000, 1.0)])
+
+    def test_prune(self):
+        """Test that readings older than the cutoff are deleted."""
+        self.backend.append([(i * 1000, float(i)) for i in range(5)])
+        self.assertEqual(self.backend.prune(2000)['deleted_rows'], 2)
+        self.assertEqual(self.backend.range(0, 5000)[-1], (2000, 2.0))
+
+    def test_page_with_ties(self):
+        """Test that keyset pages walk readings sharing a timestamp without gaps or repeats."""
+        self.backend.append([(1000, 1.0), (2000, 2.0), (2000, 2.5), (2000, 2.75), (3000, 3.0)])
+        rows, key = self.backend.page(0, 5000, 2)
+        self.assertEqual(rows, [(3000, 3.0), (2000, 2.75)])
+        rows, key = self.backend.page(0, 5000, 2, before=key)
+        self.assertEqual(rows, [(2000, 2.5), (2000, 2.0)])
+        rows, key = self.backend.page(0, 5000, 2, before=key)
+        self.assertEqual((rows, key), ([(1000, 1.0)], None))
+
+        rows, key = self.backend.page(0, 5000, 2, after=(1000, 0))
+        self.assertEqual(rows, [(2000, 2.5), (2000, 2.0)])
+        rows, _ = self.backend.page(0, 5000, 2, after=key)
+        self.assertEqual(rows, [(3000, 3.0), (2000, 2.75)])
+
+    def test_page_matches_generic(self):
+        """Test that the bisect-based pages match the generic implementation in both directions."""
+        self.backend.append([(i // 3 * 1000, float(i)) for i in range(20)])
+        for direction in ('before', 'after'):
+            key = None if direction == 'before' else (-1, 0)
+            while True:
+                expected = StorageBackend.page(self.backend, 2000, 5000, 4, **{direction: key})
+                actual = self.backend.page(2000, 5000, 4, **{direction: key})
+                self.assertEqual(actual, expected)
+                key = actual[1]
+                if key is None:
+                    break
+
+    def test_aggregate(self):
+        """Test that buckets include the one straddling the start of the range."""
+        self.backend.append([(i * 20 * 1000, float(i)) for i in range(6)])
+        self.assertEqual(
+            self.backend.aggregate('minute', 30 * 1000, 10 * MINUTE_MS),
+            [(MINUTE_MS, 3.0, 5.0, 12.0, 3), (0, 0.0, 2.0, 3.0, 3)]
+        )
+
+    def test_channels(self):
+        """Test per-sensor channel series, listing and pruning."""
+        self.backend.append_channels([
+            ('1-1', 'internal_temperature', 1000, 21.0),
+            ('1-1', 'internal_humidity', 1000, 40.0),
+            ('1-2', 'internal_temperature', 1000, 19.0),
+            ('1-1', 'internal_temperature', 2000, 21.5),
+        ])
+        self.assertEqual(self.backend.list_channels(), [
+            ('1-1', 'internal_humidity'), ('1-1', 'internal_temperature'), ('1-2', 'internal_temperature')
+        ])
+        self.assertEqual(self.backend.channel_range('1-1', 'internal_temperature', 0, 5000), [(2000, 21.5), (1000, 21.0)])
+        self.assertIsNone(self.backend.channel_range('1-3', 'internal_temperature', 0, 5000))
+        self.assertEqual(self.backend.prune(1500)['deleted_rows'], 3)
+        self.assertEqual(self.backend.channel_range('1-2', 'internal_temperature', 0, 5000), [])
+
+    def test_create_backend(self):
+        """Test that backends are created by name and unknown names are rejected."""
+        self.assertIsInstance(create_backend('memory'), MemoryBackend)
+        self.assertIsInstance(create_backend('sqlite'), SQLiteBackend)
+        with self.assertRaises(ValueError):
+            create_backend('cassandra')
+
+class TestBackendParity(unittest.TestCase):
+    def setUp(self):
+        """Load the same readings into the in-memory and SQLite backends."""
+        self.test_db_path = '/tmp/test_temperature.db'
+        os.environ['DB_PATH'] = self.test_db_path
+        self.sqlite = SQLiteBackend()
+        self.sqlite.initialize()
+        self.memory = MemoryBackend()
+        readings = [(i * 10 * 1000, 20.0 + (i % 7) * 0.5) for i in range(500)]
+        self.sqlite.append(readings)
+        self.memory.append(readings)
+
+    def tearDown(self):
+        """Clean up the test database."""
+        close_connections()
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+    def test_same_results(self):
+        """Test that the generic implementations match the SQL ones."""
+        start_ms, end_ms = 95 * 1000, 4000 * 1000
+        self.assertEqual(self.memory.range(start_ms, end_ms), self.sqlite.range(start_ms, end_ms))
+        self.assertEqual(self.memory.latest(), tuple(self.sqlite.latest()))
+        self.assertEqual(self.memory.columns(start_ms, end_ms), self.sqlite.columns(start_ms, end_ms))
+        self.assertEqual(
+            list(self.memory.iter_range(start_ms, end_ms, 64)),
+            list(self.sqlite.iter_range(start_ms, end_ms, 64))
+        )
+        self.assertEqual(self.memory.page(start_ms, end_ms, 50)[0], self.sqlite.page(start_ms, end_ms, 50)[0])
+        for resolution in ('minute', 'hour'):
+            memory_buckets = self.memory.aggregate(resolution, start_ms, end_ms)
+            sqlite_buckets = self.sqlite.aggregate(resolution, start_ms, end_ms)
+            self.assertEqual(len(memory_buckets), len(sqlite_buckets))
+            for memory_bucket, sqlite_bucket in zip(memory_buckets, sqlite_buckets):
+                self.assertEqual(memory_bucket[:2], sqlite_bucket[:2])
+                self.assertAlmostEqual(memory_bucket[3], sqlite_bucket[3])
+
+class TestInMemoryApp(unittest.TestCase):
+    def setUp(self):
+        """Run the app against an in-memory backend with no database file."""
+        self.test_db_path = '/tmp/test_temperature.db'
+        os.environ['DB_PATH'] = self.test_db_path
+        self.previous = set_backend(MemoryBackend())
+        self.app = app.test_client()
+
+    def tearDown(self):
+        """Restore the previous backend."""
+        set_backend(self.previous)
+
+    def test_poll_store_serve(self):
+        """Test the poll -> store -> serve path without touching the disk."""
+        with patch('app.scheduler.read_devices', return_value=[]), \
+             patch('app.scheduler.read_temperature', side_effect=[21.0, 22.0]), \
+             patch('app.scheduler.send_temperature_alert'):
+            poll_temperature()
+            poll_temperature()
+
+        self.assertFalse(os.path.exists(self.test_db_path))
+        self.assertEqual(json.loads(self.app.get('/temperature/latest').data)['temperature'], 22.0)
+        history = json.loads(self.app.get('/temperature/history').data)
+        self.assertEqual([r['temperature'] for r in history], [22.0, 21.0])
+        page = self.app.get('/temperature/history?limit=1')
+        self.assertEqual(json.loads(page.data)[0]['temperature'], 22.0)
+        self.assertIn('X-Next-Cursor', page.headers)
+        hourly = json.loads(self.app.get('/temperature/history?resolution=hour').data)
+        self.assertEqual(sum(bucket['count'] for bucket in hourly), 2)
+        self.assertIsInstance(get_backend(), MemoryBackend)
+
+if __name__ == '__main__':
+    unittest.main()
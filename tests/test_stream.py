@@ -0,0 +1,63 @@
+import unittest
+import os
+import sqlite3
+import time
+from app.database import close_connections, fetch_readings_after, init_db, store_temperature
+from app.stream import ReadingBroadcaster
+
+class TestReadingBroadcaster(unittest.TestCase):
+    def setUp(self):
+        """Set up a fresh test database with one reading and a fast broadcaster."""
+        self.test_db_path = '/tmp/test_temperature.db'
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+        os.environ['DB_PATH'] = self.test_db_path
+        init_db()
+        store_temperature(20.0)
+        self.broadcaster = ReadingBroadcaster(0.01, history_size=2)
+
+    def tearDown(self):
+        """Stop the watcher and clean up the test database."""
+        while self.broadcaster.subscribers:
+            self.broadcaster.unsubscribe()
+        while self.broadcaster.running:
+            time.sleep(0.01)
+        close_connections()
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+    def test_publishes_other_process_writes(self):
+        """Test that readings committed by another connection (the poller process) wake waiting clients."""
+        self.broadcaster.subscribe()
+        after_ms = self.broadcaster.newest_ms
+        self.assertEqual(self.broadcaster.wait(after_ms, 0.05), [])
+
+        with sqlite3.connect(self.test_db_path) as conn:
+            conn.execute(
+                'INSERT INTO temperature_readings (temperature, timestamp_ms) VALUES (21.0, ?)',
+                (after_ms + 1000,)
+            )
+        conn.close()
+        readings = self.broadcaster.wait(after_ms, 5)
+        self.assertEqual([(r['timestamp_ms'], r['temperature']) for r in readings], [(after_ms + 1000, 21.0)])
+
+    def test_client_behind_history_reads_storage(self):
+        """Test that a client further behind than the kept history still gets every reading."""
+        self.broadcaster.subscribe()
+        after_ms = self.broadcaster.newest_ms
+        for i in range(3):
+            # Readings are told apart by their millisecond timestamps
+            time.sleep(0.002)
+            store_temperature(21.0 + i)
+        latest_ms = fetch_readings_after(after_ms)[-1]['timestamp_ms']
+        deadline = time.monotonic() + 5
+        while self.broadcaster.newest_ms < latest_ms:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+        readings = self.broadcaster.wait(after_ms, 1)
+        self.assertEqual([r['temperature'] for r in readings], [21.0, 22.0, 23.0])
+        self.assertEqual([r['temperature'] for r in self.broadcaster.wait(readings[0]['timestamp_ms'], 1)], [22.0, 23.0])
+
+if __name__ == '__main__':
+    unittest.main()